@@ -1,9 +1,35 @@
 import sys
 import os
 import json
+import socket
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import secrets
+import threading
+import concurrent.futures
+import functools
+import shutil
+import tempfile
+from contextlib import contextmanager
+from urllib.parse import urlsplit, parse_qs, quote, unquote
 import pickle
-from PyQt5.QtCore import Qt, QUrl, QTimer, QByteArray, QSize
-from PyQt5.QtGui import QFont, QIcon, QPixmap
+import struct
+import time
+import heapq
+import zlib
+from collections import Counter, OrderedDict, deque
+import xml.etree.ElementTree as ElementTree
+from xml.sax.saxutils import escape
+from math import isqrt, log1p
+import numpy as np
+from PyQt5.QtCore import (
+    Qt, QUrl, QTimer, QByteArray, QSize, QObject, QEvent, pyqtSignal,
+    QBuffer, QIODevice, QRunnable, QThreadPool, QAbstractListModel, QModelIndex,
+)
+from PyQt5.QtGui import QFont, QIcon, QPixmap, QImage, QImageReader
 from PyQt5.QtWidgets import (
     QApplication,
     QWidget,
@@ -11,6 +37,7 @@ from PyQt5.QtWidgets import (
     QHBoxLayout,
     QPushButton,
     QListWidget,
+    QListView,
     QLabel,
     QSlider,
     QFileDialog,
@@ -22,12 +49,15 @@ from PyQt5.QtWidgets import (
     QDialog,
     QComboBox,
     QStackedWidget,
+    QAbstractItemView,
+    QMenu,
 )
 from PyQt5.QtMultimedia import QMediaPlayer, QMediaPlaylist, QMediaContent
 from PyQt5.QtMultimediaWidgets import QVideoWidget
-from mutagen.id3 import ID3
+from mutagen.id3 import ID3, TIT2, TPE1, TALB
 from mutagen.mp3 import MP3
-from mutagen.flac import FLAC
+from mutagen import File as MutagenFile
+from mutagen.flac import FLAC, Picture
 
 
 # Embedded SVG icons as QIcon for consistent cross-platform look
@@ -85,6 +115,12 @@ SVG_DISCOVER = """
 </svg>
 """
 
+SVG_ALBUMS = """
+<svg height="24px" viewBox="0 0 24 24" width="24px" fill="#E63946" xmlns="http://www.w3.org/2000/svg">
+<path d="M12 2C6.48 2 2 6.48 2 12s4.48 10 10 10 10-4.48 10-10S17.52 2 12 2zm0 14.5c-2.49 0-4.5-2.01-4.5-4.5S9.51 7.5 12 7.5s4.5 2.01 4.5 4.5-2.01 4.5-4.5 4.5zm0-5.5c-.55 0-1 .45-1 1s.45 1 1 1 1-.45 1-1-.45-1-1-1z"/>
+</svg>
+"""
+
 # Default album art SVG
 SVG_DEFAULT_ALBUM = """
 <svg height="200px" viewBox="0 0 200 200" width="200px" fill="#E63946" xmlns="http://www.w3.org/2000/svg">
@@ -96,72 +132,3575 @@ SVG_DEFAULT_ALBUM = """
 """
 
 
-class PlaylistManager:
-    def __init__(self):
-        self.playlists = {}
-        self.current_playlist = "Default"
-        self.playlists_file = os.path.join(os.path.expanduser("~"), ".muse_playlists.json")
-        self.load_playlists()
+PLAYLIST_FILE_EXTENSIONS = ['.m3u', '.m3u8', '.pls', '.xspf']
+# Optional metadata copied into playlist and queue entries
+TRACK_ENTRY_EXTRAS = ("fingerprint", "duration", "size")
+XSPF_NAMESPACE = "{http://xspf.org/ns/0/}"
+
+
+class TrackTotals:
+    """Running track count, duration (ms) and size (bytes) over a set of tracks
+
+    Works on library metadata and playlist entries alike; owners add and remove
+    tracks as they change, so reading the totals never walks the tracks.
+    """
+
+    def __init__(self, tracks=()):
+        self.count = 0
+        self.duration = 0
+        self.size = 0
+        self.add(tracks)
+
+    def add(self, tracks):
+        for track in tracks:
+            self.count += 1
+            self.duration += track.get("duration") or 0
+            self.size += track.get("size") or 0
+
+    def remove(self, tracks):
+        for track in tracks:
+            self.count -= 1
+            self.duration -= track.get("duration") or 0
+            self.size -= track.get("size") or 0
+
+    def describe(self):
+        minutes, seconds = divmod(self.duration // 1000, 60)
+        hours, minutes = divmod(minutes, 60)
+        length = f"{hours} hr {minutes} min" if hours else f"{minutes} min {seconds} sec"
+        size = self.size / (1024 * 1024)
+        size = f"{size / 1024:.1f} GB" if size >= 1024 else f"{size:.1f} MB"
+        return f"{self.count} song{'' if self.count == 1 else 's'}, {length}, {size}"
+
+
+class LibraryIndex:
+    """In-memory path lookups over the library
+
+    Lets playlist entries written on another machine or relative to another folder
+    be matched to library tracks without probing the filesystem for each one.
+    """
+
+    def __init__(self, track_paths=(), track_metadatas=()):
+        self.metadata_by_path = {}
+        self.paths_by_name = {}
+        self.path_by_fingerprint = {}
+        self.totals = TrackTotals()
+        for path, metadata in zip(track_paths, track_metadatas):
+            self.add(path, metadata)
+
+    def __contains__(self, path):
+        return path in self.metadata_by_path
+
+    def add(self, path, metadata):
+        if path not in self.metadata_by_path:
+            self.paths_by_name.setdefault(os.path.basename(path).lower(), []).append(path)
+        else:
+            self.totals.remove([self.metadata_by_path[path]])
+        self.totals.add([metadata])
+        self.metadata_by_path[path] = metadata
+        if metadata.get("fingerprint"):
+            self.path_by_fingerprint[metadata["fingerprint"]] = path
+
+    def get_metadata(self, path):
+        return self.metadata_by_path.get(path)
+
+    def path_for_fingerprint(self, fingerprint):
+        return self.path_by_fingerprint.get(fingerprint) if fingerprint else None
+
+    def resolve(self, location, base_dir=""):
+        """Map a playlist location to a library path, or to its normalized form if unknown"""
+        if location.lower().startswith("file:"):
+            location = QUrl(location).toLocalFile()
+        elif os.sep == "/":
+            location = location.replace("\\", "/")
+        path = os.path.normpath(os.path.join(base_dir, location))
+        if path in self.metadata_by_path:
+            return path
+
+        # Otherwise prefer the library track sharing the longest run of trailing folders.
+        # A bare file name match only counts when no other track has that name, and
+        # an even tie is left unresolved rather than guessed.
+        parts = path.lower().split(os.sep)
+        candidates = self.paths_by_name.get(parts[-1], [])
+        best_path, best_score, tied = path, 0, False
+        for candidate in candidates:
+            candidate_parts = candidate.lower().split(os.sep)
+            score = 0
+            while (score < len(parts) and score < len(candidate_parts)
+                   and parts[-1 - score] == candidate_parts[-1 - score]):
+                score += 1
+            if score > best_score:
+                best_path, best_score, tied = candidate, score, False
+            elif score == best_score:
+                tied = True
+        if tied or best_score < 2 and len(candidates) > 1:
+            return path
+        return best_path
+
+
+def split_artist_title(text):
+    """Split an "Artist - Title" display string"""
+    if " - " in text:
+        artist, title = text.split(" - ", 1)
+        return artist.strip(), title.strip()
+    return "", text.strip()
+
+
+def read_m3u(f):
+    title = artist = ""
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("#EXTINF:"):
+            info = line[len("#EXTINF:"):].split(",", 1)
+            artist, title = split_artist_title(info[1]) if len(info) > 1 else ("", "")
+        elif not line.startswith("#"):
+            yield line, title, artist
+            title = artist = ""
+
+
+def read_pls(f):
+    """Entries are written in order, so an entry is complete once a higher number shows up"""
+    tracks = {}
+
+    def finished(below):
+        for number in sorted(n for n in tracks if below is None or n < below):
+            track = tracks.pop(number)
+            if "file" in track:
+                artist, title = split_artist_title(track.get("title", ""))
+                yield track["file"], title, artist
+
+    for line in f:
+        key, sep, value = line.strip().partition("=")
+        if not sep:
+            continue
+        key = key.lower()
+        for field in ("file", "title"):
+            if key.startswith(field) and key[len(field):].isdigit():
+                number = int(key[len(field):])
+                if number not in tracks:
+                    yield from finished(number)
+                tracks.setdefault(number, {})[field] = value
+    yield from finished(None)
+
+
+def read_xspf(f):
+    track_list = None
+    for event, elem in ElementTree.iterparse(f, events=("start", "end")):
+        if event == "start":
+            if elem.tag == XSPF_NAMESPACE + "trackList":
+                track_list = elem
+        elif elem.tag == XSPF_NAMESPACE + "track":
+            location = elem.findtext(XSPF_NAMESPACE + "location")
+            if location:
+                location = location.strip()
+                if not urlsplit(location).scheme:
+                    # A relative URI reference, percent-encoded like any other
+                    location = unquote(location)
+                yield (location,
+                       (elem.findtext(XSPF_NAMESPACE + "title") or "").strip(),
+                       (elem.findtext(XSPF_NAMESPACE + "creator") or "").strip())
+            # Detach finished tracks so the tree never holds more than one
+            if track_list is not None:
+                track_list.clear()
+            else:
+                elem.clear()
+
+
+def read_playlist_file(filepath):
+    """Stream (location, title, artist) tuples out of an M3U/M3U8/PLS/XSPF file"""
+    extension = os.path.splitext(filepath)[1].lower()
+    if extension == '.xspf':
+        with open(filepath, 'rb') as f:
+            yield from read_xspf(f)
+        return
+    reader = read_pls if extension == '.pls' else read_m3u
+    with open(filepath, 'r', encoding='utf-8-sig', errors='replace') as f:
+        yield from reader(f)
+
+
+def playlist_location(path, relative_to=None):
+    if relative_to:
+        return os.path.relpath(path, relative_to)
+    return path
+
+
+def write_playlist_file(filepath, tracks, relative_to=None):
+    """Write tracks to an M3U/M3U8/PLS/XSPF file one entry at a time"""
+    extension = os.path.splitext(filepath)[1].lower()
+    with open(filepath, 'w', encoding='utf-8') as f:
+        if extension == '.pls':
+            f.write("[playlist]\n")
+            count = 0
+            for count, track in enumerate(tracks, 1):
+                name = f"{track['artist']} - {track['title']}" if track["artist"] else track["title"]
+                f.write(f"File{count}={playlist_location(track['path'], relative_to)}\n")
+                f.write(f"Title{count}={name}\nLength{count}=-1\n")
+            f.write(f"NumberOfEntries={count}\nVersion=2\n")
+        elif extension == '.xspf':
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            f.write('<playlist version="1" xmlns="http://xspf.org/ns/0/">\n<trackList>\n')
+            for track in tracks:
+                if relative_to:
+                    location = quote(playlist_location(track["path"], relative_to).replace(os.sep, "/"))
+                else:
+                    location = QUrl.fromLocalFile(track["path"]).toString(QUrl.FullyEncoded)
+                f.write(f"<track><location>{escape(location)}</location>"
+                        f"<title>{escape(track['title'])}</title>"
+                        f"<creator>{escape(track['artist'])}</creator></track>\n")
+            f.write("</trackList>\n</playlist>\n")
+        else:
+            f.write("#EXTM3U\n")
+            for track in tracks:
+                name = f"{track['artist']} - {track['title']}" if track["artist"] else track["title"]
+                f.write(f"#EXTINF:-1,{name}\n{playlist_location(track['path'], relative_to)}\n")
+
+
+MPEG_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+MPEG_SAMPLE_RATES = {1: [44100, 48000, 32000], 2: [22050, 24000, 16000], 2.5: [11025, 12000, 8000]}
+
+ID3_TEXT_FRAMES = {
+    "TIT2": "title", "TPE1": "artist", "TALB": "album", "TLEN": "length",
+    "TT2": "title", "TP1": "artist", "TAL": "album", "TLE": "length",
+}
+ID3_TEXT_ENCODINGS = ["latin-1", "utf-16", "utf-16-be", "utf-8"]
+
+FLAC_STREAMINFO = 0
+FLAC_VORBIS_COMMENT = 4
+FLAC_PICTURE = 6
+
+# WAVE fmt format tags; extensible files are nearly always PCM
+WAVE_CODECS = {0x0001: "pcm", 0x0003: "float", 0x0006: "alaw", 0x0007: "ulaw", 0xFFFE: "pcm"}
+
+RIFF_INFO_FIELDS = {b"INAM": "title", b"IART": "artist", b"IPRD": "album"}
+# Frames used when a format only offers raw ID3 tags (WAV) rather than mutagen's easy keys
+ID3_FRAME_CLASSES = {"title": TIT2, "artist": TPE1, "album": TALB}
+
+
+def syncsafe_int(data):
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+def decode_id3_text(data):
+    if not data:
+        return ""
+    encoding = ID3_TEXT_ENCODINGS[data[0]] if data[0] < 4 else "latin-1"
+    values = data[1:].decode(encoding, errors="replace").split("\x00")
+    return "/".join(value for value in values if value)
+
+
+def tag_result(fields, duration, art_ref, codec="", bitrate=0, sample_rate=0):
+    """Scan metadata; duration is in ms and bitrate in kbps (0 when unknown)"""
+    return {
+        "title": fields.get("title", ""),
+        "artist": fields.get("artist", ""),
+        "album": fields.get("album", ""),
+        "duration": duration,
+        "bitrate": bitrate,
+        "sample_rate": sample_rate,
+        "codec": codec,
+        "album_art_ref": art_ref
+    }
+
+
+def mutagen_stream_info(audio):
+    """Duration, bitrate, sample rate and codec from a mutagen file's info"""
+    info = getattr(audio, "info", None)
+    if info is None:
+        return {"duration": 0, "bitrate": 0, "sample_rate": 0, "codec": ""}
+    return {
+        "duration": int((getattr(info, "length", 0) or 0) * 1000),
+        "bitrate": (getattr(info, "bitrate", 0) or 0) // 1000,
+        "sample_rate": getattr(info, "sample_rate", 0) or 0,
+        "codec": type(audio).__name__.lower()
+    }
+
+
+class TagExtractor:
+    """Scan-mode extractor for one container format
+
+    Subclasses list the extensions and leading magic bytes they handle and implement
+    extract(), which returns a tag_result() dict or None. Calls, failures and time
+    spent are counted per extractor.
+    """
+
+    name = ""
+    extensions = ()
+    magic = ()
+
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.seconds = 0.0
+        self.lock = threading.Lock()
+
+    def matches(self, head):
+        return any(head.startswith(magic) for magic in self.magic)
+
+    def extract(self, reader, f, file_size):
+        raise NotImplementedError
+
+    def record(self, seconds, failed):
+        with self.lock:
+            self.calls += 1
+            self.failures += failed
+            self.seconds += seconds
+
+    def stats(self):
+        return {"calls": self.calls, "failures": self.failures, "seconds": self.seconds}
+
+
+class Mp3Extractor(TagExtractor):
+    name = "mp3"
+    extensions = ('.mp3', '.mp2')
+    magic = (b"ID3",)
+
+    MPEG_PROBE_SIZE = 2048
+
+    def matches(self, head):
+        return super().matches(head) or len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0
+
+    def extract(self, reader, f, file_size):
+        tag = reader.read_id3(f)
+        if tag is None:
+            return None
+        fields, art_ref, audio_start = tag
+        f.seek(audio_start)
+        duration, bitrate, sample_rate, codec = reader.mpeg_stream_info(
+            reader.read_bytes(f, self.MPEG_PROBE_SIZE), file_size - audio_start
+        )
+        if "length" in fields and fields["length"].isdigit():
+            duration = duration or int(fields["length"])
+        return tag_result(fields, duration, art_ref, codec or "mp3", bitrate, sample_rate)
+
+
+class FlacExtractor(TagExtractor):
+    name = "flac"
+    extensions = ('.flac',)
+    magic = (b"fLaC",)
+
+    def matches(self, head):
+        # The head is too short to see past a prepended ID3v2 tag, so for .flac files
+        # an ID3 start is taken on trust and extract() checks for fLaC behind it
+        return super().matches(head) or head[:3] == b"ID3"
+
+    def extract(self, reader, f, file_size):
+        header = reader.read_bytes(f, 4)
+        if header[:3] == b"ID3":
+            # Rare, but some taggers prepend ID3v2 to FLAC
+            rest = reader.read_bytes(f, 6)
+            f.seek(10 + syncsafe_int(rest[2:6]))
+            header = reader.read_bytes(f, 4)
+        if header != b"fLaC":
+            return None
+
+        fields, art_ref, duration, sample_rate = {}, None, 0, 0
+        position = f.tell()
+        last = False
+        while not last:
+            block_header = reader.read_bytes(f, 4)
+            if len(block_header) < 4:
+                break
+            last = bool(block_header[0] & 0x80)
+            block_type = block_header[0] & 0x7F
+            size = int.from_bytes(block_header[1:4], "big")
+            data_offset = position + 4
+            if block_type == FLAC_STREAMINFO:
+                info = reader.read_bytes(f, size)
+                sample_rate = int.from_bytes(info[10:13], "big") >> 4
+                total_samples = int.from_bytes(info[13:18], "big") & 0xFFFFFFFFF
+                if sample_rate:
+                    duration = total_samples * 1000 // sample_rate
+            elif block_type == FLAC_VORBIS_COMMENT:
+                fields = reader.parse_vorbis_comment(reader.read_bytes(f, size))
+            elif block_type == FLAC_PICTURE:
+                picture_type = struct.unpack(">I", reader.read_bytes(f, 4))[0] if size >= 4 else 0
+                if art_ref is None or picture_type == 3 and art_ref["type"] != 3:
+                    art_ref = {"format": "flac", "offset": data_offset, "size": size, "type": picture_type}
+            position = data_offset + size
+            f.seek(position)
+
+        return tag_result(fields, duration, art_ref, "flac", 0, sample_rate)
+
+
+class OggPageStream:
+    """Reads consecutive Ogg page bodies as one byte stream, skipping with seeks"""
+
+    def __init__(self, reader, f):
+        self.reader = reader
+        self.f = f
+        self.remaining = 0
+
+    def next_page(self):
+        header = self.reader.read_bytes(self.f, 27)
+        if len(header) < 27 or header[:4] != b"OggS":
+            raise ValueError("invalid Ogg page")
+        self.remaining = sum(self.reader.read_bytes(self.f, header[26]))
+
+    def read(self, size):
+        chunks = []
+        while size > 0:
+            if not self.remaining:
+                self.next_page()
+                continue
+            chunk = self.reader.read_bytes(self.f, min(size, self.remaining))
+            if not chunk:
+                raise ValueError("truncated Ogg page")
+            self.remaining -= len(chunk)
+            size -= len(chunk)
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    def skip(self, size):
+        while size > 0:
+            if not self.remaining:
+                self.next_page()
+                continue
+            step = min(size, self.remaining)
+            self.f.seek(step, os.SEEK_CUR)
+            self.remaining -= step
+            size -= step
+
+
+class OggExtractor(TagExtractor):
+    """Vorbis and Opus comments, read across pages; embedded pictures are skipped"""
+
+    name = "ogg"
+    extensions = ('.ogg', '.oga', '.opus')
+    magic = (b"OggS",)
+
+    MAX_COMMENT_SIZE = 64 * 1024
+    TAIL_SIZES = (8 * 1024, 64 * 1024 + 282)
+    PICTURE_KEYS = (b"metadata_block_picture=", b"coverart=")
+
+    def extract(self, reader, f, file_size):
+        stream = OggPageStream(reader, f)
+        stream.next_page()
+        identification = stream.read(stream.remaining)
+        if identification.startswith(b"\x01vorbis"):
+            sample_rate = struct.unpack("<I", identification[12:16])[0]
+            bitrate = max(0, struct.unpack("<i", identification[20:24])[0]) // 1000
+            pre_skip, comment_magic, codec = 0, b"\x03vorbis", "vorbis"
+        elif identification.startswith(b"OpusHead"):
+            # Opus always decodes at 48 kHz; the header's input rate is informational
+            sample_rate, bitrate = 48000, 0
+            pre_skip, comment_magic, codec = struct.unpack("<H", identification[10:12])[0], b"OpusTags", "opus"
+        else:
+            return None
+
+        # The comment header always starts on the page after the identification header
+        if stream.read(len(comment_magic)) != comment_magic:
+            return None
+        stream.skip(struct.unpack("<I", stream.read(4))[0])
+        fields, art_ref = {}, None
+        for _ in range(struct.unpack("<I", stream.read(4))[0]):
+            length = struct.unpack("<I", stream.read(4))[0]
+            prefix = stream.read(min(length, len(self.PICTURE_KEYS[0])))
+            if prefix.lower().startswith(self.PICTURE_KEYS) or length > self.MAX_COMMENT_SIZE:
+                if prefix.lower().startswith(self.PICTURE_KEYS):
+                    art_ref = {"format": "ogg"}
+                stream.skip(length - len(prefix))
+                continue
+            key, sep, value = (prefix + stream.read(length - len(prefix))).decode("utf-8", errors="replace").partition("=")
+            if sep and key.lower() not in fields:
+                fields[key.lower()] = value
+
+        # Duration comes from the granule position of the last page; pages are
+        # usually a few KB, so try a short tail before the 64 KB worst case
+        duration = 0
+        for tail_size in self.TAIL_SIZES:
+            f.seek(max(0, file_size - tail_size))
+            tail = reader.read_bytes(f, tail_size)
+            last_page = tail.rfind(b"OggS")
+            if last_page >= 0 or tail_size >= file_size:
+                break
+        if last_page >= 0 and sample_rate:
+            granule = int.from_bytes(tail[last_page + 6:last_page + 14], "little")
+            if granule != 0xFFFFFFFFFFFFFFFF:
+                duration = max(0, granule - pre_skip) * 1000 // sample_rate
+        return tag_result(fields, duration, art_ref, codec, bitrate, sample_rate)
+
+
+class WavExtractor(TagExtractor):
+    """RIFF WAVE: duration from fmt/data, tags from LIST/INFO and an optional id3 chunk"""
+
+    name = "wav"
+    extensions = ('.wav', '.wave')
+    magic = (b"RIFF",)
+
+    MAX_INFO_SIZE = 64 * 1024
+
+    def matches(self, head):
+        return head[:4] == b"RIFF" and head[8:12] == b"WAVE"
+
+    def extract(self, reader, f, file_size):
+        header = reader.read_bytes(f, 12)
+        if not self.matches(header):
+            return None
+        fields, id3_fields, art_ref = {}, {}, None
+        byte_rate = data_size = sample_rate = audio_format = 0
+        position = 12
+        while position + 8 <= file_size:
+            f.seek(position)
+            chunk_header = reader.read_bytes(f, 8)
+            if len(chunk_header) < 8:
+                break
+            chunk_id, size = chunk_header[:4], struct.unpack("<I", chunk_header[4:8])[0]
+            body = position + 8
+            if chunk_id == b"fmt ":
+                audio_format, _, sample_rate, byte_rate = struct.unpack("<HHII", reader.read_bytes(f, 12))
+            elif chunk_id == b"data":
+                data_size = size
+            elif chunk_id == b"LIST" and size <= self.MAX_INFO_SIZE:
+                info = reader.read_bytes(f, size)
+                if info[:4] == b"INFO":
+                    self.parse_info(info[4:], fields)
+            elif chunk_id in (b"id3 ", b"ID3 "):
+                tag = reader.read_id3(f, body)
+                if tag:
+                    id3_fields, art_ref, _ = tag
+            position = body + size + (size & 1)
+        duration = data_size * 1000 // byte_rate if byte_rate else 0
+        # The id3 chunk is what mutagen (and so tag editing) writes, so it wins over INFO
+        fields.update({key: value for key, value in id3_fields.items() if value})
+        codec = WAVE_CODECS.get(audio_format, "wav")
+        return tag_result(fields, duration, art_ref, codec, byte_rate * 8 // 1000, sample_rate)
+
+    def parse_info(self, data, fields):
+        position = 0
+        while position + 8 <= len(data):
+            sub_id, size = data[position:position + 4], struct.unpack("<I", data[position + 4:position + 8])[0]
+            value = data[position + 8:position + 8 + size].split(b"\x00", 1)[0]
+            if sub_id in RIFF_INFO_FIELDS and value:
+                try:
+                    fields[RIFF_INFO_FIELDS[sub_id]] = value.decode("utf-8")
+                except UnicodeDecodeError:
+                    fields[RIFF_INFO_FIELDS[sub_id]] = value.decode("latin-1")
+            position += 8 + size + (size & 1)
+
+
+class FastTagReader:
+    """Registry of scan-mode tag extractors, keyed by extension and magic bytes
+
+    Extractors only touch the headers they need: text frames, metadata blocks and
+    comments are read, picture payloads are skipped with a seek and recorded as an
+    album_art_ref so album art can be loaded later for the one track that needs it.
+    read() returns None for anything no extractor handles so callers can fall back
+    to mutagen. Extractors keep no per-file state and the byte/file counters are
+    locked, so one reader can serve a whole pool.
+    """
+
+    HEAD_SIZE = 12
+    PICTURE_PROBE_SIZE = 256
+    WORKERS = 4
+
+    def __init__(self):
+        self.bytes_read = 0
+        self.files_read = 0
+        self.lock = threading.Lock()
+        self.extractors = []
+        self.extractors_by_extension = {}
+        for extractor in (Mp3Extractor(), FlacExtractor(), OggExtractor(), WavExtractor()):
+            self.register(extractor)
+
+    def register(self, extractor):
+        """Add an extractor; later registrations win for shared extensions"""
+        self.extractors.append(extractor)
+        for extension in extractor.extensions:
+            self.extractors_by_extension[extension] = extractor
+
+    def extractor_for(self, filepath, head):
+        """Prefer the extension's extractor, but trust the magic bytes when they disagree"""
+        by_extension = self.extractors_by_extension.get(os.path.splitext(filepath)[1].lower())
+        if by_extension and by_extension.matches(head):
+            return by_extension
+        for extractor in self.extractors:
+            if extractor.matches(head):
+                return extractor
+        return by_extension
+
+    def stats(self):
+        return {extractor.name: extractor.stats() for extractor in self.extractors}
+
+    def read_bytes(self, f, size):
+        data = f.read(size)
+        with self.lock:
+            self.bytes_read += len(data)
+        return data
+
+    def read(self, filepath, read_ahead=0):
+        """Return tags, stream info, file size and an album_art_ref, without picture bytes
+
+        read_ahead is set on high-latency mounts: one large sequential read covers the
+        header parse instead of a round trip per frame.
+        """
+        with open(filepath, 'rb', buffering=read_ahead or -1) as f:
+            if read_ahead and hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            extractor = self.extractor_for(filepath, self.read_bytes(f, self.HEAD_SIZE))
+            if extractor is None:
+                return None
+            with self.lock:
+                self.files_read += 1
+            f.seek(0)
+            started, failed = time.perf_counter(), True
+            try:
+                file_size = os.fstat(f.fileno()).st_size
+                metadata = extractor.extract(self, f, file_size)
+                failed = metadata is None
+                if metadata is not None:
+                    metadata["size"] = file_size
+                    if not metadata["bitrate"] and metadata["duration"]:
+                        # Average bitrate for formats without a nominal one
+                        metadata["bitrate"] = file_size * 8 // metadata["duration"]
+                return metadata
+            finally:
+                extractor.record(time.perf_counter() - started, failed)
+
+    def read_id3(self, f, start=0):
+        """Read ID3v2 text frames at start; returns (fields, art_ref, audio_start) or None"""
+        f.seek(start)
+        header = self.read_bytes(f, 10)
+        if len(header) < 10 or header[:3] != b"ID3":
+            return {}, None, start
+        version, flags = header[3], header[5]
+        tag_end = start + 10 + syncsafe_int(header[6:10])
+        audio_start = tag_end + (10 if flags & 0x10 else 0)
+        if version not in (2, 3, 4) or flags & 0x80 and version < 4 or flags & 0x40 and version == 2:
+            # Tag-wide unsynchronisation before v2.4 scrambles frame boundaries
+            return None
+        position = start + 10
+        if flags & 0x40 and version > 2:
+            extended = self.read_bytes(f, 4)
+            size = syncsafe_int(extended) if version == 4 else struct.unpack(">I", extended)[0] + 4
+            position += size
+            f.seek(position)
+
+        fields, art_ref = {}, None
+        frame_header_size = 6 if version == 2 else 10
+        while position + frame_header_size <= tag_end:
+            frame_header = self.read_bytes(f, frame_header_size)
+            if len(frame_header) < frame_header_size or frame_header[0] == 0:
+                break
+            if version == 2:
+                frame_id = frame_header[:3].decode("latin-1")
+                size = int.from_bytes(frame_header[3:6], "big")
+                frame_flags = 0
+            else:
+                frame_id = frame_header[:4].decode("latin-1")
+                size = syncsafe_int(frame_header[4:8]) if version == 4 else struct.unpack(">I", frame_header[4:8])[0]
+                frame_flags = struct.unpack(">H", frame_header[8:10])[0]
+            data_offset = position + frame_header_size
+            position = data_offset + size
+            if position > tag_end:
+                break
+
+            unsynchronised = version == 4 and (frame_flags & 0x0002 or flags & 0x80)
+            has_length = version == 4 and frame_flags & 0x0001
+            packed = frame_flags & (0x000C if version == 4 else 0x00C0)
+            if frame_id in ID3_TEXT_FRAMES and not packed and ID3_TEXT_FRAMES[frame_id] not in fields:
+                data = self.read_bytes(f, size)
+                if has_length:
+                    data = data[4:]
+                if unsynchronised:
+                    data = data.replace(b"\xff\x00", b"\xff")
+                fields[ID3_TEXT_FRAMES[frame_id]] = decode_id3_text(data)
+            elif frame_id in ("APIC", "PIC") and not packed:
+                probe = self.read_bytes(f, min(size, self.PICTURE_PROBE_SIZE))
+                picture_type = self.id3_picture_type(probe, version)
+                if art_ref is None or picture_type == 3 and art_ref["type"] != 3:
+                    art_ref = {
+                        "format": "id3", "version": version, "offset": data_offset, "size": size,
+                        "type": picture_type, "unsynchronised": bool(unsynchronised),
+                        "has_length": bool(has_length)
+                    }
+            f.seek(position)
+        return fields, art_ref, audio_start
+
+    def id3_picture_type(self, probe, version):
+        if version == 2:
+            return probe[4] if len(probe) > 4 else 0
+        end = probe.find(b"\x00", 1)
+        return probe[end + 1] if 0 < end < len(probe) - 1 else 0
+
+    def mpeg_stream_info(self, probe, audio_size):
+        """(duration ms, bitrate kbps, sample rate, codec) from the first MPEG frame
+
+        Duration comes from its Xing/VBRI header, or from the CBR bitrate; VBR
+        files report their average bitrate.
+        """
+        for i in range(len(probe) - 4):
+            if probe[i] != 0xFF or probe[i + 1] & 0xE0 != 0xE0:
+                continue
+            version_bits = (probe[i + 1] >> 3) & 3
+            layer = 4 - ((probe[i + 1] >> 1) & 3)
+            bitrate_index, rate_index = probe[i + 2] >> 4, (probe[i + 2] >> 2) & 3
+            if version_bits == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+                continue
+            version = {0: 2.5, 2: 2, 3: 1}[version_bits]
+            sample_rate = MPEG_SAMPLE_RATES[version][rate_index]
+            bitrate = MPEG_BITRATES[(1 if version == 1 else 2, layer)][bitrate_index]
+            samples_per_frame = 384 if layer == 1 else 1152 if layer == 2 or version == 1 else 576
+            codec = f"mp{layer}"
+            mono = probe[i + 3] >> 6 == 3
+            side_info = (17 if mono else 32) if version == 1 else (9 if mono else 17)
+
+            xing = i + 4 + side_info
+            if probe[xing:xing + 4] in (b"Xing", b"Info") and len(probe) >= xing + 12 and probe[xing + 7] & 1:
+                frames = struct.unpack(">I", probe[xing + 8:xing + 12])[0]
+            elif probe[i + 36:i + 40] == b"VBRI" and len(probe) >= i + 54:
+                frames = struct.unpack(">I", probe[i + 50:i + 54])[0]
+            else:
+                return (audio_size - i) * 8 // bitrate, bitrate, sample_rate, codec
+            duration = frames * samples_per_frame * 1000 // sample_rate
+            return duration, (audio_size - i) * 8 // duration if duration else 0, sample_rate, codec
+        return 0, 0, 0, ""
+
+    def parse_vorbis_comment(self, data):
+        fields = {}
+        vendor_length = struct.unpack("<I", data[:4])[0]
+        position = 4 + vendor_length
+        count = struct.unpack("<I", data[position:position + 4])[0]
+        position += 4
+        for _ in range(count):
+            length = struct.unpack("<I", data[position:position + 4])[0]
+            comment = data[position + 4:position + 4 + length].decode("utf-8", errors="replace")
+            position += 4 + length
+            key, sep, value = comment.partition("=")
+            key = key.lower()
+            if sep and key not in fields:
+                fields[key] = value
+        return fields
+
+    def read_picture(self, filepath, art_ref):
+        """Load the picture bytes recorded by a scan"""
+        if art_ref["format"] == "ogg":
+            # Ogg pictures are base64 inside a comment that may span pages
+            audio = MutagenFile(filepath)
+            for value in (audio.get("metadata_block_picture") or []) if audio else []:
+                return Picture(base64.b64decode(value)).data
+            return None
+
+        with open(filepath, 'rb') as f:
+            f.seek(art_ref["offset"])
+            data = self.read_bytes(f, art_ref["size"])
+        if art_ref["format"] == "flac":
+            return Picture(data).data
+
+        if art_ref.get("has_length"):
+            data = data[4:]
+        if art_ref.get("unsynchronised"):
+            data = data.replace(b"\xff\x00", b"\xff")
+        encoding = data[0]
+        if art_ref["version"] == 2:
+            position = 5
+        else:
+            position = data.index(b"\x00", 1) + 2
+        # Skip the description, whose terminator is two bytes wide in UTF-16
+        if encoding in (1, 2):
+            while data[position:position + 2] != b"\x00\x00":
+                position += 2
+            position += 2
+        else:
+            position = data.index(b"\x00", position) + 1
+        return data[position:]
+
+
+AUDIO_EXTENSIONS = ['.mp3', '.wav', '.flac', '.ogg', '.opus']
+NETWORK_FILESYSTEMS = {
+    "nfs", "nfs4", "cifs", "smb3", "smbfs", "afs", "9p", "davfs",
+    "fuse.sshfs", "fuse.rclone", "fuse.smbnetfs",
+}
+
+
+@functools.lru_cache(maxsize=1)
+def network_mount_points():
+    """Mount points of network filesystems, from /proc/mounts where available"""
+    mount_points = []
+    try:
+        with open("/proc/mounts", 'r') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) > 2 and fields[2] in NETWORK_FILESYSTEMS:
+                    mount_points.append(fields[1].replace("\\040", " "))
+    except OSError:
+        pass
+    return mount_points
+
+
+def is_network_path(path):
+    path = os.path.abspath(path)
+    return any(path == mount or path.startswith(mount.rstrip(os.sep) + os.sep)
+               for mount in network_mount_points())
+
+
+class StatCache:
+    """Persistent (size, mtime) cache with a time-to-live, to skip repeated stat round trips"""
+
+    def __init__(self, ttl=600):
+        self.ttl = ttl
+        self.entries = {}
+        self.dirty = False
+        self.cache_file = os.path.join(os.path.expanduser("~"), ".muse_stat_cache.dat")
+        self.load_cache()
+
+    def load_cache(self):
+        try:
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, 'rb') as f:
+                    self.entries = pickle.load(f)
+        except Exception as e:
+            print(f"Error loading stat cache: {e}")
+            self.entries = {}
+
+    def save_cache(self):
+        if not self.dirty:
+            return
+        # Expired entries are dropped so the file does not grow without bound
+        now = time.time()
+        self.entries = {path: entry for path, entry in self.entries.items() if now - entry[0] < self.ttl}
+        try:
+            with open(self.cache_file, 'wb') as f:
+                pickle.dump(self.entries, f)
+            self.dirty = False
+        except Exception as e:
+            print(f"Error saving stat cache: {e}")
+
+    def get(self, path):
+        """Return (size, mtime), None for a missing file, or raise KeyError if unknown or stale"""
+        checked_at, stat = self.entries[path]
+        if time.time() - checked_at >= self.ttl:
+            raise KeyError(path)
+        return stat
+
+    def put(self, path, stat):
+        self.entries[path] = (time.time(), stat)
+        self.dirty = True
+
+
+class FingerprintCache:
+    """Content fingerprints that identify a track across renames and moves
+
+    A fingerprint is the file size plus a BLAKE2 digest of two small samples from
+    the middle of the file, away from the tags at either end. They are cached by
+    path with the (size, mtime) they were computed for.
+    """
+
+    SAMPLE_SIZE = 4096
+    SAMPLE_POSITIONS = (1 / 3, 2 / 3)
+
+    def __init__(self):
+        self.entries = {}
+        self.dirty = False
+        self.cache_file = os.path.join(os.path.expanduser("~"), ".muse_fingerprints.dat")
+        self.load_cache()
+
+    def load_cache(self):
+        try:
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, 'rb') as f:
+                    self.entries = pickle.load(f)
+        except Exception as e:
+            print(f"Error loading fingerprint cache: {e}")
+            self.entries = {}
+
+    def save_cache(self):
+        if not self.dirty:
+            return
+        try:
+            with open(self.cache_file, 'wb') as f:
+                pickle.dump(self.entries, f)
+            self.dirty = False
+        except Exception as e:
+            print(f"Error saving fingerprint cache: {e}")
+
+    def fingerprint(self, path):
+        st = os.stat(path)
+        cached = self.entries.get(path)
+        if cached and cached[:2] == (st.st_size, st.st_mtime):
+            return cached[2]
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as f:
+            for position in self.SAMPLE_POSITIONS:
+                f.seek(int(st.st_size * position))
+                digest.update(f.read(self.SAMPLE_SIZE))
+        fingerprint = f"{st.st_size}:{digest.hexdigest()}"
+        self.entries[path] = (st.st_size, st.st_mtime, fingerprint)
+        self.dirty = True
+        return fingerprint
+
+
+class HighLatencyScanner:
+    """Directory listing, stat and tag reads for NFS/SMB mounts
+
+    Every call on a network mount is a round trip, so listings and stats are issued
+    from a bounded thread pool, letting requests overlap instead of queueing behind
+    each other. Stat results go through a persistent StatCache.
+    """
+
+    MAX_WORKERS = 16
+    READ_AHEAD = 64 * 1024
+
+    def __init__(self, stat_cache, max_workers=MAX_WORKERS):
+        self.stat_cache = stat_cache
+        self.max_workers = max_workers
+
+    def list_directory(self, directory):
+        subdirectories, files = [], []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    # d_type from the listing answers is_dir without another round trip
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+                    else:
+                        files.append(entry.path)
+        except OSError as e:
+            print(f"Error listing {directory}: {e}")
+        return subdirectories, files
+
+    def scan(self, folder_path, extensions=AUDIO_EXTENSIONS):
+        """List a tree breadth-first, keeping up to max_workers listings in flight"""
+        audio_files = []
+        with concurrent.futures.ThreadPoolExecutor(self.max_workers) as executor:
+            pending = {executor.submit(self.list_directory, folder_path)}
+            while pending:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    subdirectories, files = future.result()
+                    pending.update(executor.submit(self.list_directory, d) for d in subdirectories)
+                    audio_files.extend(f for f in files if os.path.splitext(f)[1].lower() in extensions)
+        return sorted(audio_files)
+
+    def stat_path(self, path):
+        try:
+            st = os.stat(path)
+            return path, (st.st_size, st.st_mtime)
+        except OSError:
+            return path, None
+
+    def stat_many(self, paths):
+        """Map paths to (size, mtime) or None, stat-ing only cache misses, in parallel"""
+        results, misses = {}, []
+        for path in paths:
+            try:
+                results[path] = self.stat_cache.get(path)
+            except KeyError:
+                misses.append(path)
+        if misses:
+            with concurrent.futures.ThreadPoolExecutor(self.max_workers) as executor:
+                for path, stat in executor.map(self.stat_path, misses):
+                    self.stat_cache.put(path, stat)
+                    results[path] = stat
+        return results
+
+    def existing(self, paths):
+        stats = self.stat_many(paths)
+        return [path for path in paths if stats[path] is not None]
+
+
+class ScanCheckpoint:
+    """Append-only record of the files an unfinished scan has indexed so far
+
+    A header names the folder being scanned; each checkpoint then appends one
+    pickled batch of {path: metadata} plus the moves found in it and syncs it to
+    disk, so a crash loses at most the batch in flight. A torn final batch is
+    ignored on load. The file is removed once the finished library is saved.
+    """
+
+    def __init__(self):
+        self.checkpoint_file = os.path.join(os.path.expanduser("~"), ".muse_scan_checkpoint.dat")
+
+    def pending_folder(self):
+        """Folder of an interrupted scan, or None"""
+        try:
+            with open(self.checkpoint_file, 'rb') as f:
+                return pickle.load(f).get("folder")
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error reading scan checkpoint: {e}")
+            return None
+
+    def load(self, folder):
+        """Return (records, moved) checkpointed for folder; empty for any other folder"""
+        records, moved = {}, {}
+        try:
+            with open(self.checkpoint_file, 'rb') as f:
+                if pickle.load(f).get("folder") != folder:
+                    return {}, {}
+                while True:
+                    try:
+                        batch = pickle.load(f)
+                    except EOFError:
+                        break
+                    except Exception:
+                        # Torn write from a crash mid-checkpoint
+                        break
+                    records.update(batch["records"])
+                    moved.update(batch["moved"])
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error loading scan checkpoint: {e}")
+        return records, moved
+
+    def start(self, folder, records, moved):
+        """Begin a checkpoint for folder, carrying over records resumed from an earlier one"""
+        with open(self.checkpoint_file, 'wb') as f:
+            pickle.dump({"folder": folder}, f)
+        if records:
+            self.append(records, moved)
+
+    def append(self, records, moved):
+        with open(self.checkpoint_file, 'ab') as f:
+            pickle.dump({"records": records, "moved": moved}, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def clear(self):
+        try:
+            os.remove(self.checkpoint_file)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error removing scan checkpoint: {e}")
+
+
+class LibraryScanner:
+    """Finds audio files and extracts their tags, for the player and the indexer daemon
+
+    Tags come from FastTagReader with mutagen as the fallback. Network mounts (or
+    every path, in high-latency mode) go through the parallel, stat-cached scanner.
+    """
+
+    CHECKPOINT_EVERY = 500
+    # FAT keeps mtimes to 2 seconds, so copies made through it round them
+    MTIME_TOLERANCE = 2
+
+    def __init__(self, high_latency_mode=False):
+        # Header-only tag reader used while scanning
+        self.tag_reader = FastTagReader()
+        # Parallel, stat-cached I/O for network mounts
+        self.high_latency_mode = high_latency_mode
+        self.stat_cache = StatCache()
+        self.network_scanner = HighLatencyScanner(self.stat_cache)
+        self.fingerprints = FingerprintCache()
+        self.checkpoint = ScanCheckpoint()
+
+    def scan_library(self, folder, library_index=None, progress=None):
+        """Scan a folder and extract every track's tags, checkpointing as it goes
+
+        Files are indexed in batches of CHECKPOINT_EVERY; each finished batch is
+        appended to the checkpoint and handed to progress(paths, metadatas), so a
+        partial library can be used straight away. A scan of a folder with a
+        checkpoint left behind resumes after the files it already covers.
+
+        Files whose fingerprint matches a library_index track that is gone from its
+        old path are taken to have moved: their metadata is reused without reading
+        tags. Returns (paths, metadatas, moved) in folder order, where moved maps old
+        to new paths. The checkpoint stays until finish_scan() is called after saving
+        the library.
+        """
+        audio_files = list(self.scan_folder_for_audio(folder))
+        records, moved = self.checkpoint.load(folder)
+        records = {path: records[path] for path in audio_files if path in records}
+        if records:
+            print(f"Resuming scan: {len(records)} of {len(audio_files)} files already indexed")
+            if progress:
+                progress(list(records), list(records.values()))
+        self.checkpoint.start(folder, records, moved)
+
+        high_latency = self.uses_high_latency_io(folder)
+        max_workers = HighLatencyScanner.MAX_WORKERS if high_latency else FastTagReader.WORKERS
+        remaining = [path for path in audio_files if path not in records]
+        for start in range(0, len(remaining), self.CHECKPOINT_EVERY):
+            batch = remaining[start:start + self.CHECKPOINT_EVERY]
+            batch_records, batch_moved = self.index_files(batch, library_index, max_workers, high_latency)
+            self.checkpoint.append(batch_records, batch_moved)
+            records.update(batch_records)
+            moved.update(batch_moved)
+            if progress:
+                progress(batch, [batch_records[path] for path in batch])
+
+        for name, stats in self.tag_reader.stats().items():
+            if stats["calls"]:
+                print(f"Extracted {name}: {stats['calls']} files, {stats['failures']} failed, "
+                      f"{stats['seconds']:.2f}s")
+        if moved:
+            print(f"Recognised {len(moved)} moved files by fingerprint")
+        if high_latency:
+            self.stat_cache.save_cache()
+        self.fingerprints.save_cache()
+        # Resumed files were indexed first; hand back the folder's own order
+        return audio_files, [records[path] for path in audio_files], moved
+
+    def index_files(self, filepaths, library_index, max_workers, high_latency):
+        """Fingerprint and tag one batch; returns ({path: metadata}, moved)"""
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            fingerprints = list(executor.map(self.fingerprint, filepaths))
+
+        moved, reused = {}, {}
+        for path, fingerprint in zip(filepaths, fingerprints):
+            old_path = library_index.path_for_fingerprint(fingerprint) if library_index else None
+            if old_path and old_path != path and not os.path.exists(old_path):
+                moved[old_path] = path
+                reused[path] = library_index.get_metadata(old_path)
+
+        to_extract = [path for path in filepaths if path not in reused]
+        if high_latency:
+            # Overlap per-file round trips instead of paying them one by one
+            extracted = self.extract_metadata_many(to_extract, max_workers, HighLatencyScanner.READ_AHEAD)
+        else:
+            extracted = self.extract_metadata_many(to_extract)
+        extracted = dict(zip(to_extract, extracted))
+
+        records = {}
+        for path, fingerprint in zip(filepaths, fingerprints):
+            metadata = dict(reused[path]) if path in reused else extracted[path]
+            metadata["fingerprint"] = fingerprint
+            records[path] = metadata
+        return records, moved
+
+    def finish_scan(self):
+        self.checkpoint.clear()
+
+    def fingerprint(self, filepath):
+        try:
+            return self.fingerprints.fingerprint(filepath)
+        except Exception as e:
+            print(f"Error fingerprinting file: {e}")
+            return None
+
+    def extract_metadata(self, filepath, read_ahead=0):
+        """Extract title, artist, album and duration without reading album art bytes"""
+        try:
+            metadata = self.tag_reader.read(filepath, read_ahead)
+        except Exception as e:
+            print(f"Error reading tags: {e}")
+            metadata = None
+        if metadata is None:
+            metadata = self.extract_metadata_full(filepath)
+            metadata.pop("album_art", None)
+            try:
+                metadata["size"] = os.path.getsize(filepath)
+            except OSError as e:
+                print(f"Error reading file size: {e}")
+            return metadata
+        if not metadata["title"]:
+            metadata["title"] = os.path.splitext(os.path.basename(filepath))[0]
+        return metadata
+
+    def extract_metadata_many(self, filepaths, max_workers=FastTagReader.WORKERS, read_ahead=0):
+        """Extract metadata for many files on a worker pool, keeping their order"""
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            return list(executor.map(lambda path: self.extract_metadata(path, read_ahead), filepaths))
+
+    def load_album_art(self, filepath, metadata):
+        """Load album art bytes on demand, from the offset recorded during the scan"""
+        art_ref = metadata.get("album_art_ref")
+        if art_ref:
+            try:
+                return self.tag_reader.read_picture(filepath, art_ref)
+            except Exception as e:
+                print(f"Error reading album art: {e}")
+        elif "album_art_ref" in metadata:
+            return None
+        return self.extract_metadata_full(filepath)["album_art"]
+
+    def extract_metadata_full(self, filepath):
+        """Extract metadata from audio files including album art"""
+        filename = os.path.basename(filepath)
+        title = os.path.splitext(filename)[0]
+        artist = ""
+        album_art = None
+        audio = None
+        
+        try:
+            if filepath.lower().endswith('.mp3'):
+                audio = MP3(filepath, ID3=ID3)
+                
+                # Extract title and artist from ID3 tags
+                if audio.tags:
+                    if 'TIT2' in audio.tags:
+                        title = str(audio.tags['TIT2'])
+                    if 'TPE1' in audio.tags:
+                        artist = str(audio.tags['TPE1'])
+                        
+                    # Extract album art
+                    for tag in ['APIC:0', 'APIC:1', 'APIC:3', 'APIC:']:
+                        if tag in audio.tags:
+                            album_art = audio.tags[tag].data
+                            break
+                            
+            elif filepath.lower().endswith('.flac'):
+                audio = FLAC(filepath)
+                
+                # Extract title and artist
+                if 'title' in audio:
+                    title = audio['title'][0]
+                if 'artist' in audio:
+                    artist = audio['artist'][0]
+                
+                # Extract album art
+                if audio.pictures:
+                    album_art = audio.pictures[0].data
+            else:
+                audio = MutagenFile(filepath)
+                    
+        except Exception as e:
+            print(f"Error extracting metadata: {e}")
+            
+        metadata = {
+            "title": title,
+            "artist": artist,
+            "album": "",
+            "album_art": album_art
+        }
+        metadata.update(mutagen_stream_info(audio))
+        return metadata
+
+    def write_tags(self, filepath, changes):
+        """Write title/artist/album changes through mutagen and return the re-read tags
+
+        An empty value removes the tag.
+        """
+        audio = MutagenFile(filepath, easy=True)
+        if audio is None:
+            raise ValueError(f"unsupported file: {filepath}")
+        if audio.tags is None:
+            audio.add_tags()
+        for field, value in changes.items():
+            if isinstance(audio.tags, ID3):
+                audio.tags.delall(ID3_FRAME_CLASSES[field].__name__)
+                if value:
+                    audio.tags.add(ID3_FRAME_CLASSES[field](encoding=3, text=[value]))
+            elif value:
+                audio[field] = [value]
+            else:
+                audio.pop(field, None)
+        audio.save()
+        if self.uses_high_latency_io(filepath):
+            st = os.stat(filepath)
+            self.stat_cache.put(filepath, (st.st_size, st.st_mtime))
+        # Tag sizes and picture offsets moved, so read the header again
+        metadata = self.extract_metadata(filepath)
+        metadata["fingerprint"] = self.fingerprint(filepath)
+        self.fingerprints.save_cache()
+        return metadata
+
+    def edit_tags(self, filepaths, changes, max_workers=FastTagReader.WORKERS):
+        """Apply the same changes to many files on a worker pool
+
+        Returns ({path: fresh metadata}, {path: error message}).
+        """
+        updates, errors = {}, {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            futures = {executor.submit(self.write_tags, path, changes): path for path in filepaths}
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    updates[futures[future]] = future.result()
+                except Exception as e:
+                    print(f"Error writing tags: {e}")
+                    errors[futures[future]] = str(e)
+        self.stat_cache.save_cache()
+        return updates, errors
+
+    def uses_high_latency_io(self, path):
+        return self.high_latency_mode or is_network_path(path)
+
+    def stat_paths(self, paths, root):
+        """Map paths to a fresh (size, mtime) or None, in parallel on network mounts"""
+        if self.uses_high_latency_io(root):
+            with concurrent.futures.ThreadPoolExecutor(HighLatencyScanner.MAX_WORKERS) as executor:
+                return dict(executor.map(self.network_scanner.stat_path, paths))
+        return dict(map(self.network_scanner.stat_path, paths))
+
+    def export_library_index(self, filepath, root, track_paths, track_metadatas):
+        """Write the tracks under root to a portable index; returns how many were written"""
+        root = os.path.abspath(root)
+        inside = [(path, metadata) for path, metadata in zip(track_paths, track_metadatas)
+                  if os.path.abspath(path).startswith(root.rstrip(os.sep) + os.sep)]
+        stats = self.stat_paths([path for path, _ in inside], root)
+        records = [
+            (os.path.relpath(path, root).replace(os.sep, "/"), *stats[path],
+             {field: metadata[field] for field in LIBRARY_INDEX_FIELDS if field in metadata})
+            for path, metadata in inside if stats[path] is not None
+        ]
+        write_library_index(filepath, root, records)
+        return len(records)
+
+    def import_library_index(self, filepath, root):
+        """Rebuild a library from an exported index laid over root
+
+        Validating a record costs one stat: tracks with the exported size and mtime
+        keep their metadata (and fingerprint) as is, changed ones are re-extracted
+        and missing ones dropped. Returns (paths, metadatas, summary).
+        """
+        _, records = read_library_index(filepath)
+        paths = [os.path.join(root, *relative_path.split("/")) for relative_path, _, _, _ in records]
+        stats = self.stat_paths(paths, root)
+
+        track_paths, track_metadatas, changed = [], [], []
+        for path, (_, size, mtime, metadata) in zip(paths, records):
+            stat = stats[path]
+            if stat is None:
+                continue
+            track_paths.append(path)
+            if stat[0] == size and abs(stat[1] - mtime) <= self.MTIME_TOLERANCE:
+                track_metadatas.append(metadata)
+                if metadata.get("fingerprint"):
+                    # Seed the cache so the next rescan does not re-hash the file
+                    self.fingerprints.entries[path] = (stat[0], stat[1], metadata["fingerprint"])
+                    self.fingerprints.dirty = True
+            else:
+                track_metadatas.append(None)
+                changed.append(len(track_metadatas) - 1)
+
+        extracted = self.extract_metadata_many([track_paths[row] for row in changed])
+        for row, metadata in zip(changed, extracted):
+            metadata["fingerprint"] = self.fingerprint(track_paths[row])
+            track_metadatas[row] = metadata
+        self.fingerprints.save_cache()
+        summary = {"kept": len(track_paths) - len(changed), "extracted": len(changed),
+                   "missing": len(records) - len(track_paths)}
+        return track_paths, track_metadatas, summary
+
+    def existing_paths(self, paths):
+        """Filter paths down to files that exist, in parallel and cached on network mounts"""
+        paths = list(paths)
+        if paths and self.uses_high_latency_io(paths[0]):
+            existing = self.network_scanner.existing(paths)
+            self.stat_cache.save_cache()
+            return existing
+        return [path for path in paths if os.path.exists(path)]
+
+    def scan_folder_for_audio(self, folder_path):
+        """Scan a folder recursively for audio files"""
+        if self.uses_high_latency_io(folder_path):
+            return self.network_scanner.scan(folder_path, AUDIO_EXTENSIONS)
+            
+        audio_files = []
+        
+        for root, dirs, files in os.walk(folder_path):
+            for file in files:
+                if any(file.lower().endswith(ext) for ext in AUDIO_EXTENSIONS):
+                    audio_files.append(os.path.join(root, file))
+                    
+        return audio_files
+
+
+def read_library_file(filepath):
+    """Load a saved library (track_paths, track_metadatas, last_folder); empty if missing"""
+    if not os.path.exists(filepath):
+        print("No saved library found.")
+        return {}
+    try:
+        with open(filepath, 'rb') as f:
+            library_data = pickle.load(f)
+        print(f"Library loaded: {len(library_data.get('track_paths', []))} tracks")
+        return library_data
+    except Exception as e:
+        print(f"Error loading library: {e}")
+        return {}
+
+
+def write_library_file(filepath, track_paths, track_metadatas, last_folder):
+    library_data = {
+        "track_paths": track_paths,
+        "track_metadatas": track_metadatas,
+        "last_folder": last_folder
+    }
+    try:
+        with open(filepath, 'wb') as f:
+            pickle.dump(library_data, f)
+            print(f"Library saved: {len(track_paths)} tracks")
+    except Exception as e:
+        print(f"Error saving library: {e}")
+
+
+LIBRARY_INDEX_MAGIC = b"MUSEIDX"
+LIBRARY_INDEX_VERSION = 1
+# Scan-time metadata carried in a portable index; album_art (picture bytes from old
+# libraries) is left out, since covers are read from the files on demand
+LIBRARY_INDEX_FIELDS = (
+    "title", "artist", "album", "duration", "bitrate", "sample_rate", "codec", "album_art_ref",
+    "fingerprint", "size",
+)
+
+
+def write_library_index(filepath, root, records):
+    """Write a portable library index: magic, version byte, then zlib-compressed JSON
+
+    records are (relative path with "/" separators, size, mtime, metadata) tuples.
+    JSON rather than pickle, since the file is meant to be opened on other machines.
+    """
+    payload = json.dumps({"root": root, "tracks": records}, separators=(",", ":")).encode("utf-8")
+    temporary = filepath + ".tmp"
+    with open(temporary, 'wb') as f:
+        f.write(LIBRARY_INDEX_MAGIC + bytes([LIBRARY_INDEX_VERSION]))
+        f.write(zlib.compress(payload, 9))
+    os.replace(temporary, filepath)
+
+
+def read_library_index(filepath):
+    """Return (root, records) from a portable library index; ValueError if it is not one"""
+    with open(filepath, 'rb') as f:
+        data = f.read()
+    header_size = len(LIBRARY_INDEX_MAGIC) + 1
+    if data[:len(LIBRARY_INDEX_MAGIC)] != LIBRARY_INDEX_MAGIC:
+        raise ValueError("not a Muse library index")
+    if data[header_size - 1] > LIBRARY_INDEX_VERSION:
+        raise ValueError(f"library index version {data[header_size - 1]} is newer than this Muse")
+    library = json.loads(zlib.decompress(data[header_size:]).decode("utf-8"))
+    return library["root"], library["tracks"]
+
+
+class PlaylistManager(QObject):
+    """Named playlists persisted to ~/.muse_playlists.json
+
+    Mutations announce what changed through signals carrying the playlist name, so
+    views apply just the affected rows. Bulk operations run inside a transaction,
+    which defers persistence until the outermost transaction ends and then writes
+    the file once. Per-playlist TrackTotals are built on first use and then kept
+    up to date by the row insertions and removals.
+    """
+
+    tracks_inserted = pyqtSignal(str, int, list)
+    tracks_removed = pyqtSignal(str, int, int)
+    tracks_moved = pyqtSignal(str, int, int, int)
+    playlists_changed = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.playlists = {}
+        self.current_playlist = "Default"
+        self.playlists_file = os.path.join(os.path.expanduser("~"), ".muse_playlists.json")
+        self.transaction_depth = 0
+        self.dirty = False
+        self.totals = {}
+        self.load_playlists()
+
+    def load_playlists(self):
+        self.totals = {}
+        try:
+            if os.path.exists(self.playlists_file):
+                with open(self.playlists_file, 'r') as f:
+                    self.playlists = json.load(f)
+                    
+                if not self.playlists:
+                    self.playlists = {"Default": []}
+            else:
+                self.playlists = {"Default": []}
+        except Exception as e:
+            print(f"Error loading playlists: {e}")
+            self.playlists = {"Default": []}
+
+    def save_playlists(self):
+        if self.transaction_depth:
+            self.dirty = True
+            return
+        self.dirty = False
+        try:
+            with open(self.playlists_file, 'w') as f:
+                json.dump(self.playlists, f)
+        except Exception as e:
+            print(f"Error saving playlists: {e}")
+
+    @contextmanager
+    def transaction(self):
+        """Group mutations so the playlists file is written once, at the end
+
+        If the outermost transaction fails, the playlists are put back as they were
+        when it began and playlists_changed tells views to reload them.
+        """
+        if not self.transaction_depth:
+            snapshot = {name: list(tracks) for name, tracks in self.playlists.items()}
+        self.transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            if self.transaction_depth == 1:
+                self.playlists = snapshot
+                self.totals = {}
+                self.dirty = False
+                self.playlists_changed.emit()
+            raise
+        finally:
+            self.transaction_depth -= 1
+            if not self.transaction_depth and self.dirty:
+                self.save_playlists()
+
+    def create_playlist(self, name):
+        if name not in self.playlists:
+            self.playlists[name] = []
+            self.save_playlists()
+            self.playlists_changed.emit()
+            return True
+        return False
+
+    def add_to_playlist(self, playlist_name, track_path, track_metadata):
+        return self.add_tracks(playlist_name, [make_track_entry(track_path, track_metadata)])
+
+    def remove_from_playlist(self, playlist_name, index):
+        return self.remove_tracks(playlist_name, [index]) == 1
+
+    def playlist_totals(self, playlist_name):
+        """TrackTotals for a playlist, counted once and maintained from then on"""
+        totals = self.totals.get(playlist_name)
+        if totals is None:
+            totals = self.totals[playlist_name] = TrackTotals(self.playlists.get(playlist_name, []))
+        return totals
+
+    def insert_rows(self, playlist_name, row, entries):
+        self.playlists[playlist_name][row:row] = entries
+        if playlist_name in self.totals:
+            self.totals[playlist_name].add(entries)
+        self.tracks_inserted.emit(playlist_name, row, entries)
+
+    def delete_rows(self, playlist_name, row, count):
+        tracks = self.playlists[playlist_name]
+        if playlist_name in self.totals:
+            self.totals[playlist_name].remove(tracks[row:row + count])
+        del tracks[row:row + count]
+        self.tracks_removed.emit(playlist_name, row, count)
+
+    def add_tracks(self, playlist_name, entries, row=None):
+        """Insert entries before row, appending by default"""
+        if playlist_name not in self.playlists:
+            return False
+        entries = [dict(entry) for entry in entries]
+        if not entries:
+            return True
+        tracks = self.playlists[playlist_name]
+        row = len(tracks) if row is None else max(0, min(row, len(tracks)))
+        self.insert_rows(playlist_name, row, entries)
+        self.save_playlists()
+        return True
+
+    def remove_tracks(self, playlist_name, rows):
+        """Remove the given rows; returns how many were removed
+
+        Rows are grouped into contiguous ranges and removed from the bottom up, so
+        each tracks_removed signal can be applied in order by a view.
+        """
+        tracks = self.playlists.get(playlist_name)
+        if tracks is None:
+            return 0
+        rows = sorted({row for row in rows if 0 <= row < len(tracks)}, reverse=True)
+        ranges = []
+        for row in rows:
+            if ranges and ranges[-1][0] == row + 1:
+                ranges[-1][0] = row
+            else:
+                ranges.append([row, row + 1])
+        if not ranges:
+            return 0
+        with self.transaction():
+            for start, end in ranges:
+                self.delete_rows(playlist_name, start, end - start)
+            self.save_playlists()
+        return len(rows)
+
+    def move_tracks(self, playlist_name, row, count, destination):
+        """Move count rows starting at row so that they start at destination afterwards"""
+        tracks = self.playlists.get(playlist_name)
+        if tracks is None or count <= 0 or row < 0 or row + count > len(tracks):
+            return False
+        destination = max(0, min(destination, len(tracks) - count))
+        if destination == row:
+            return True
+        moving = tracks[row:row + count]
+        del tracks[row:row + count]
+        tracks[destination:destination] = moving
+        self.save_playlists()
+        self.tracks_moved.emit(playlist_name, row, count, destination)
+        return True
+
+    def dedupe_playlist(self, playlist_name):
+        """Remove repeated paths, keeping each first occurrence; returns how many went"""
+        seen = set()
+        duplicates = []
+        for row, track in enumerate(self.playlists.get(playlist_name, [])):
+            if track["path"] in seen:
+                duplicates.append(row)
+            seen.add(track["path"])
+        return self.remove_tracks(playlist_name, duplicates)
+
+    def replace_tracks(self, playlist_name, entries):
+        """Replace a playlist's contents, announcing only the rows that differ
+
+        The common prefix and suffix are kept; everything between them is
+        removed and the new middle inserted, so small edits stay small for views.
+        """
+        tracks = self.playlists.get(playlist_name)
+        if tracks is None:
+            return False
+        entries = [dict(entry) for entry in entries]
+        prefix = 0
+        limit = min(len(tracks), len(entries))
+        while prefix < limit and tracks[prefix] == entries[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and tracks[-1 - suffix] == entries[-1 - suffix]:
+            suffix += 1
+        with self.transaction():
+            removed = len(tracks) - prefix - suffix
+            if removed:
+                self.delete_rows(playlist_name, prefix, removed)
+            inserted = entries[prefix:len(entries) - suffix]
+            if inserted:
+                self.insert_rows(playlist_name, prefix, inserted)
+            self.save_playlists()
+        return True
+
+    def relink(self, moved):
+        """Point entries at the new paths of moved tracks; returns how many changed"""
+        relinked = 0
+        with self.transaction():
+            for name, tracks in list(self.playlists.items()):
+                entries = [dict(track, path=moved[track["path"]]) if track["path"] in moved else track
+                           for track in tracks]
+                changed = sum(track["path"] in moved for track in tracks)
+                if changed:
+                    self.replace_tracks(name, entries)
+                    relinked += changed
+        return relinked
+
+    def refresh_tracks(self, metadata_by_path):
+        """Update title/artist of entries whose tracks were re-tagged; returns how many changed"""
+        refreshed = 0
+        with self.transaction():
+            for name, tracks in list(self.playlists.items()):
+                entries = [dict(track, **make_track_entry(track["path"], metadata_by_path[track["path"]]))
+                           if track["path"] in metadata_by_path else track for track in tracks]
+                changed = sum(entry != track for entry, track in zip(entries, tracks))
+                if changed:
+                    self.replace_tracks(name, entries)
+                    refreshed += changed
+        return refreshed
+
+    def fill_track_stats(self, library_index):
+        """Copy duration and size from the library into entries saved without them
+
+        Entries are updated in place (their display does not change) and the
+        playlists file is written once if anything was filled in.
+        """
+        filled = 0
+        for name, tracks in self.playlists.items():
+            for track in tracks:
+                metadata = None if "duration" in track else library_index.get_metadata(track["path"])
+                if metadata and metadata.get("duration"):
+                    track.update(make_track_entry(track["path"], metadata), title=track["title"],
+                                 artist=track["artist"])
+                    filled += 1
+                    self.totals.pop(name, None)
+        if filled:
+            self.save_playlists()
+        return filled
+
+    def delete_playlist(self, name):
+        if name in self.playlists and name != "Default":
+            del self.playlists[name]
+            self.totals.pop(name, None)
+            self.save_playlists()
+            self.playlists_changed.emit()
+            return True
+        return False
+
+    def get_playlist(self, name):
+        return self.playlists.get(name, [])
+
+    def import_playlist(self, filepath, library_index=None, name=None):
+        """Import an M3U/M3U8/PLS/XSPF file as a new playlist, saved in a single write"""
+        library_index = library_index or LibraryIndex()
+        base_dir = os.path.dirname(os.path.abspath(filepath))
+        name = name or os.path.splitext(os.path.basename(filepath))[0]
+        unique_name, suffix = name, 2
+        while unique_name in self.playlists:
+            unique_name = f"{name} ({suffix})"
+            suffix += 1
+
+        tracks = []
+        try:
+            for location, title, artist in read_playlist_file(filepath):
+                path = library_index.resolve(location, base_dir)
+                metadata = library_index.get_metadata(path)
+                if not title:
+                    if metadata:
+                        title, artist = metadata["title"], metadata["artist"]
+                    else:
+                        title = os.path.splitext(os.path.basename(path))[0]
+                entry = make_track_entry(path, metadata) if metadata else {"path": path}
+                entry.update(title=title, artist=artist)
+                tracks.append(entry)
+        except Exception as e:
+            print(f"Error importing playlist: {e}")
+            return None
+
+        self.playlists[unique_name] = tracks
+        self.save_playlists()
+        self.playlists_changed.emit()
+        return unique_name
+
+    def export_playlist(self, name, filepath, relative=False):
+        """Export a playlist to an M3U/M3U8/PLS/XSPF file"""
+        if name not in self.playlists:
+            return False
+        relative_to = os.path.dirname(os.path.abspath(filepath)) if relative else None
+        try:
+            write_playlist_file(filepath, self.playlists[name], relative_to)
+            return True
+        except Exception as e:
+            print(f"Error exporting playlist: {e}")
+            return False
+
+    def get_playlist_names(self):
+        return list(self.playlists.keys())
+
+    def sync_playlist(self, name, target_dir):
+        """Mirror a playlist into a device folder; returns a summary dict or None"""
+        if name not in self.playlists:
+            return None
+        return DeviceSync(target_dir).sync(name, list(self.playlists[name]))
+
+
+class DeviceSync:
+    """Mirrors a playlist into a device folder, copying only what changed
+
+    Tracks are copied flat into the target folder under their file names, made
+    safe for FAT file systems. A manifest in the folder records the source path,
+    size and mtime behind every file Muse wrote, so a re-sync only stats sources
+    and lists the folder once. Sources that can't be reached keep their device copy. Copies run on a small pool fed through a bounded
+    queue; tracks no longer in the playlist are deleted (only files the manifest
+    knows about) and an M3U8 with relative entries is written next to them.
+    """
+
+    MANIFEST_NAME = ".muse_sync.json"
+    MAX_WORKERS = 4
+    MAX_PENDING = 8
+    SAVE_EVERY = 25
+    INVALID_NAME_CHARACTERS = '<>:"/\\|?*'
+
+    def __init__(self, target_dir):
+        self.target_dir = target_dir
+        self.manifest_file = os.path.join(target_dir, self.MANIFEST_NAME)
+
+    def load_manifest(self):
+        try:
+            if os.path.exists(self.manifest_file):
+                with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"Error loading sync manifest: {e}")
+        return {}
+
+    def save_manifest(self, manifest):
+        temporary = self.manifest_file + ".tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(temporary, self.manifest_file)
+
+    def safe_name(self, filename):
+        return "".join("_" if c in self.INVALID_NAME_CHARACTERS or ord(c) < 32 else c for c in filename).strip(" .")
+
+    def sync(self, playlist_name, tracks):
+        """Bring the target folder in line with tracks; returns a summary dict"""
+        started = time.perf_counter()
+        os.makedirs(self.target_dir, exist_ok=True)
+        manifest = self.load_manifest()
+        by_source = {entry["source"]: name for name, entry in manifest.items()}
+        on_device = {entry.name: entry.stat().st_size for entry in os.scandir(self.target_dir) if entry.is_file()}
+
+        # Stable names: a source keeps the name it was first synced under
+        names, wanted, to_copy, playlist_entries, missing = {}, {}, [], [], 0
+        taken = set(manifest) | set(on_device)
+        for track in tracks:
+            source = track["path"]
+            try:
+                st = os.stat(source)
+            except OSError:
+                missing += 1
+                if source not in names and source in by_source:
+                    # Unreachable source (an offline NAS, say): keep the copy already on the device
+                    names[source] = by_source[source]
+                    wanted[names[source]] = manifest[names[source]]
+                if source in names:
+                    playlist_entries.append(dict(track, path=os.path.join(self.target_dir, names[source])))
+                continue
+            if source in names:
+                # Repeated entries share one copy
+                playlist_entries.append(dict(track, path=os.path.join(self.target_dir, names[source])))
+                continue
+            name = by_source.get(source)
+            if name is None:
+                base, extension = os.path.splitext(self.safe_name(os.path.basename(source)))
+                name, suffix = base + extension, 2
+                while name in taken:
+                    name = f"{base} ({suffix}){extension}"
+                    suffix += 1
+                taken.add(name)
+            entry = {"source": source, "size": st.st_size, "mtime": st.st_mtime}
+            previous = manifest.get(name)
+            if (previous is None or previous["source"] != source
+                    or (previous["size"], previous["mtime"]) != (st.st_size, st.st_mtime)
+                    or on_device.get(name) != st.st_size):
+                to_copy.append((source, name, entry))
+            names[source] = name
+            wanted[name] = entry
+            playlist_entries.append(dict(track, path=os.path.join(self.target_dir, name)))
+
+        copied, failed = self.copy_files(to_copy, manifest)
+
+        deleted = 0
+        for name in [name for name in manifest if name not in wanted]:
+            try:
+                if os.path.exists(os.path.join(self.target_dir, name)):
+                    os.remove(os.path.join(self.target_dir, name))
+                deleted += 1
+                del manifest[name]
+            except OSError as e:
+                print(f"Error removing synced track: {e}")
+
+        self.save_manifest(manifest)
+        write_playlist_file(
+            os.path.join(self.target_dir, self.safe_name(playlist_name) + ".m3u8"),
+            [entry for entry in playlist_entries if os.path.basename(entry["path"]) in manifest],
+            self.target_dir
+        )
+        return {
+            "copied": copied, "kept": len(wanted) - copied - failed, "deleted": deleted,
+            "failed": failed, "missing": missing, "seconds": time.perf_counter() - started
+        }
+
+    def copy_files(self, to_copy, manifest):
+        """Copy (source, name, entry) jobs in parallel; successful ones go into the manifest
+
+        The manifest is saved every SAVE_EVERY copies, so a sync that is cut short
+        (device unplugged, app closed) does not copy the finished files again.
+        """
+        copied = failed = 0
+        slots = threading.BoundedSemaphore(self.MAX_PENDING)
+
+        def copy(source, name, entry):
+            try:
+                destination = os.path.join(self.target_dir, name)
+                shutil.copyfile(source, destination + ".part")
+                os.replace(destination + ".part", destination)
+            finally:
+                slots.release()
+
+        def finish(future):
+            nonlocal copied, failed
+            name, entry = futures.pop(future)
+            try:
+                future.result()
+                manifest[name] = entry
+                copied += 1
+            except Exception as e:
+                print(f"Error copying track to device: {e}")
+                failed += 1
+                return
+            if copied % self.SAVE_EVERY == 0:
+                try:
+                    self.save_manifest(manifest)
+                except Exception as e:
+                    print(f"Error saving sync manifest: {e}")
+
+        with concurrent.futures.ThreadPoolExecutor(self.MAX_WORKERS) as executor:
+            futures = {}
+            for source, name, entry in to_copy:
+                # Block instead of queueing thousands of copies at once
+                slots.acquire()
+                futures[executor.submit(copy, source, name, entry)] = (name, entry)
+                for future in [future for future in futures if future.done()]:
+                    finish(future)
+            for future in concurrent.futures.as_completed(list(futures)):
+                finish(future)
+        return copied, failed
+
+
+def indexer_socket_path():
+    return os.path.join(os.path.expanduser("~"), ".muse_indexer.sock")
+
+
+class IndexerDaemon:
+    """Owns the library and playlists for every player instance of this user
+
+    Clients talk newline-delimited JSON over a Unix socket: each request carries an
+    id and gets a reply with the same id, and every change is pushed to all clients
+    as an event before the reply that caused it is written. Scans run on a worker
+    thread, so the daemon keeps answering while it indexes, and it is the only
+    process writing ~/.muse_library.dat and ~/.muse_playlists.json.
+    """
+
+    PLAYLIST_METHODS = (
+        "create_playlist", "delete_playlist", "add_tracks", "remove_tracks", "move_tracks",
+        "dedupe_playlist", "replace_tracks", "import_playlist", "relink", "refresh_tracks",
+    )
+    MAX_MESSAGE_SIZE = 256 * 1024 * 1024
+
+    def __init__(self, socket_path=None, high_latency_mode=False):
+        self.socket_path = socket_path or indexer_socket_path()
+        self.library_file = os.path.join(os.path.expanduser("~"), ".muse_library.dat")
+        self.library_scanner = LibraryScanner(high_latency_mode)
+        library = read_library_file(self.library_file)
+        self.track_paths = library.get("track_paths", [])
+        self.track_metadatas = library.get("track_metadatas", [])
+        for metadata in self.track_metadatas:
+            # Libraries saved by older versions kept picture bytes, which JSON can't carry;
+            # art is read from the file on demand instead
+            metadata.pop("album_art", None)
+        self.last_folder_path = library.get("last_folder", "")
+        self.library_index = LibraryIndex(self.track_paths, self.track_metadatas)
+        self.playlist_manager = PlaylistManager()
+        self.playlist_manager.fill_track_stats(self.library_index)
+        self.playlist_manager.tracks_inserted.connect(
+            lambda name, row, entries: self.broadcast("tracks_inserted", [name, row, entries]))
+        self.playlist_manager.tracks_removed.connect(
+            lambda name, row, count: self.broadcast("tracks_removed", [name, row, count]))
+        self.playlist_manager.tracks_moved.connect(
+            lambda name, row, count, destination: self.broadcast("tracks_moved", [name, row, count, destination]))
+        self.playlist_manager.playlists_changed.connect(
+            lambda: self.broadcast("playlists", self.playlist_manager.playlists))
+        self.clients = set()
+        self.scan_lock = None
+        self.resume_task = None
+
+    def serve_forever(self):
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
+
+    async def serve(self):
+        if os.path.exists(self.socket_path):
+            client = IndexerClient.connect_to(self.socket_path)
+            if client:
+                client.close()
+                print(f"An indexer is already running on {self.socket_path}")
+                return
+            # Left behind by an indexer that did not shut down cleanly
+            os.unlink(self.socket_path)
+        self.scan_lock = asyncio.Lock()
+        # Create the socket owner-only from the start rather than chmod-ing it after bind
+        old_umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(self.handle_client, self.socket_path, limit=self.MAX_MESSAGE_SIZE)
+        finally:
+            os.umask(old_umask)
+        print(f"Indexer listening on {self.socket_path}: {len(self.track_paths)} tracks")
+        resume_folder = self.library_scanner.checkpoint.pending_folder()
+        if resume_folder:
+            # Finish a scan the previous daemon was killed in the middle of
+            self.resume_task = asyncio.get_running_loop().create_task(
+                self.handle_request({"op": "scan", "folder": resume_folder})
+            )
+            self.resume_task.add_done_callback(self.resume_finished)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            os.unlink(self.socket_path)
+
+    def resume_finished(self, task):
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Error resuming interrupted scan: {task.exception()}")
+
+    async def handle_client(self, reader, writer):
+        self.clients.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = json.loads(line)
+                try:
+                    reply = {"id": request["id"], "result": await self.handle_request(request)}
+                except Exception as e:
+                    reply = {"id": request.get("id"), "error": str(e)}
+                try:
+                    message = json.dumps(reply).encode("utf-8")
+                except (TypeError, ValueError) as e:
+                    print(f"Error encoding indexer reply: {e}")
+                    message = json.dumps({"id": request.get("id"), "error": str(e)}).encode("utf-8")
+                writer.write(message + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError) as e:
+            print(f"Error serving indexer client: {e}")
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+
+    async def handle_request(self, request):
+        op = request["op"]
+        if op == "library":
+            return self.library_snapshot()
+        if op == "playlists":
+            return self.playlist_manager.playlists
+        if op == "scan":
+            # One scan at a time; requests from other clients are still answered meanwhile
+            async with self.scan_lock:
+                track_paths, track_metadatas, moved = await asyncio.get_running_loop().run_in_executor(
+                    None, self.library_scanner.scan_library, request["folder"], self.library_index
+                )
+            if track_paths:
+                self.track_paths = track_paths
+                self.track_metadatas = track_metadatas
+                self.last_folder_path = request["folder"]
+                self.library_index = LibraryIndex(track_paths, track_metadatas)
+                write_library_file(self.library_file, track_paths, track_metadatas, self.last_folder_path)
+                self.broadcast("library", self.library_snapshot())
+                self.playlist_manager.relink(moved)
+                if self.playlist_manager.fill_track_stats(self.library_index):
+                    self.broadcast("playlists", self.playlist_manager.playlists)
+            self.library_scanner.finish_scan()
+            return {"count": len(track_paths), "moved": len(moved)}
+        if op == "import_index":
+            async with self.scan_lock:
+                track_paths, track_metadatas, summary = await asyncio.get_running_loop().run_in_executor(
+                    None, self.library_scanner.import_library_index, request["file"], request["root"]
+                )
+            if track_paths:
+                self.track_paths = track_paths
+                self.track_metadatas = track_metadatas
+                self.last_folder_path = request["root"]
+                self.library_index = LibraryIndex(track_paths, track_metadatas)
+                write_library_file(self.library_file, track_paths, track_metadatas, self.last_folder_path)
+                self.broadcast("library", self.library_snapshot())
+            return summary
+        if op == "update_metadata":
+            # Tags were written by a client; store them without rescanning
+            self.apply_metadata_updates(request["updates"])
+            write_library_file(self.library_file, self.track_paths, self.track_metadatas, self.last_folder_path)
+            self.broadcast("metadata", request["updates"])
+            self.playlist_manager.refresh_tracks(request["updates"])
+            return {"count": len(request["updates"])}
+        if op == "playlist":
+            method, args = request["method"], list(request.get("args", []))
+            if method not in self.PLAYLIST_METHODS:
+                raise ValueError(f"unknown playlist method {method}")
+            if method == "import_playlist":
+                # Resolve entries against the daemon's own library
+                args[1:2] = [self.library_index]
+            return getattr(self.playlist_manager, method)(*args)
+        raise ValueError(f"unknown request {op}")
+
+    def apply_metadata_updates(self, updates):
+        rows = {path: row for row, path in enumerate(self.track_paths)}
+        for path, metadata in updates.items():
+            if path in rows:
+                self.track_metadatas[rows[path]] = metadata
+                self.library_index.add(path, metadata)
+
+    def library_snapshot(self):
+        return {
+            "track_paths": self.track_paths,
+            "track_metadatas": self.track_metadatas,
+            "last_folder": self.last_folder_path
+        }
+
+    def broadcast(self, event, data):
+        try:
+            message = json.dumps({"event": event, "data": data}).encode("utf-8") + b"\n"
+        except (TypeError, ValueError) as e:
+            print(f"Error encoding indexer event: {e}")
+            return
+        for writer in list(self.clients):
+            writer.write(message)
+
+
+class IndexerClient(QObject):
+    """Connection to an IndexerDaemon
+
+    A reader thread collects replies and events. Events are handed to the GUI thread
+    in arrival order, and request() delivers everything that arrived before its
+    reply first, so the changes a request caused are visible when it returns.
+    """
+
+    event_received = pyqtSignal(str, object)
+    events_pending = pyqtSignal()
+
+    TIMEOUT = 10
+
+    def __init__(self, sock, parent=None):
+        super().__init__(parent)
+        self.sock = sock
+        self.stream = sock.makefile("rb")
+        self.write_lock = threading.Lock()
+        self.next_id = 0
+        self.replies = {}
+        self.events = deque()
+        self.events_pending.connect(self.dispatch_events)
+        self.thread = threading.Thread(target=self.read_loop, name="muse-indexer-client", daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def connect_to(cls, socket_path=None, parent=None):
+        """Connect to a running indexer; returns None when there is none"""
+        socket_path = socket_path or indexer_socket_path()
+        if not hasattr(socket, "AF_UNIX") or not os.path.exists(socket_path):
+            return None
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            sock.close()
+            return None
+        return cls(sock, parent)
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+    def read_loop(self):
+        try:
+            for line in self.stream:
+                message = json.loads(line)
+                if "event" in message:
+                    self.events.append((message["event"], message["data"]))
+                    self.events_pending.emit()
+                    continue
+                future = self.replies.pop(message["id"], None)
+                if future is None:
+                    continue
+                if "error" in message:
+                    future.set_exception(RuntimeError(message["error"]))
+                else:
+                    future.set_result(message["result"])
+        except (OSError, ValueError):
+            pass
+        for future in list(self.replies.values()):
+            future.set_exception(ConnectionError("indexer connection closed"))
+        self.replies.clear()
+        self.events.append(("disconnected", None))
+        self.events_pending.emit()
+
+    def dispatch_events(self):
+        while self.events:
+            event, data = self.events.popleft()
+            self.event_received.emit(event, data)
+
+    def request(self, op, args=None, timeout=TIMEOUT):
+        """Send a request and wait for its result; raises if the daemon reports an error
+
+        Long requests (scans, imports) can be made from a worker thread; their events
+        still reach the GUI thread, ahead of anything the thread emits afterwards.
+        """
+        future = concurrent.futures.Future()
+        with self.write_lock:
+            self.next_id += 1
+            self.replies[self.next_id] = future
+            message = dict(args or {}, id=self.next_id, op=op)
+            self.sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        result = future.result(timeout)
+        if threading.current_thread() is threading.main_thread():
+            # Worker threads leave events to the queued events_pending delivery
+            self.dispatch_events()
+        return result
+
+
+class IndexedPlaylistManager(PlaylistManager):
+    """PlaylistManager mirror whose mutations are carried out by the indexer daemon
+
+    The daemon's change events are applied to the local copy and re-emitted as the
+    usual signals, whichever client made the change.
+    """
+
+    def __init__(self, client, parent=None):
+        super().__init__(parent)
+        self.client = client
+        self.playlists = client.request("playlists")
+        client.event_received.connect(self.apply_event)
+
+    def load_playlists(self):
+        # The daemon owns the playlists file
+        self.playlists = {}
+
+    def save_playlists(self):
+        pass
+
+    def call(self, method, *args):
+        try:
+            return self.client.request("playlist", {"method": method, "args": list(args)})
+        except Exception as e:
+            print(f"Error updating playlists through the indexer: {e}")
+            return False
+
+    def apply_event(self, event, data):
+        if event == "tracks_inserted":
+            self.insert_rows(*data)
+        elif event == "tracks_removed":
+            self.delete_rows(*data)
+        elif event == "tracks_moved":
+            name, row, count, destination = data
+            tracks = self.playlists[name]
+            moving = tracks[row:row + count]
+            del tracks[row:row + count]
+            tracks[destination:destination] = moving
+            self.tracks_moved.emit(name, row, count, destination)
+        elif event == "playlists":
+            self.playlists = data
+            self.totals = {}
+            self.playlists_changed.emit()
+
+    def create_playlist(self, name):
+        return self.call("create_playlist", name)
+
+    def delete_playlist(self, name):
+        return self.call("delete_playlist", name)
+
+    def add_tracks(self, playlist_name, entries, row=None):
+        return self.call("add_tracks", playlist_name, [dict(entry) for entry in entries], row)
+
+    def remove_tracks(self, playlist_name, rows):
+        return self.call("remove_tracks", playlist_name, list(rows)) or 0
+
+    def move_tracks(self, playlist_name, row, count, destination):
+        return self.call("move_tracks", playlist_name, row, count, destination)
+
+    def dedupe_playlist(self, playlist_name):
+        return self.call("dedupe_playlist", playlist_name) or 0
+
+    def replace_tracks(self, playlist_name, entries):
+        return self.call("replace_tracks", playlist_name, [dict(entry) for entry in entries])
+
+    def import_playlist(self, filepath, library_index=None, name=None):
+        return self.call("import_playlist", os.path.abspath(filepath), None, name) or None
+
+    def relink(self, moved):
+        return self.call("relink", moved) or 0
+
+    def refresh_tracks(self, metadata_by_path):
+        return self.call("refresh_tracks", metadata_by_path) or 0
+
+    def fill_track_stats(self, library_index):
+        # The daemon fills entries against its own library
+        return 0
+
+
+class PlayHistory:
+    """Append-only play log with monthly and all-time per-track and per-artist rollups
+
+    Each play is an 8-byte (timestamp, track id) record appended to the log; track
+    ids index an append-only table of path/title/artist lines. Once enough records
+    pile up they are folded into the rollup file and the log is truncated, so
+    statistics never need the raw log. Plays not yet compacted are mirrored in
+    memory, so queries only merge counters. Tracks played back to back within a
+    session are also counted as co-listened pairs.
+    """
+
+    RECORD = struct.Struct("<II")
+    COMPACT_EVERY = 1000
+    SESSION_GAP = 30 * 60
+
+    def __init__(self):
+        home = os.path.expanduser("~")
+        self.log_file = os.path.join(home, ".muse_history.log")
+        self.tracks_file = os.path.join(home, ".muse_history_tracks.jsonl")
+        self.rollup_file = os.path.join(home, ".muse_history_rollup.json")
+        self.tracks = []
+        self.track_ids = {}
+        self.rollup = {"log_offset": 0, "tracks": {}, "artists": {}, "transitions": {}}
+        self.pending_tracks = {}
+        self.pending_artists = {}
+        self.pending_transitions = Counter()
+        self.pending_count = 0
+        self.last_play = None
+        self.load_history()
+
+    @staticmethod
+    def month_key(timestamp):
+        return time.strftime("%Y-%m", time.localtime(timestamp))
+
+    def load_history(self):
+        try:
+            if os.path.exists(self.tracks_file):
+                with open(self.tracks_file, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        path, title, artist = json.loads(line)
+                        self.track_ids[path] = len(self.tracks)
+                        self.tracks.append({"path": path, "title": title, "artist": artist})
+            if os.path.exists(self.rollup_file):
+                with open(self.rollup_file, 'r') as f:
+                    rollup = json.load(f)
+                for kind in ("tracks", "artists"):
+                    for month, counts in rollup[kind].items():
+                        if kind == "tracks":
+                            counts = {int(track_id): count for track_id, count in counts.items()}
+                        self.rollup[kind][month] = counts
+                self.rollup["log_offset"] = rollup["log_offset"]
+                for pair, count in rollup.get("transitions", {}).items():
+                    first, second = pair.split(",")
+                    self.rollup["transitions"][(int(first), int(second))] = count
+            # Only the uncompacted tail of the log is read back
+            for timestamp, track_id in self.iter_log(self.rollup["log_offset"]):
+                self.count_play(timestamp, track_id)
+        except Exception as e:
+            print(f"Error loading play history: {e}")
+
+    def iter_log(self, offset=0):
+        """Yield (timestamp, track id) records from the log, starting at a byte offset"""
+        if not os.path.exists(self.log_file):
+            return
+        if os.path.getsize(self.log_file) < offset:
+            # The log was truncated after a compaction that did not finish recording it
+            offset = self.rollup["log_offset"] = 0
+        with open(self.log_file, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        usable = len(data) - len(data) % self.RECORD.size
+        for timestamp, track_id in self.RECORD.iter_unpack(data[:usable]):
+            if track_id < len(self.tracks):
+                yield timestamp, track_id
+
+    def track_id(self, track):
+        track_id = self.track_ids.get(track["path"])
+        if track_id is None:
+            track_id = len(self.tracks)
+            entry = {"path": track["path"], "title": track["title"], "artist": track["artist"]}
+            with open(self.tracks_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps([entry["path"], entry["title"], entry["artist"]]) + "\n")
+            self.track_ids[entry["path"]] = track_id
+            self.tracks.append(entry)
+        return track_id
+
+    def count_play(self, timestamp, track_id):
+        month = self.month_key(timestamp)
+        artist = self.tracks[track_id]["artist"]
+        tracks = self.pending_tracks.setdefault(month, Counter())
+        tracks[track_id] += 1
+        if artist:
+            self.pending_artists.setdefault(month, Counter())[artist] += 1
+        if self.last_play:
+            last_timestamp, last_track_id = self.last_play
+            if last_track_id != track_id and 0 <= timestamp - last_timestamp <= self.SESSION_GAP:
+                self.pending_transitions[(min(last_track_id, track_id), max(last_track_id, track_id))] += 1
+        self.last_play = (timestamp, track_id)
+        self.pending_count += 1
+
+    def record(self, track, timestamp=None):
+        """Append a play of a path/title/artist track"""
+        timestamp = int(timestamp if timestamp is not None else time.time())
+        try:
+            track_id = self.track_id(track)
+            with open(self.log_file, 'ab') as f:
+                f.write(self.RECORD.pack(timestamp, track_id))
+        except Exception as e:
+            print(f"Error recording play: {e}")
+            return
+        self.count_play(timestamp, track_id)
+        if self.pending_count >= self.COMPACT_EVERY:
+            self.compact()
+
+    def write_rollup(self):
+        rollup_data = {
+            "log_offset": self.rollup["log_offset"],
+            "tracks": {month: {str(track_id): count for track_id, count in counts.items()}
+                       for month, counts in self.rollup["tracks"].items()},
+            "artists": self.rollup["artists"],
+            "transitions": {f"{first},{second}": count
+                            for (first, second), count in self.rollup["transitions"].items()}
+        }
+        temp_file = self.rollup_file + ".tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(rollup_data, f, separators=(",", ":"))
+        os.replace(temp_file, self.rollup_file)
+
+    def compact(self):
+        """Fold uncompacted plays into the rollups and truncate the log"""
+        if not self.pending_count:
+            return
+        for kind, pending in (("tracks", self.pending_tracks), ("artists", self.pending_artists)):
+            for month, counts in pending.items():
+                # "all" keeps all-time totals so those queries skip the monthly buckets
+                for key in (month, "all"):
+                    merged = Counter(self.rollup[kind].get(key, {}))
+                    merged.update(counts)
+                    self.rollup[kind][key] = dict(merged)
+        transitions = self.rollup["transitions"]
+        for pair, count in self.pending_transitions.items():
+            transitions[pair] = transitions.get(pair, 0) + count
+        try:
+            # Record the compacted log end before truncating, so a crash in between
+            # cannot count the same plays twice
+            self.rollup["log_offset"] = os.path.getsize(self.log_file)
+            self.write_rollup()
+            open(self.log_file, 'wb').close()
+            self.rollup["log_offset"] = 0
+            self.write_rollup()
+        except Exception as e:
+            print(f"Error compacting play history: {e}")
+        self.pending_tracks, self.pending_artists, self.pending_count = {}, {}, 0
+        self.pending_transitions = Counter()
+
+    def counts(self, kind, months=None):
+        rollup = self.rollup[kind]
+        pending = self.pending_tracks if kind == "tracks" else self.pending_artists
+        counts = Counter(rollup.get("all", {}) if months is None else {})
+        for month in months or []:
+            counts.update(rollup.get(month, {}))
+        for month in (pending if months is None else months):
+            counts.update(pending.get(month, {}))
+        return counts
+
+    def top_tracks(self, limit=100, months=None):
+        """Most played tracks as (track, plays), over the given "YYYY-MM" months or all time"""
+        top = heapq.nlargest(limit, self.counts("tracks", months).items(), key=lambda item: item[1])
+        return [(self.tracks[track_id], plays) for track_id, plays in top]
+
+    def top_artists(self, limit=100, months=None):
+        """Most played artists as (artist, plays), over the given "YYYY-MM" months or all time"""
+        return heapq.nlargest(limit, self.counts("artists", months).items(), key=lambda item: item[1])
+
+    def this_month(self):
+        return [self.month_key(time.time())]
+
+    def co_listened(self):
+        """Yield (path, path, count) for tracks played back to back"""
+        counts = Counter(self.rollup["transitions"])
+        counts.update(self.pending_transitions)
+        for (first, second), count in counts.items():
+            yield self.tracks[first]["path"], self.tracks[second]["path"], count
+
+
+class SimilarityEngine:
+    """Track similarity from feature vectors kept in a single NumPy matrix
+
+    Each row is a hashed bag of tag tokens (artist, album, folder, title words and
+    coarse audio properties) followed by a hashed co-listening profile from the play
+    history. Rows are L2-normalized, so a matrix product gives cosine similarity for
+    a whole batch of query tracks at once. The matrix grows geometrically, so adding
+    tracks only writes their rows.
+    """
+
+    TAG_DIMENSIONS = 192
+    CO_LISTEN_DIMENSIONS = 64
+    TAG_WEIGHTS = {"artist": 3.0, "album": 2.0, "folder": 1.0, "title": 0.5, "audio": 0.5}
+    CO_LISTEN_WEIGHT = 2.0
+
+    def __init__(self):
+        self.dimensions = self.TAG_DIMENSIONS + self.CO_LISTEN_DIMENSIONS
+        self.matrix = np.zeros((0, self.dimensions), dtype=np.float32)
+        self.count = 0
+        self.paths = []
+        self.rows = {}
+        self.slots = {}
+        self.co_listening = {}
+
+    def __len__(self):
+        return self.count
+
+    def slot(self, token, offset, size):
+        """Hash a token to a (column, sign) pair; the sign keeps collisions unbiased"""
+        key = (token, offset)
+        if key not in self.slots:
+            digest = zlib.crc32(token.encode("utf-8"))
+            self.slots[key] = (offset + (digest >> 1) % size, 1.0 if digest & 1 else -1.0)
+        return self.slots[key]
+
+    def set_co_listening(self, pairs):
+        """Load (path, path, count) pairs from the play history"""
+        self.co_listening = {}
+        for first, second, count in pairs:
+            self.co_listening.setdefault(first, Counter())[second] += count
+            self.co_listening.setdefault(second, Counter())[first] += count
+
+    def track_features(self, path, metadata):
+        tokens = []
+        if metadata.get("artist"):
+            tokens.append(("artist:" + metadata["artist"].lower(), self.TAG_WEIGHTS["artist"]))
+        if metadata.get("album"):
+            tokens.append(("album:" + metadata["album"].lower(), self.TAG_WEIGHTS["album"]))
+        folder = os.path.basename(os.path.dirname(path)).lower()
+        if folder:
+            tokens.append(("folder:" + folder, self.TAG_WEIGHTS["folder"]))
+        for word in metadata.get("title", "").lower().split():
+            if len(word) > 2:
+                tokens.append(("title:" + word, self.TAG_WEIGHTS["title"]))
+        tokens.append(("format:" + os.path.splitext(path)[1].lower(), self.TAG_WEIGHTS["audio"]))
+        if metadata.get("duration"):
+            tokens.append((f"length:{int(log1p(metadata['duration'] / 1000) * 2)}", self.TAG_WEIGHTS["audio"]))
+        if metadata.get("bitrate"):
+            tokens.append((f"bitrate:{metadata['bitrate'] // 64}", self.TAG_WEIGHTS["audio"]))
+
+        columns, values = [], []
+        for token, weight in tokens:
+            column, sign = self.slot(token, 0, self.TAG_DIMENSIONS)
+            columns.append(column)
+            values.append(sign * weight)
+        neighbours = self.co_listening.get(path)
+        if neighbours:
+            # A track's own slot lets direct neighbours overlap as well as shared ones
+            for neighbour, count in list(neighbours.items()) + [(path, max(neighbours.values()))]:
+                column, sign = self.slot(neighbour, self.TAG_DIMENSIONS, self.CO_LISTEN_DIMENSIONS)
+                columns.append(column)
+                values.append(sign * self.CO_LISTEN_WEIGHT * log1p(count))
+        return columns, values
+
+    def reserve(self, count):
+        if count > len(self.matrix):
+            grown = np.zeros((max(count, len(self.matrix) * 3 // 2, 1024), self.dimensions), dtype=np.float32)
+            grown[:self.count] = self.matrix[:self.count]
+            self.matrix = grown
+
+    def add_tracks(self, paths, metadatas):
+        """Add or refresh tracks, writing only their rows"""
+        new_rows = []
+        for path in paths:
+            row = self.rows.get(path)
+            if row is None:
+                row = self.rows[path] = len(self.paths)
+                self.paths.append(path)
+            new_rows.append(row)
+        self.reserve(len(self.paths))
+
+        row_index, column_index, values = [], [], []
+        for row, path, metadata in zip(new_rows, paths, metadatas):
+            columns, weights = self.track_features(path, metadata)
+            row_index.extend([row] * len(columns))
+            column_index.extend(columns)
+            values.extend(weights)
+        rows = np.array(new_rows, dtype=np.intp)
+        self.matrix[rows] = 0
+        np.add.at(self.matrix, (np.array(row_index, dtype=np.intp), np.array(column_index, dtype=np.intp)),
+                  np.array(values, dtype=np.float32))
+        norms = np.linalg.norm(self.matrix[rows], axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        self.matrix[rows] /= norms
+        self.count = len(self.paths)
+
+    def rebuild(self, paths, metadatas, co_listened=()):
+        self.matrix = np.zeros((0, self.dimensions), dtype=np.float32)
+        self.count = 0
+        self.paths = []
+        self.rows = {}
+        self.set_co_listening(co_listened)
+        self.add_tracks(paths, metadatas)
+
+    def similar_batch(self, paths, k=20):
+        """Top-k most similar tracks for each query path, as lists of (path, score)
+
+        Returns one list per path, in order; paths not in the engine get an empty list.
+        """
+        results = [[] for _ in paths]
+        known = [i for i, path in enumerate(paths) if path in self.rows]
+        if not known or self.count < 2 or k <= 0:
+            return results
+        query_rows = [self.rows[paths[i]] for i in known]
+        k = min(k, self.count - 1)
+        scores = self.matrix[query_rows] @ self.matrix[:self.count].T
+        scores[np.arange(len(query_rows)), query_rows] = -np.inf
+        top = np.argpartition(scores, -k, axis=1)[:, -k:]
+        for i, candidates in enumerate(top):
+            ordered = candidates[np.argsort(scores[i, candidates])[::-1]]
+            results[known[i]] = [(self.paths[row], float(scores[i, row])) for row in ordered]
+        return results
+
+    def similar(self, path, k=20):
+        return self.similar_batch([path], k)[0]
+
+
+class RemoteControlServer(QObject):
+    """Optional localhost HTTP + WebSocket remote control on its own asyncio loop
+
+    Requests are parsed on a background thread and handed to the GUI thread through
+    a queued signal, so player state is only ever touched from Qt. Events published
+    from the GUI thread just overwrite the latest value per event name; a fan-out
+    task sends whatever changed to every WebSocket client at most every
+    EVENT_INTERVAL seconds, so the GUI cost does not grow with the number of clients.
+
+    Every request must carry the per-session token from ~/.muse_remote_token, as
+    "Authorization: Bearer <token>" (or ?token= when opening /events, which
+    browsers cannot add headers to). The Host header must name the loopback
+    address, which defeats DNS rebinding, and requests from a browser page are
+    refused unless its Origin is the server itself or listed in allowed_origins.
+    """
+
+    command_received = pyqtSignal(str, dict, object)
+
+    EVENT_INTERVAL = 0.25
+    MAX_CLIENT_BUFFER = 256 * 1024
+    WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+    ROUTES = {
+        ("GET", "/state"): "state",
+        ("GET", "/queue"): "queue",
+        ("GET", "/library"): "library",
+        ("POST", "/play"): "play",
+        ("POST", "/pause"): "pause",
+        ("POST", "/toggle"): "toggle",
+        ("POST", "/next"): "next",
+        ("POST", "/previous"): "previous",
+        ("POST", "/seek"): "seek",
+        ("POST", "/volume"): "volume",
+        ("POST", "/queue/jump"): "jump",
+        ("POST", "/queue/play-next"): "play_next",
+    }
+
+    LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "[::1]")
+    # Command bodies are a few small JSON fields
+    MAX_BODY_SIZE = 64 * 1024
+
+    def __init__(self, player, host="127.0.0.1", port=8765, allowed_origins=()):
+        super().__init__(player)
+        self.player = player
+        self.host = host
+        self.port = port
+        self.allowed_origins = set(allowed_origins)
+        self.token = secrets.token_urlsafe(24)
+        self.token_file = os.path.join(os.path.expanduser("~"), ".muse_remote_token")
+        self.loop = None
+        self.thread = None
+        self.clients = set()
+        self.latest_events = {}
+        self.started = threading.Event()
+        self.command_received.connect(self.run_command)
+
+    # Server thread
+    def start(self):
+        """Start serving; returns the bound port (useful with port 0)"""
+        self.thread = threading.Thread(target=self.run_loop, name="muse-remote", daemon=True)
+        self.thread.start()
+        self.started.wait(5)
+        return self.port
+
+    def stop(self):
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread:
+            self.thread.join(5)
+
+    def run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            server = self.loop.run_until_complete(
+                asyncio.start_server(self.handle_connection, self.host, self.port)
+            )
+            self.port = server.sockets[0].getsockname()[1]
+            self.write_token()
+            fan_out_task = self.loop.create_task(self.fan_out())
+            print(f"Remote control listening on http://{self.host}:{self.port}")
+        except Exception as e:
+            print(f"Error starting remote control: {e}")
+            self.started.set()
+            return
+        self.started.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            server.close()
+            for writer in list(self.clients):
+                writer.close()
+            fan_out_task.cancel()
+            self.loop.run_until_complete(asyncio.gather(fan_out_task, return_exceptions=True))
+            self.loop.close()
+
+    def write_token(self):
+        """Publish the session token to local clients only"""
+        descriptor = os.open(self.token_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(descriptor, 'w') as f:
+            os.fchmod(f.fileno(), 0o600)
+            f.write(self.token)
+
+    def refusal(self, headers, target):
+        """Status and message for a request that must not reach the player, or None"""
+        host = headers.get("host", "")
+        if host.rsplit(":", 1)[0] not in self.LOOPBACK_HOSTS and host not in self.LOOPBACK_HOSTS:
+            return 403, "host not allowed"
+        origin = headers.get("origin")
+        own_origins = {f"http://{name}:{self.port}" for name in self.LOOPBACK_HOSTS}
+        if origin is not None and origin not in own_origins | self.allowed_origins:
+            return 403, "origin not allowed"
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" and target.path == "/events":
+            token = parse_qs(target.query).get("token", [""])[-1]
+        if not hmac.compare_digest(token.encode("utf-8"), self.token.encode("utf-8")):
+            return 401, "missing or wrong token"
+        return None
+
+    async def handle_connection(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if len(request_line) < 2:
+                return
+            method, target = request_line[0].upper(), urlsplit(request_line[1])
+
+            # Check the caller before reading anything it sent after the headers
+            refusal = self.refusal(headers, target)
+            if refusal:
+                await self.send_response(writer, refusal[0], {"error": refusal[1]})
+                return
+            content_length = int(headers.get("content-length", "0") or 0)
+            if content_length < 0:
+                await self.send_response(writer, 400, {"error": "invalid Content-Length"})
+                return
+            if content_length > self.MAX_BODY_SIZE:
+                await self.send_response(writer, 413, {"error": "request body too large"})
+                return
+            body = await reader.readexactly(content_length) if content_length else b""
+            if body and headers.get("content-type", "").split(";")[0].strip() != "application/json":
+                await self.send_response(writer, 415, {"error": "request bodies must be application/json"})
+                return
+
+            if target.path == "/events" and headers.get("upgrade", "").lower() == "websocket":
+                await self.serve_websocket(reader, writer, headers)
+                return
+
+            route = self.ROUTES.get((method, target.path))
+            if route is None:
+                await self.send_response(writer, 404, {"error": "not found"})
+                return
+            args = {key: values[-1] for key, values in parse_qs(target.query).items() if key != "token"}
+            if body:
+                args.update(json.loads(body))
+            future = concurrent.futures.Future()
+            self.command_received.emit(route, args, future)
+            result = await asyncio.wrap_future(future)
+            await self.send_response(writer, 200, result)
+        except Exception as e:
+            try:
+                await self.send_response(writer, 400, {"error": str(e)})
+            except Exception:
+                pass
+        finally:
+            if writer not in self.clients:
+                writer.close()
+
+    async def send_response(self, writer, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        reason = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden",
+                  404: "Not Found", 413: "Payload Too Large", 415: "Unsupported Media Type"}[status]
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+    async def serve_websocket(self, reader, writer, headers):
+        accept = base64.b64encode(
+            hashlib.sha1((headers["sec-websocket-key"] + self.WEBSOCKET_GUID).encode("latin-1")).digest()
+        ).decode("latin-1")
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode("latin-1")
+        )
+        # New clients get the current snapshot straight away
+        for event, data in list(self.latest_events.items()):
+            writer.write(self.websocket_frame({"event": event, "data": data}))
+        await writer.drain()
+        self.clients.add(writer)
+        try:
+            while True:
+                header = await reader.readexactly(2)
+                opcode, length = header[0] & 0x0F, header[1] & 0x7F
+                if length == 126:
+                    length = struct.unpack(">H", await reader.readexactly(2))[0]
+                elif length == 127:
+                    length = struct.unpack(">Q", await reader.readexactly(8))[0]
+                mask = await reader.readexactly(4) if header[1] & 0x80 else b""
+                payload = await reader.readexactly(length)
+                if mask:
+                    payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+                if opcode == 0x8:
+                    writer.write(b"\x88\x00")
+                    break
+                if opcode == 0x9:
+                    writer.write(bytes([0x8A, len(payload)]) + payload)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+
+    @staticmethod
+    def websocket_frame(message):
+        payload = json.dumps(message).encode("utf-8")
+        if len(payload) < 126:
+            header = bytes([0x81, len(payload)])
+        elif len(payload) < 65536:
+            header = bytes([0x81, 126]) + struct.pack(">H", len(payload))
+        else:
+            header = bytes([0x81, 127]) + struct.pack(">Q", len(payload))
+        return header + payload
+
+    async def fan_out(self):
+        sent = {}
+        while True:
+            await asyncio.sleep(self.EVENT_INTERVAL)
+            changed = [(event, data) for event, data in list(self.latest_events.items())
+                       if sent.get(event) is not data]
+            if not changed or not self.clients:
+                continue
+            frames = b"".join(self.websocket_frame({"event": event, "data": data}) for event, data in changed)
+            for event, data in changed:
+                sent[event] = data
+            for writer in list(self.clients):
+                # Slow clients miss intermediate updates rather than buffering them
+                if writer.transport.get_write_buffer_size() < self.MAX_CLIENT_BUFFER:
+                    writer.write(frames)
+
+    # GUI thread
+    def publish(self, event, data):
+        """Record the latest value of an event; fan-out happens on the server loop"""
+        self.latest_events[event] = data
+
+    def run_command(self, name, args, future):
+        try:
+            future.set_result(getattr(self, "command_" + name)(args))
+        except Exception as e:
+            future.set_exception(e)
+
+    def command_state(self, args):
+        player = self.player
+        index = player.media_playlist.currentIndex()
+        return {
+            "state": {QMediaPlayer.PlayingState: "playing", QMediaPlayer.PausedState: "paused"}.get(
+                player.player.state(), "stopped"),
+            "position": player.player.position(),
+            "duration": player.player.duration(),
+            "volume": player.player.volume(),
+            "index": index,
+            "track": player.play_queue[index] if 0 <= index < len(player.play_queue) else None,
+        }
+
+    def command_queue(self, args):
+        offset, limit = int(args.get("offset", 0)), int(args.get("limit", 100))
+        queue = self.player.play_queue
+        rows = range(offset, min(offset + limit, len(queue)))
+        return {"total": len(queue), "offset": offset, "tracks": [queue[row] for row in rows]}
+
+    def command_library(self, args):
+        query = args.get("q", "").lower()
+        offset, limit = int(args.get("offset", 0)), int(args.get("limit", 100))
+        matches = [
+            make_track_entry(path, metadata)
+            for path, metadata in zip(self.player.track_paths, self.player.track_metadatas)
+            if query in metadata["title"].lower() or query in metadata["artist"].lower()
+        ]
+        return {"total": len(matches), "offset": offset, "tracks": matches[offset:offset + limit]}
+
+    def command_play(self, args):
+        if self.player.player.state() != QMediaPlayer.PlayingState:
+            self.player.play_pause()
+        return self.command_state(args)
+
+    def command_pause(self, args):
+        if self.player.player.state() == QMediaPlayer.PlayingState:
+            self.player.play_pause()
+        return self.command_state(args)
+
+    def command_toggle(self, args):
+        self.player.play_pause()
+        return self.command_state(args)
+
+    def command_next(self, args):
+        self.player.next_song()
+        return self.command_state(args)
+
+    def command_previous(self, args):
+        self.player.prev_song()
+        return self.command_state(args)
+
+    def command_seek(self, args):
+        self.player.set_position(int(args["position"]))
+        return self.command_state(args)
+
+    def command_volume(self, args):
+        self.player.volume_slider.setValue(int(args["value"]))
+        return self.command_state(args)
+
+    def command_jump(self, args):
+        row = int(args["row"])
+        if not 0 <= row < len(self.player.play_queue):
+            raise ValueError("queue row out of range")
+        self.player.media_playlist.setCurrentIndex(row)
+        return self.command_play(args)
+
+    def command_play_next(self, args):
+        path = args["path"]
+        metadata = self.player.library_index.get_metadata(path) or self.player.extract_metadata(path)
+        self.player.play_queue.play_next([make_track_entry(path, metadata)])
+        return self.command_queue({"offset": 0, "limit": 0})
+
+
+def make_track_entry(track_path, track_metadata):
+    """Build the path/title/artist record shared by playlists and the play queue
+
+    Fingerprint, duration and size ride along when known, so entries can be
+    relinked and totalled without going back to the library or the file.
+    """
+    entry = {
+        "path": track_path,
+        "title": track_metadata["title"],
+        "artist": track_metadata["artist"]
+    }
+    for field in TRACK_ENTRY_EXTRAS:
+        if track_metadata.get(field):
+            entry[field] = track_metadata[field]
+    return entry
+
+
+class PlayQueue(QObject):
+    """Ordered play queue stored in blocks so inserts, moves and removals stay cheap
+
+    Entries are the same path/title/artist dicts used by playlists. Every change is
+    announced through a signal so the media playlist and the list widget can apply
+    just that change instead of being rebuilt.
+    """
+
+    inserted = pyqtSignal(int, list)
+    removed = pyqtSignal(int, int)
+    moved = pyqtSignal(int, int)
+    changed = pyqtSignal(int)
+    reset = pyqtSignal()
+
+    MIN_BLOCK_SIZE = 64
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.blocks = []
+        self.count = 0
+        self.current_index = -1
+        self.position = 0
+        self.queue_file = os.path.join(os.path.expanduser("~"), ".muse_queue.json")
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for block in self.blocks:
+            yield from block
+
+    def __getitem__(self, row):
+        block, offset = self.locate(row)
+        return self.blocks[block][offset]
+
+    def block_size(self):
+        return max(self.MIN_BLOCK_SIZE, isqrt(self.count))
+
+    def locate(self, row):
+        """Return (block, offset) for a row, walking block lengths instead of entries"""
+        if row < 0 or row >= self.count:
+            raise IndexError("queue index out of range")
+        for block, entries in enumerate(self.blocks):
+            if row < len(entries):
+                return block, row
+            row -= len(entries)
+        raise IndexError("queue index out of range")
+
+    def rebalance(self):
+        """Repack all entries into evenly sized blocks"""
+        entries = list(self)
+        size = self.block_size()
+        self.blocks = [entries[i:i + size] for i in range(0, len(entries), size)]
+
+    def split_block(self, block):
+        entries = self.blocks[block]
+        size = self.block_size()
+        if len(entries) > 2 * size:
+            self.blocks[block:block + 1] = [entries[i:i + size] for i in range(0, len(entries), size)]
+
+    def store(self, row, entries):
+        if row == self.count:
+            if not self.blocks:
+                self.blocks.append([])
+            block, offset = len(self.blocks) - 1, len(self.blocks[-1])
+        else:
+            block, offset = self.locate(row)
+        self.blocks[block][offset:offset] = entries
+        self.count += len(entries)
+        self.split_block(block)
+
+    def insert(self, row, entries):
+        """Insert entries before row (row == len(queue) appends)"""
+        entries = list(entries)
+        if not entries:
+            return
+        row = max(0, min(row, self.count))
+        self.store(row, entries)
+        if 0 <= row <= self.current_index:
+            self.current_index += len(entries)
+        self.inserted.emit(row, entries)
+
+    def append(self, entries):
+        self.insert(self.count, entries)
+
+    def play_next(self, entries):
+        """Insert entries right after the current track"""
+        self.insert(self.current_index + 1, entries)
+
+    def take(self, row, count):
+        removed = []
+        while count > 0:
+            block, offset = self.locate(row)
+            entries = self.blocks[block]
+            chunk = entries[offset:offset + count]
+            del entries[offset:offset + count]
+            if not entries:
+                del self.blocks[block]
+            removed.extend(chunk)
+            self.count -= len(chunk)
+            count -= len(chunk)
+        if len(self.blocks) > 2 * (self.count // self.block_size() + 1):
+            self.rebalance()
+        return removed
+
+    def remove(self, row, count=1):
+        """Remove count entries starting at row"""
+        count = min(count, self.count - row)
+        if row < 0 or count <= 0:
+            return
+        self.take(row, count)
+        if self.current_index >= row + count:
+            self.current_index -= count
+        elif self.current_index >= row:
+            self.current_index = -1
+        self.removed.emit(row, count)
+
+    def move(self, source, destination):
+        """Move one entry so that it ends up at row destination"""
+        if source == destination or not (0 <= source < self.count and 0 <= destination < self.count):
+            return
+        entry = self.take(source, 1)
+        self.store(destination, entry)
+        if self.current_index == source:
+            self.current_index = destination
+        elif source < self.current_index <= destination:
+            self.current_index -= 1
+        elif destination <= self.current_index < source:
+            self.current_index += 1
+        self.moved.emit(source, destination)
+
+    def replace(self, entries, current_index=-1):
+        """Swap in a whole new queue"""
+        self.blocks = []
+        self.count = 0
+        entries = list(entries)
+        if entries:
+            self.blocks = [entries]
+            self.count = len(entries)
+            self.rebalance()
+        self.current_index = current_index
+        self.position = 0
+        self.reset.emit()
+
+    def clear(self):
+        self.replace([])
+
+    def refresh(self, metadata_by_path):
+        """Update title/artist of entries whose tracks were re-tagged"""
+        for row, entry in enumerate(self):
+            metadata = metadata_by_path.get(entry["path"])
+            if metadata is not None:
+                entry.update(make_track_entry(entry["path"], metadata))
+                self.changed.emit(row)
+
+    def index_of(self, path):
+        for row, entry in enumerate(self):
+            if entry["path"] == path:
+                return row
+        return -1
+
+    def load_queue(self):
+        try:
+            if os.path.exists(self.queue_file):
+                with open(self.queue_file, 'r') as f:
+                    data = json.load(f)
+                self.replace(data.get("entries", []), data.get("current", -1))
+                self.position = data.get("position", 0)
+        except Exception as e:
+            print(f"Error loading queue: {e}")
+
+    def save_queue(self):
+        data = {
+            "entries": list(self),
+            "current": self.current_index,
+            "position": self.position
+        }
+        try:
+            with open(self.queue_file, 'w') as f:
+                json.dump(data, f, separators=(",", ":"))
+        except Exception as e:
+            print(f"Error saving queue: {e}")
+
+
+class QueuePrefetcher:
+    """Warms the page cache for the next tracks in the queue on a background thread
+
+    Local files first get a posix_fadvise(WILLNEED) hint so the kernel queues the
+    whole read at once; every file is then read through in chunks, and only counts
+    as warm once that read has finished. Each schedule() supersedes the previous
+    one, so reads for a queue that has since changed stop at the next chunk. Hits
+    and time-to-play are counted so the effect can be measured.
+    """
+
+    LOOKAHEAD = 3
+    BYTE_BUDGET = 64 * 1024 * 1024
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, byte_budget=BYTE_BUDGET, lookahead=LOOKAHEAD, chunked=False):
+        self.byte_budget = byte_budget
+        self.lookahead = lookahead
+        # High-latency mode skips the fadvise hint, which NFS/SMB clients may ignore
+        self.chunked = chunked
+        self.condition = threading.Condition()
+        self.generation = 0
+        self.pending = []
+        self.stopped = False
+        self.warm = {}
+        self.bytes_prefetched = 0
+        self.hits = 0
+        self.misses = 0
+        self.play_times = {True: [], False: []}
+        self.started_at = None
+        self.started_hit = False
+        self.thread = threading.Thread(target=self.run, name="muse-prefetch", daemon=True)
+        self.thread.start()
+
+    def schedule(self, paths):
+        """Prefetch these paths in order, replacing whatever was scheduled before"""
+        paths = list(paths)[:self.lookahead]
+        with self.condition:
+            self.generation += 1
+            self.pending = paths
+            # Files that left the look-ahead window may be evicted by now
+            self.warm = {path: size for path, size in self.warm.items() if path in paths}
+            self.condition.notify()
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.generation += 1
+            self.condition.notify()
+        self.thread.join(1)
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.stopped:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                generation, paths, self.pending = self.generation, self.pending, []
+            budget = self.byte_budget
+            for path in paths:
+                if budget <= 0 or generation != self.generation:
+                    break
+                if path in self.warm:
+                    budget -= self.warm[path]
+                    continue
+                try:
+                    warmed = self.warm_file(path, budget, generation)
+                except OSError as e:
+                    print(f"Error prefetching track: {e}")
+                    continue
+                if warmed is None:
+                    break
+                with self.condition:
+                    if generation == self.generation:
+                        self.warm[path] = warmed
+                self.bytes_prefetched += warmed
+                budget -= warmed
+
+    def warm_file(self, path, budget, generation):
+        """Warm up to budget bytes of a file; returns the bytes covered, or None if cancelled"""
+        with open(path, 'rb', buffering=0) as f:
+            size = min(os.fstat(f.fileno()).st_size, budget)
+            if not self.chunked and hasattr(os, "posix_fadvise") and not is_network_path(path):
+                # The hint returns before the kernel has read anything, so it only
+                # gets the I/O going; the reads below wait for it to land
+                os.posix_fadvise(f.fileno(), 0, size, os.POSIX_FADV_WILLNEED)
+            buffer = memoryview(bytearray(min(self.CHUNK_SIZE, size)))
+            done = 0
+            while done < size:
+                if generation != self.generation:
+                    return None
+                read = f.readinto(buffer[:size - done])
+                if not read:
+                    break
+                done += read
+            return done
+
+    # Instrumentation, called from the GUI thread
+    def track_started(self, path):
+        hit = path in self.warm
+        self.hits += hit
+        self.misses += not hit
+        self.started_at, self.started_hit = time.perf_counter(), hit
+
+    def track_skipped(self):
+        """Forget a start still waiting for its media; the queue moved on first"""
+        self.started_at = None
+
+    def track_ready(self):
+        if self.started_at is not None:
+            self.play_times[self.started_hit].append((time.perf_counter() - self.started_at) * 1000)
+            self.started_at = None
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "bytes_prefetched": self.bytes_prefetched,
+            "time_to_play_hit_ms": sum(self.play_times[True]) / len(self.play_times[True]) if self.play_times[True] else None,
+            "time_to_play_miss_ms": sum(self.play_times[False]) / len(self.play_times[False]) if self.play_times[False] else None,
+        }
+
+    def report(self):
+        stats = self.stats()
+        def average(value):
+            return "n/a" if value is None else f"{value:.0f} ms"
+        return (f"Prefetch: {stats['hits']}/{stats['hits'] + stats['misses']} track starts warm "
+                f"({stats['hit_rate']:.0%}), {stats['bytes_prefetched'] / 1048576:.1f} MB read ahead, "
+                f"time to play {average(stats['time_to_play_hit_ms'])} warm / "
+                f"{average(stats['time_to_play_miss_ms'])} cold")
+
+
+class UiUpdateScheduler(QObject):
+    """Coalesces UI refresh requests and flushes them at most once per frame
+
+    Callers schedule a callback under a key; repeated requests for the same key
+    before the next flush collapse into one call. While paused (window hidden or
+    minimized) requests are only recorded and flushed on resume.
+    """
+
+    FRAME_INTERVAL_MS = 33
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pending = {}
+        self.paused = False
+        self.requested_count = 0
+        self.flushed_count = 0
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.FRAME_INTERVAL_MS)
+        self.timer.timeout.connect(self.flush)
+
+    def schedule(self, key, callback):
+        self.requested_count += 1
+        self.pending[key] = callback
+        if not self.paused and not self.timer.isActive():
+            self.timer.start()
+
+    def pause(self):
+        self.paused = True
+        self.timer.stop()
+
+    def resume(self):
+        self.paused = False
+        if self.pending and not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        pending, self.pending = self.pending, {}
+        for callback in pending.values():
+            self.flushed_count += 1
+            callback()
+
+
+class AlbumArtTask(QRunnable):
+    """Worker-thread job: fetch cover bytes and decode them straight to the target size"""
+
+    def __init__(self, loader, key, load_bytes, size):
+        super().__init__()
+        self.loader = loader
+        self.key = key
+        self.load_bytes = load_bytes
+        self.size = size
+
+    def run(self):
+        image = QImage()
+        try:
+            data = self.load_bytes()
+            if data:
+                buffer = QBuffer()
+                buffer.setData(QByteArray(data))
+                buffer.open(QIODevice.ReadOnly)
+                reader = QImageReader(buffer)
+                # The header gives the full size without decoding; the decoder then
+                # only produces the scaled image (JPEG decodes at reduced size)
+                original_size = reader.size()
+                if original_size.isValid():
+                    reader.setScaledSize(original_size.scaled(self.size, Qt.KeepAspectRatio))
+                image = reader.read()
+        except Exception as e:
+            print(f"Error decoding album art: {e}")
+        self.loader.decoded.emit(self.key, image)
+
+
+class AlbumArtLoader(QObject):
+    """Decodes covers on a thread pool and keeps recent ones in a pixel-budgeted LRU cache
+
+    request() answers from the cache when it can; otherwise the decode runs off
+    the GUI thread and art_ready fires with a QImage once it is done. Failed or
+    missing covers are cached as null images so they are not retried.
+    """
+
+    decoded = pyqtSignal(str, QImage)
+    art_ready = pyqtSignal(str, QImage)
+
+    MAX_CACHE_PIXELS = 200 * 200 * 64
+
+    def __init__(self, parent=None, max_cache_pixels=MAX_CACHE_PIXELS, max_threads=2):
+        super().__init__(parent)
+        self.max_cache_pixels = max_cache_pixels
+        self.cache = OrderedDict()
+        self.cache_pixels = 0
+        self.in_flight = set()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self.decoded.connect(self.store)
+
+    @staticmethod
+    def image_pixels(image):
+        return max(1, image.width() * image.height())
+
+    def cached(self, key):
+        image = self.cache.get(key)
+        if image is not None:
+            self.cache.move_to_end(key)
+        return image
+
+    def request(self, key, load_bytes, size=QSize(200, 200)):
+        """Return the cached image for key, or None after queuing a decode"""
+        image = self.cached(key)
+        if image is not None:
+            return image
+        if key not in self.in_flight:
+            self.in_flight.add(key)
+            self.pool.start(AlbumArtTask(self, key, load_bytes, size))
+        return None
+
+    def cancel_pending(self):
+        """Drop decodes that have not started yet"""
+        self.pool.clear()
+        self.in_flight.clear()
+
+    def evict(self, key):
+        image = self.cache.pop(key, None)
+        if image is not None:
+            self.cache_pixels -= self.image_pixels(image)
+
+    def store(self, key, image):
+        self.in_flight.discard(key)
+        self.evict(key)
+        self.cache[key] = image
+        self.cache_pixels += self.image_pixels(image)
+        while self.cache_pixels > self.max_cache_pixels and len(self.cache) > 1:
+            self.evict(next(iter(self.cache)))
+        self.art_ready.emit(key, image)
+
+
+def group_albums(track_paths, track_metadatas):
+    """Group library tracks into albums by album tag and folder, sorted by artist and title
+
+    Tracks without an album tag are grouped by folder name. The cover is taken from
+    the album's first track with embedded art.
+    """
+    albums = {}
+    for path, metadata in zip(track_paths, track_metadatas):
+        folder = os.path.dirname(path)
+        title = metadata.get("album") or os.path.basename(folder) or "Unknown Album"
+        key = (title.lower(), folder)
+        album = albums.get(key)
+        if album is None:
+            album = albums[key] = {
+                "title": title, "artist": metadata["artist"], "paths": [], "cover": path,
+                # Libraries saved before art refs were recorded may still have a cover
+                "has_art": bool(metadata.get("album_art_ref")) or "album_art_ref" not in metadata
+            }
+        elif album["artist"] != metadata["artist"]:
+            album["artist"] = "Various Artists"
+        album["paths"].append(path)
+        if not album["has_art"] and metadata.get("album_art_ref"):
+            album["cover"], album["has_art"] = path, True
+    return sorted(albums.values(), key=lambda album: (album["artist"].lower(), album["title"].lower()))
 
-    def load_playlists(self):
-        try:
-            if os.path.exists(self.playlists_file):
-                with open(self.playlists_file, 'r') as f:
-                    self.playlists = json.load(f)
-                    
-                if not self.playlists:
-                    self.playlists = {"Default": []}
-            else:
-                self.playlists = {"Default": []}
-        except Exception as e:
-            print(f"Error loading playlists: {e}")
-            self.playlists = {"Default": []}
 
-    def save_playlists(self):
+class ThumbnailCache:
+    """Small JPEG covers under ~/.muse_thumbnails, keyed by track fingerprint or path
+
+    Decoding a full-size embedded cover costs far more than reading a few KB, so the
+    album grid decodes each cover once, scaled down, and reuses it across sessions.
+    load() runs on worker threads; writes go through a temporary file.
+    """
+
+    SIZE = 160
+    QUALITY = 85
+
+    def __init__(self, size=SIZE):
+        self.cache_dir = os.path.join(os.path.expanduser("~"), ".muse_thumbnails")
+        self.size = size
+
+    def cache_file(self, key):
+        name = hashlib.blake2b(f"{key}\0{self.size}".encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir, name[:2], name + ".jpg")
+
+    def load(self, key, load_bytes):
+        """Return thumbnail bytes for key, making them from load_bytes() on a miss"""
+        cache_file = self.cache_file(key)
         try:
-            with open(self.playlists_file, 'w') as f:
-                json.dump(self.playlists, f)
+            with open(cache_file, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            pass
         except Exception as e:
-            print(f"Error saving playlists: {e}")
+            print(f"Error reading thumbnail: {e}")
 
-    def create_playlist(self, name):
-        if name not in self.playlists:
-            self.playlists[name] = []
-            self.save_playlists()
-            return True
-        return False
+        data = load_bytes()
+        thumbnail = self.make_thumbnail(data) if data else None
+        if thumbnail:
+            try:
+                os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+                temporary = f"{cache_file}.{threading.get_ident()}.tmp"
+                with open(temporary, 'wb') as f:
+                    f.write(thumbnail)
+                os.replace(temporary, cache_file)
+            except Exception as e:
+                print(f"Error writing thumbnail: {e}")
+        return thumbnail
 
-    def add_to_playlist(self, playlist_name, track_path, track_metadata):
-        if playlist_name in self.playlists:
-            track_info = {
-                "path": track_path,
-                "title": track_metadata["title"],
-                "artist": track_metadata["artist"]
-            }
-            self.playlists[playlist_name].append(track_info)
-            self.save_playlists()
-            return True
-        return False
+    def make_thumbnail(self, data):
+        buffer = QBuffer()
+        buffer.setData(QByteArray(data))
+        buffer.open(QIODevice.ReadOnly)
+        reader = QImageReader(buffer)
+        original_size = reader.size()
+        if original_size.isValid():
+            reader.setScaledSize(original_size.scaled(QSize(self.size, self.size), Qt.KeepAspectRatio))
+        image = reader.read()
+        if image.isNull():
+            return None
+        output = QBuffer()
+        output.open(QIODevice.WriteOnly)
+        image.save(output, "JPEG", self.QUALITY)
+        return bytes(output.data())
 
-    def remove_from_playlist(self, playlist_name, index):
-        if playlist_name in self.playlists and 0 <= index < len(self.playlists[playlist_name]):
-            self.playlists[playlist_name].pop(index)
-            self.save_playlists()
-            return True
-        return False
 
-    def delete_playlist(self, name):
-        if name in self.playlists and name != "Default":
-            del self.playlists[name]
-            self.save_playlists()
-            return True
-        return False
+class AlbumGridModel(QAbstractListModel):
+    """Albums for the grid view, holding covers only for rows near the viewport
 
-    def get_playlist(self, name):
-        return self.playlists.get(name, [])
+    The view reports the rows it shows through set_visible_range(). Covers for those
+    rows, then a margin either side, are queued on a thumbnail loader and decodes
+    still queued for rows scrolled past are dropped. Pixmaps for rows more than
+    KEEP_ROWS away are released, so memory stays bounded however large the library.
+    """
 
-    def get_playlist_names(self):
-        return list(self.playlists.keys())
+    THUMBNAIL_SIZE = ThumbnailCache.SIZE
+    PREFETCH_ROWS = 24
+    KEEP_ROWS = 96
+    MAX_CACHE_PIXELS = THUMBNAIL_SIZE * THUMBNAIL_SIZE * 256
+
+    def __init__(self, load_thumbnail, placeholder, parent=None):
+        super().__init__(parent)
+        self.albums = []
+        self.rows_by_cover = {}
+        self.pixmaps = {}
+        self.visible_range = (0, -1)
+        self.load_thumbnail = load_thumbnail
+        self.placeholder = placeholder.scaled(
+            self.THUMBNAIL_SIZE, self.THUMBNAIL_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation
+        )
+        self.loader = AlbumArtLoader(self, self.MAX_CACHE_PIXELS)
+        self.loader.art_ready.connect(self.thumbnail_ready)
+
+    def set_albums(self, albums):
+        """Show albums; when the grouping is unchanged rows are updated in place, keeping covers"""
+        if [album["paths"] for album in albums] == [album["paths"] for album in self.albums]:
+            old_albums, self.albums = self.albums, albums
+            self.rows_by_cover = {album["cover"]: row for row, album in enumerate(albums)}
+            covers_changed = False
+            for row, (old, new) in enumerate(zip(old_albums, albums)):
+                if old == new:
+                    continue
+                if (old["cover"], old["has_art"]) != (new["cover"], new["has_art"]):
+                    self.pixmaps.pop(row, None)
+                    covers_changed = True
+                index = self.index(row)
+                self.dataChanged.emit(index, index)
+            if covers_changed:
+                self.request_thumbnails()
+            return
+        self.beginResetModel()
+        self.loader.cancel_pending()
+        self.albums = albums
+        self.rows_by_cover = {album["cover"]: row for row, album in enumerate(albums)}
+        self.pixmaps = {}
+        self.visible_range = (0, -1)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.albums)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.albums):
+            return None
+        album = self.albums[index.row()]
+        if role == Qt.DisplayRole:
+            return f"{album['title']}\n{album['artist']}"
+        if role == Qt.DecorationRole:
+            return self.pixmaps.get(index.row(), self.placeholder)
+        if role == Qt.ToolTipRole:
+            return f"{album['title']} - {album['artist']} ({len(album['paths'])} songs)"
+        return None
+
+    def set_visible_range(self, first, last):
+        first, last = max(0, first), min(last, len(self.albums) - 1)
+        if (first, last) == self.visible_range:
+            return
+        self.visible_range = (first, last)
+        for row in [row for row in self.pixmaps if not first - self.KEEP_ROWS <= row <= last + self.KEEP_ROWS]:
+            del self.pixmaps[row]
+        self.request_thumbnails()
+
+    def request_thumbnails(self):
+        """Queue covers missing around the visible range: visible rows first, then just below and above"""
+        first, last = self.visible_range
+        self.loader.cancel_pending()
+        rows = list(range(first, last + 1))
+        rows += range(last + 1, last + 1 + self.PREFETCH_ROWS)
+        rows += range(first - 1, first - 1 - self.PREFETCH_ROWS, -1)
+        for row in rows:
+            if 0 <= row < len(self.albums) and row not in self.pixmaps and self.albums[row]["has_art"]:
+                cover = self.albums[row]["cover"]
+                image = self.loader.request(
+                    cover, functools.partial(self.load_thumbnail, cover),
+                    QSize(self.THUMBNAIL_SIZE, self.THUMBNAIL_SIZE)
+                )
+                if image is not None:
+                    self.set_thumbnail(row, image)
+
+    def thumbnail_ready(self, cover, image):
+        row = self.rows_by_cover.get(cover)
+        first, last = self.visible_range
+        if row is not None and first - self.KEEP_ROWS <= row <= last + self.KEEP_ROWS:
+            self.set_thumbnail(row, image)
+
+    def set_thumbnail(self, row, image):
+        self.pixmaps[row] = self.placeholder if image.isNull() else QPixmap.fromImage(image)
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.DecorationRole])
 
 
 class SearchDialog(QDialog):
@@ -268,8 +3807,74 @@ class SearchDialog(QDialog):
         return -1
 
 
+class TagEditDialog(QDialog):
+    """Edit title, artist and album for one or more tracks
+
+    Fields shared by every selected track are filled in; the others show as
+    multiple values. Only fields the user changed are returned by changes().
+    """
+
+    FIELDS = (("title", "Title"), ("artist", "Artist"), ("album", "Album"))
+
+    def __init__(self, parent, metadatas):
+        super().__init__(parent)
+        self.setWindowTitle(f"Edit Tags ({len(metadatas)} tracks)" if len(metadatas) > 1 else "Edit Tags")
+        self.setMinimumWidth(400)
+        self.setStyleSheet(parent.dark_theme_stylesheet())
+
+        layout = QVBoxLayout(self)
+        self.inputs = {}
+        for field, label in self.FIELDS:
+            values = {metadata.get(field, "") for metadata in metadatas}
+            line_edit = QLineEdit(values.pop() if len(values) == 1 else "")
+            if len(values) > 1:
+                line_edit.setPlaceholderText("(multiple values)")
+            line_edit.setStyleSheet("""
+                QLineEdit {
+                    background-color: #333333;
+                    color: white;
+                    border: none;
+                    padding: 8px;
+                    border-radius: 4px;
+                }
+            """)
+            layout.addWidget(QLabel(label))
+            layout.addWidget(line_edit)
+            self.inputs[field] = line_edit
+
+        button_layout = QHBoxLayout()
+        self.save_button = QPushButton("Save")
+        self.save_button.clicked.connect(self.accept)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.reject)
+        for btn in [self.save_button, self.cancel_button]:
+            btn.setStyleSheet("""
+                QPushButton {
+                    background-color: #E63946;
+                    color: white;
+                    border: none;
+                    padding: 8px 16px;
+                    border-radius: 4px;
+                }
+                QPushButton:hover {
+                    background-color: #F56476;
+                }
+            """)
+            button_layout.addWidget(btn)
+        layout.addLayout(button_layout)
+
+    def changes(self):
+        return {field: line_edit.text().strip() for field, line_edit in self.inputs.items() if line_edit.isModified()}
+
+
 class SpotifyLikePlayer(QWidget):
-    def __init__(self):
+    sync_finished = pyqtSignal(str, object)
+    tags_written = pyqtSignal(object)
+    scan_progress = pyqtSignal(list, list)
+    scan_finished = pyqtSignal(str, object)
+    index_transfer_finished = pyqtSignal(str, object)
+
+    def __init__(self, high_latency_mode=False, prefetch_budget=QueuePrefetcher.BYTE_BUDGET, prefetch_stats=False):
         super().__init__()
         self.setWindowTitle("Muse Music Player")
         self.setGeometry(200, 100, 900, 600)
@@ -283,8 +3888,33 @@ class SpotifyLikePlayer(QWidget):
         self.last_folder_path = ""
         self.library_file = os.path.join(os.path.expanduser("~"), ".muse_library.dat")
 
-        # Playlist manager
-        self.playlist_manager = PlaylistManager()
+        # Folder scanning and tag extraction, parallel on network mounts
+        self.library_scanner = LibraryScanner(high_latency_mode)
+
+        # Album art is decoded at display size on a worker thread
+        self.art_loader = AlbumArtLoader(self)
+        self.art_loader.art_ready.connect(self.album_art_ready)
+        self.current_art_key = ""
+
+        # A running indexer daemon owns the library and playlists; otherwise work standalone
+        self.indexer = IndexerClient.connect_to(indexer_socket_path(), self)
+        if self.indexer:
+            try:
+                self.playlist_manager = IndexedPlaylistManager(self.indexer, self)
+                self.indexer.event_received.connect(self.indexer_event)
+            except Exception as e:
+                print(f"Error loading playlists from indexer, working standalone: {e}")
+                self.indexer.close()
+                self.indexer = None
+        if not self.indexer:
+            self.playlist_manager = PlaylistManager(self)
+        self.library_index = LibraryIndex()
+
+        # Play history, fed from song changes
+        self.play_history = PlayHistory()
+        self.history_pending = False
+        self.similarity_engine = None
+        self.remote_server = None
 
         # Main layout
         main_layout = QHBoxLayout(self)
@@ -302,33 +3932,97 @@ class SpotifyLikePlayer(QWidget):
         # Create different views
         self.main_view = self.create_main_view()
         self.playlist_view = self.create_playlist_view()
+        self.discover_view = self.create_discover_view()
+        self.albums_view = self.create_albums_view()
 
         # Add views to stacked widget
         self.content_area.addWidget(self.main_view)
         self.content_area.addWidget(self.playlist_view)
+        self.content_area.addWidget(self.discover_view)
+        self.content_area.addWidget(self.albums_view)
 
         # Media player setup
         self.player = QMediaPlayer()
         self.media_playlist = QMediaPlaylist()
         self.player.setPlaylist(self.media_playlist)
 
+        # Play queue drives both the media playlist and the playlist widget
+        self.play_queue = PlayQueue(self)
+        self.play_queue.inserted.connect(self.queue_rows_inserted)
+        self.play_queue.removed.connect(self.queue_rows_removed)
+        self.play_queue.moved.connect(self.queue_row_moved)
+        self.play_queue.changed.connect(self.queue_row_changed)
+        self.play_queue.reset.connect(self.queue_reset)
+        self.dragging_queue_row = False
+
+        # Playlist edits update only the affected rows of the playlist view
+        self.playlist_manager.tracks_inserted.connect(self.playlist_rows_inserted)
+        self.playlist_manager.tracks_removed.connect(self.playlist_rows_removed)
+        self.playlist_manager.tracks_moved.connect(self.playlist_rows_moved)
+        self.playlist_manager.playlists_changed.connect(self.update_playlists_dropdown)
+        self.sync_finished.connect(self.playlist_synced)
+        self.tags_written.connect(self.tags_edited)
+        self.scan_progress.connect(self.scan_batch_ready)
+        self.scan_finished.connect(self.scan_done)
+        self.index_transfer_finished.connect(self.library_index_transferred)
+        self.scan_thread = None
+        self.scan_replaces_queue = False
+        self.scan_batches = 0
+        self.scan_rows = {}
+        self.resume_position = 0
+
+        # Persist the queue shortly after it settles rather than on every change
+        self.queue_save_timer = QTimer(self)
+        self.queue_save_timer.setSingleShot(True)
+        self.queue_save_timer.setInterval(2000)
+        self.queue_save_timer.timeout.connect(self.play_queue.save_queue)
+        for signal in [self.play_queue.inserted, self.play_queue.removed,
+                       self.play_queue.moved, self.play_queue.reset]:
+            # Ignore the signal's arguments; QTimer.start(int) would take a row as the interval
+            signal.connect(lambda *args: self.queue_save_timer.start())
+
+        # Warm the next few files; bursts of queue edits reschedule once
+        self.prefetcher = QueuePrefetcher(prefetch_budget, chunked=self.library_scanner.high_latency_mode)
+        self.prefetch_stats = prefetch_stats
+        self.prefetch_start_pending = False
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.setInterval(200)
+        self.prefetch_timer.timeout.connect(self.prefetch_upcoming)
+        for signal in [self.play_queue.inserted, self.play_queue.removed,
+                       self.play_queue.moved, self.play_queue.reset]:
+            signal.connect(lambda *args: self.prefetch_timer.start())
+
         # Connect signals
         self.playlist_widget.itemDoubleClicked.connect(self.play_selected_song)
+        self.playlist_widget.model().rowsMoved.connect(self.queue_rows_dragged)
+        self.playlist_widget.customContextMenuRequested.connect(self.show_queue_menu)
         self.player.positionChanged.connect(self.update_position)
         self.player.durationChanged.connect(self.update_duration)
+        self.player.stateChanged.connect(self.player_state_changed)
+        self.player.mediaStatusChanged.connect(self.media_status_changed)
         self.media_playlist.currentIndexChanged.connect(self.song_changed)
 
-        # Timer to update slider while playing
+        # Timer to update slider while playing, as a fallback when the player
+        # stops reporting positions; both paths go through the UI scheduler
         self.timer = QTimer()
         self.timer.setInterval(1000)
         self.timer.timeout.connect(self.refresh_position)
+        self.ui_scheduler = UiUpdateScheduler(self)
+        self.last_position_render = 0.0
 
         # Start with volume 50
         self.player.setVolume(50)
         self.volume_slider.setValue(50)
         
-        # Load previous library if it exists
+        # Load previous library if it exists, then the queue that was playing
         self.load_library()
+        self.restore_queue()
+
+        # Pick up a scan that was interrupted, keeping the restored queue
+        resume_folder = self.library_scanner.checkpoint.pending_folder()
+        if resume_folder and not self.indexer:
+            QTimer.singleShot(0, lambda: self.start_scan(resume_folder, replace_queue=False))
 
     def create_main_view(self):
         main_view = QWidget()
@@ -346,6 +4040,11 @@ class SpotifyLikePlayer(QWidget):
         self.title_label.setStyleSheet("color: white;")
         layout.addWidget(self.title_label)
 
+        # Library size, kept current from the index's running totals
+        self.library_totals_label = QLabel("")
+        self.library_totals_label.setStyleSheet("color: #b3b3b3;")
+        layout.addWidget(self.library_totals_label)
+
         # Playlist widget (list of songs)
         self.playlist_widget = QListWidget()
         self.playlist_widget.setStyleSheet(
@@ -363,6 +4062,9 @@ class SpotifyLikePlayer(QWidget):
             }
             """
         )
+        self.playlist_widget.setDragDropMode(QAbstractItemView.InternalMove)
+        self.playlist_widget.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.playlist_widget.setContextMenuPolicy(Qt.CustomContextMenu)
         layout.addWidget(self.playlist_widget)
 
         # Playback controls area
@@ -406,6 +4108,10 @@ class SpotifyLikePlayer(QWidget):
         self.playlists_dropdown.currentIndexChanged.connect(self.load_selected_playlist)
         layout.addWidget(self.playlists_dropdown)
 
+        self.playlist_totals_label = QLabel("")
+        self.playlist_totals_label.setStyleSheet("color: #b3b3b3;")
+        layout.addWidget(self.playlist_totals_label)
+
         # Buttons for playlist management
         buttons_layout = QHBoxLayout()
         
@@ -418,7 +4124,17 @@ class SpotifyLikePlayer(QWidget):
         self.load_playlist_btn = QPushButton("Load Playlist")
         self.load_playlist_btn.clicked.connect(self.load_playlist_to_player)
         
-        for btn in [self.new_playlist_btn, self.delete_playlist_btn, self.load_playlist_btn]:
+        self.import_playlist_btn = QPushButton("Import")
+        self.import_playlist_btn.clicked.connect(self.import_playlist_file)
+        
+        self.export_playlist_btn = QPushButton("Export")
+        self.export_playlist_btn.clicked.connect(self.export_current_playlist)
+        
+        self.sync_playlist_btn = QPushButton("Sync to Device")
+        self.sync_playlist_btn.clicked.connect(self.sync_current_playlist)
+        
+        for btn in [self.new_playlist_btn, self.delete_playlist_btn, self.load_playlist_btn,
+                    self.import_playlist_btn, self.export_playlist_btn, self.sync_playlist_btn]:
             btn.setStyleSheet("""
                 QPushButton {
                     background-color: #E63946;
@@ -450,6 +4166,9 @@ class SpotifyLikePlayer(QWidget):
                 color: white;
             }
         """)
+        self.playlist_content_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.playlist_content_list.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.playlist_content_list.customContextMenuRequested.connect(self.show_playlist_menu)
         layout.addWidget(self.playlist_content_list)
 
         # Button to remove songs from playlist
@@ -474,6 +4193,118 @@ class SpotifyLikePlayer(QWidget):
 
         return view
 
+    def create_discover_view(self):
+        view = QWidget()
+        layout = QVBoxLayout(view)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(10)
+
+        # Title
+        title = QLabel("Discover")
+        title.setFont(QFont("Segoe UI", 20, QFont.Bold))
+        title.setStyleSheet("color: white;")
+        layout.addWidget(title)
+
+        self.discover_label = QLabel("Play something, then ask for more like it.")
+        self.discover_label.setStyleSheet("color: #b3b3b3; font-size: 14px;")
+        self.discover_label.setWordWrap(True)
+        layout.addWidget(self.discover_label)
+
+        self.more_like_this_btn = QPushButton("More Like This")
+        self.more_like_this_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #E63946;
+                color: white;
+                border: none;
+                padding: 8px 16px;
+                border-radius: 4px;
+            }
+            QPushButton:hover {
+                background-color: #F56476;
+            }
+        """)
+        self.more_like_this_btn.clicked.connect(self.show_more_like_this)
+        layout.addWidget(self.more_like_this_btn)
+
+        # Recommendations, double click to play next
+        self.discover_list = QListWidget()
+        self.discover_list.setStyleSheet("""
+            QListWidget {
+                background-color: #121212;
+                color: #b3b3b3;
+                border: none;
+                padding: 5px;
+                font-size: 14px;
+            }
+            QListWidget::item:selected {
+                background-color: #E63946;
+                color: white;
+            }
+        """)
+        self.discover_list.itemDoubleClicked.connect(self.play_discovered_track)
+        layout.addWidget(self.discover_list)
+
+        return view
+
+    def create_albums_view(self):
+        view = QWidget()
+        layout = QVBoxLayout(view)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(10)
+
+        title = QLabel("Albums")
+        title.setFont(QFont("Segoe UI", 20, QFont.Bold))
+        title.setStyleSheet("color: white;")
+        layout.addWidget(title)
+
+        # Icon-mode list over a model: only visible cells are laid out and painted
+        self.thumbnail_cache = ThumbnailCache()
+        self.album_model = AlbumGridModel(self.load_album_thumbnail, self.default_album_pixmap, self)
+        self.albums_stale = True
+        self.album_grid = QListView()
+        self.album_grid.setViewMode(QListView.IconMode)
+        self.album_grid.setMovement(QListView.Static)
+        self.album_grid.setResizeMode(QListView.Adjust)
+        self.album_grid.setUniformItemSizes(True)
+        self.album_grid.setLayoutMode(QListView.Batched)
+        self.album_grid.setBatchSize(500)
+        self.album_grid.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.album_grid.setIconSize(QSize(AlbumGridModel.THUMBNAIL_SIZE, AlbumGridModel.THUMBNAIL_SIZE))
+        self.album_grid.setGridSize(QSize(AlbumGridModel.THUMBNAIL_SIZE + 24, AlbumGridModel.THUMBNAIL_SIZE + 56))
+        self.album_grid.setWordWrap(True)
+        self.album_grid.setStyleSheet("""
+            QListView {
+                background-color: #121212;
+                color: #b3b3b3;
+                border: none;
+                font-size: 12px;
+            }
+            QListView::item:selected {
+                background-color: #E63946;
+                color: white;
+            }
+        """)
+        self.album_grid.setModel(self.album_model)
+        self.album_grid.doubleClicked.connect(self.play_album)
+        layout.addWidget(self.album_grid)
+
+        # Work out the visible rows once scrolling or resizing pauses
+        self.album_range_timer = QTimer(self)
+        self.album_range_timer.setSingleShot(True)
+        self.album_range_timer.setInterval(30)
+        self.album_range_timer.timeout.connect(self.update_album_range)
+        scroll_bar = self.album_grid.verticalScrollBar()
+        scroll_bar.valueChanged.connect(lambda value: self.album_range_timer.start())
+        scroll_bar.rangeChanged.connect(lambda minimum, maximum: self.album_range_timer.start())
+
+        # Regroup at most twice a second while scan batches or tag edits keep arriving
+        self.album_refresh_timer = QTimer(self)
+        self.album_refresh_timer.setSingleShot(True)
+        self.album_refresh_timer.setInterval(500)
+        self.album_refresh_timer.timeout.connect(self.refresh_albums)
+
+        return view
+
     def create_album_section(self):
         album_widget = QFrame()
         album_widget.setStyleSheet("background-color: #181818; border-radius: 8px;")
@@ -485,9 +4316,9 @@ class SpotifyLikePlayer(QWidget):
         self.album_art.setFixedSize(200, 200)
         self.album_art.setAlignment(Qt.AlignCenter)
         # Set default album art
-        default_pixmap = QPixmap()
-        default_pixmap.loadFromData(QByteArray(SVG_DEFAULT_ALBUM.encode('utf-8')), "SVG")
-        self.album_art.setPixmap(default_pixmap)
+        self.default_album_pixmap = QPixmap()
+        self.default_album_pixmap.loadFromData(QByteArray(SVG_DEFAULT_ALBUM.encode('utf-8')), "SVG")
+        self.album_art.setPixmap(self.default_album_pixmap)
         self.album_art.setScaledContents(True)
         album_layout.addWidget(self.album_art)
         
@@ -558,9 +4389,18 @@ class SpotifyLikePlayer(QWidget):
         self.btn_playlists = QPushButton(" Your Playlists")
         self.btn_playlists.setIcon(icon_from_svg(SVG_PLAYLIST))
         
+        self.btn_albums = QPushButton(" Albums")
+        self.btn_albums.setIcon(icon_from_svg(SVG_ALBUMS))
+        
+        self.btn_discover = QPushButton(" Discover")
+        self.btn_discover.setIcon(icon_from_svg(SVG_DISCOVER))
+        
         self.btn_add = QPushButton(" Add Folder")
+        self.btn_export_library = QPushButton(" Export Library")
+        self.btn_import_library = QPushButton(" Import Library")
 
-        for btn in [self.btn_home, self.btn_search, self.btn_playlists, self.btn_add]:
+        for btn in [self.btn_home, self.btn_search, self.btn_playlists, self.btn_albums,
+                    self.btn_discover, self.btn_add, self.btn_export_library, self.btn_import_library]:
             btn.setCursor(Qt.PointingHandCursor)
             btn.setStyleSheet(
                 """
@@ -584,7 +4424,11 @@ class SpotifyLikePlayer(QWidget):
         self.btn_home.clicked.connect(lambda: self.content_area.setCurrentIndex(0))
         self.btn_search.clicked.connect(self.open_search)
         self.btn_playlists.clicked.connect(lambda: self.content_area.setCurrentIndex(1))
+        self.btn_albums.clicked.connect(self.open_albums)
+        self.btn_discover.clicked.connect(self.open_discover)
         self.btn_add.clicked.connect(self.add_songs)
+        self.btn_export_library.clicked.connect(self.export_library_index)
+        self.btn_import_library.clicked.connect(self.import_library_index)
 
         # Add stretch to push buttons up
         sidebar_layout.addStretch()
@@ -674,111 +4518,233 @@ class SpotifyLikePlayer(QWidget):
             """
         )
         btn_layout.addStretch()
-        btn_layout.addWidget(self.volume_slider)
-
-        controls_layout.addLayout(btn_layout)
-
-        # Connect buttons
-        self.btn_play.clicked.connect(self.play_pause)
-        self.btn_next.clicked.connect(self.next_song)
-        self.btn_prev.clicked.connect(self.prev_song)
-        self.volume_slider.valueChanged.connect(self.change_volume)
-
-        return controls_widget
-
-    def dark_theme_stylesheet(self):
-        return """
-        QWidget {
-            background-color: #121212;
-            color: #b3b3b3;
-            font-family: "Segoe UI", Tahoma, Geneva, Verdana, sans-serif;
-        }
-        QScrollBar:vertical {
-            background: #222222;
-            width: 10px;
-            margin: 15px 0 15px 0;
-            border-radius: 5px;
-        }
-        QScrollBar::handle:vertical {
-            background: #E63946;
-            min-height: 30px;
-            border-radius: 5px;
-        }
-        QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-            height: 0px;
-        }
-        """
-
-    def extract_metadata(self, filepath):
-        """Extract metadata from audio files including album art"""
-        filename = os.path.basename(filepath)
-        title = os.path.splitext(filename)[0]
-        artist = ""
-        album_art = None
-        
-        try:
-            if filepath.lower().endswith('.mp3'):
-                audio = MP3(filepath, ID3=ID3)
-                
-                # Extract title and artist from ID3 tags
-                if audio.tags:
-                    if 'TIT2' in audio.tags:
-                        title = str(audio.tags['TIT2'])
-                    if 'TPE1' in audio.tags:
-                        artist = str(audio.tags['TPE1'])
-                        
-                    # Extract album art
-                    for tag in ['APIC:0', 'APIC:1', 'APIC:3', 'APIC:']:
-                        if tag in audio.tags:
-                            album_art = audio.tags[tag].data
-                            break
-                            
-            elif filepath.lower().endswith('.flac'):
-                audio = FLAC(filepath)
-                
-                # Extract title and artist
-                if 'title' in audio:
-                    title = audio['title'][0]
-                if 'artist' in audio:
-                    artist = audio['artist'][0]
-                
-                # Extract album art
-                if audio.pictures:
-                    album_art = audio.pictures[0].data
-                    
-        except Exception as e:
-            print(f"Error extracting metadata: {e}")
-            
-        return {
-            "title": title,
-            "artist": artist,
-            "album_art": album_art
+        btn_layout.addWidget(self.volume_slider)
+
+        controls_layout.addLayout(btn_layout)
+
+        # Connect buttons
+        self.btn_play.clicked.connect(self.play_pause)
+        self.btn_next.clicked.connect(self.next_song)
+        self.btn_prev.clicked.connect(self.prev_song)
+        self.volume_slider.valueChanged.connect(self.change_volume)
+
+        return controls_widget
+
+    def dark_theme_stylesheet(self):
+        return """
+        QWidget {
+            background-color: #121212;
+            color: #b3b3b3;
+            font-family: "Segoe UI", Tahoma, Geneva, Verdana, sans-serif;
+        }
+        QScrollBar:vertical {
+            background: #222222;
+            width: 10px;
+            margin: 15px 0 15px 0;
+            border-radius: 5px;
+        }
+        QScrollBar::handle:vertical {
+            background: #E63946;
+            min-height: 30px;
+            border-radius: 5px;
+        }
+        QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
+            height: 0px;
         }
+        """
+
+    def extract_metadata(self, filepath):
+        return self.library_scanner.extract_metadata(filepath)
+
+    def load_album_art(self, filepath, metadata):
+        return self.library_scanner.load_album_art(filepath, metadata)
 
-    def set_album_art(self, album_art_data=None):
-        """Set album art from binary data or use default"""
-        if album_art_data:
-            pixmap = QPixmap()
-            pixmap.loadFromData(album_art_data)
+    def existing_paths(self, paths):
+        return self.library_scanner.existing_paths(paths)
+
+    def set_album_art(self, image=None):
+        """Set album art from an already scaled QImage or use default"""
+        if image is not None and not image.isNull():
+            self.album_art.setPixmap(QPixmap.fromImage(image))
         else:
             # Use default album art
-            pixmap = QPixmap()
-            pixmap.loadFromData(QByteArray(SVG_DEFAULT_ALBUM.encode('utf-8')), "SVG")
-            
-        self.album_art.setPixmap(pixmap.scaled(200, 200, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+            self.album_art.setPixmap(self.default_album_pixmap)
+
+    def album_art_ready(self, key, image):
+        # Ignore covers for tracks that are no longer playing
+        if key == self.current_art_key:
+            self.set_album_art(image)
+
+    def track_display_name(self, track):
+        display_name = track["title"]
+        if track["artist"]:
+            display_name += f" - {track['artist']}"
+        return display_name
+
+    # Play queue change handlers
+    def queue_rows_inserted(self, row, entries):
+        self.media_playlist.insertMedia(
+            row, [QMediaContent(QUrl.fromLocalFile(entry["path"])) for entry in entries]
+        )
+        self.playlist_widget.insertItems(row, [self.track_display_name(entry) for entry in entries])
+
+    def queue_rows_removed(self, row, count):
+        self.media_playlist.removeMedia(row, row + count - 1)
+        for _ in range(count):
+            self.playlist_widget.takeItem(row)
+
+    def queue_row_moved(self, source, destination):
+        self.media_playlist.moveMedia(source, destination)
+        # A drag has already moved the widget row itself
+        if not self.dragging_queue_row:
+            item = self.playlist_widget.takeItem(source)
+            self.playlist_widget.insertItem(destination, item)
+
+    def queue_row_changed(self, row):
+        self.playlist_widget.item(row).setText(self.track_display_name(self.play_queue[row]))
+
+    def queue_reset(self):
+        current_index = self.play_queue.current_index
+        self.media_playlist.clear()
+        self.playlist_widget.clear()
+        self.media_playlist.addMedia(
+            [QMediaContent(QUrl.fromLocalFile(entry["path"])) for entry in self.play_queue]
+        )
+        self.playlist_widget.addItems([self.track_display_name(entry) for entry in self.play_queue])
+        if 0 <= current_index < len(self.play_queue):
+            self.media_playlist.setCurrentIndex(current_index)
+
+    def queue_rows_dragged(self, parent, start, end, destination_parent, destination_row):
+        """Mirror a drag reorder in the playlist widget into the play queue"""
+        if destination_row > start:
+            destination_row -= 1
+        self.dragging_queue_row = True
+        try:
+            self.play_queue.move(start, destination_row)
+        finally:
+            self.dragging_queue_row = False
+
+    def show_queue_menu(self, pos):
+        row = self.playlist_widget.indexAt(pos).row()
+        if row < 0:
+            return
+        menu = QMenu(self)
+        play_next_action = menu.addAction("Play Next")
+        remove_action = menu.addAction("Remove from Queue")
+        menu.addSeparator()
+        edit_tags_action = menu.addAction("Edit Tags...")
+        action = menu.exec_(self.playlist_widget.viewport().mapToGlobal(pos))
+        if action == play_next_action:
+            current = self.media_playlist.currentIndex()
+            self.play_queue.move(row, current + 1 if row > current else current)
+        elif action == remove_action:
+            self.play_queue.remove(row)
+        elif action == edit_tags_action:
+            rows = sorted({index.row() for index in self.playlist_widget.selectedIndexes()} | {row})
+            self.edit_tags([self.play_queue[selected]["path"] for selected in rows])
+
+    def edit_tags(self, paths):
+        """Edit tags of the given tracks, writing only those files and library rows"""
+        paths = list(dict.fromkeys(paths))
+        dialog = TagEditDialog(self, [
+            self.library_index.get_metadata(path) or self.extract_metadata(path) for path in paths
+        ])
+        if dialog.exec_() != QDialog.Accepted or not dialog.changes():
+            return
+        changes = dialog.changes()
+
+        # Writing and re-reading the files can be slow on network storage; do it off the GUI thread
+        def run():
+            updates, errors, stored = {}, {}, False
+            try:
+                updates, errors = self.library_scanner.edit_tags(paths, changes)
+                if updates and self.indexer:
+                    # The daemon stores them and pushes them back to every client
+                    self.indexer.request("update_metadata", {"updates": updates})
+                    stored = True
+            except Exception as e:
+                print(f"Error saving edited tags: {e}")
+            self.tags_written.emit({"updates": updates, "errors": errors, "stored": stored, "count": len(paths)})
+
+        threading.Thread(target=run, name="muse-tags", daemon=True).start()
+
+    def tags_edited(self, result):
+        updates, errors = result["updates"], result["errors"]
+        if updates and not result["stored"]:
+            # Standalone, or the indexer could not take them
+            self.apply_metadata_updates(updates)
+            self.playlist_manager.refresh_tracks(updates)
+            self.save_library()
+        if errors:
+            QMessageBox.warning(
+                self, "Edit Tags",
+                f"Could not write tags to {len(errors)} of {result['count']} files:\n" + "\n".join(
+                    f"{os.path.basename(path)}: {error}" for path, error in list(errors.items())[:5]
+                )
+            )
+
+    def apply_metadata_updates(self, updates):
+        """Swap in re-read metadata for edited tracks across library, index and queue
+
+        Edited tracks outside the library (queued from elsewhere) only update the queue.
+        """
+        rows = {path: row for row, path in enumerate(self.track_paths)}
+        in_library = {path: metadata for path, metadata in updates.items() if path in rows}
+        for path, metadata in in_library.items():
+            self.track_metadatas[rows[path]] = metadata
+            self.library_index.add(path, metadata)
+        if self.similarity_engine is not None and in_library:
+            self.similarity_engine.add_tracks(list(in_library), list(in_library.values()))
+        self.play_queue.refresh(updates)
+        self.library_updated()
+        current_index = self.media_playlist.currentIndex()
+        if 0 <= current_index < len(self.play_queue) and self.play_queue[current_index]["path"] in updates:
+            metadata = updates[self.play_queue[current_index]["path"]]
+            self.song_title_label.setText(metadata["title"])
+            self.artist_label.setText(metadata["artist"])
+
+    def prefetch_upcoming(self):
+        start = self.media_playlist.currentIndex() + 1
+        end = min(start + self.prefetcher.lookahead, len(self.play_queue))
+        self.prefetcher.schedule(self.play_queue[row]["path"] for row in range(start, end))
+
+    def media_status_changed(self, status):
+        if status == QMediaPlayer.BufferedMedia:
+            self.prefetcher.track_ready()
 
     def song_changed(self, index):
         """Handle when a song changes in the playlist"""
-        if index >= 0 and index < len(self.track_paths):
-            filepath = self.track_paths[index]
-            metadata = self.extract_metadata(filepath)
+        self.play_queue.current_index = index
+        self.queue_save_timer.start()
+        self.history_pending = True
+        self.log_play()
+        self.prefetcher.track_skipped()
+        self.prefetch_start_pending = True
+        self.time_track_start()
+        if self.remote_server:
+            self.remote_server.publish("track", {
+                "index": index,
+                "track": self.play_queue[index] if 0 <= index < len(self.play_queue) else None
+            })
+        self.prefetch_timer.start()
+        if index >= 0 and index < len(self.play_queue):
+            filepath = self.play_queue[index]["path"]
+            metadata = self.library_index.get_metadata(filepath) or self.extract_metadata(filepath)
             
             # Update song info display
             self.song_title_label.setText(metadata["title"])
             self.artist_label.setText(metadata["artist"])
             
-            # Update album art
-            self.set_album_art(metadata["album_art"])
+            # Show the indexed length now; durationChanged corrects it once loaded
+            if metadata.get("duration"):
+                self.position_slider.setRange(0, metadata["duration"])
+                self.label_duration.setText(self.ms_to_time(metadata["duration"]))
+            
+            # Update album art; decoding happens off the GUI thread
+            self.current_art_key = filepath
+            self.set_album_art(self.art_loader.request(
+                filepath, functools.partial(self.load_album_art, filepath, metadata), self.album_art.size()
+            ))
             
             # Update playlist selection
             self.playlist_widget.setCurrentRow(index)
@@ -789,6 +4755,33 @@ class SpotifyLikePlayer(QWidget):
                 "artist": metadata["artist"]
             }
 
+    def log_play(self):
+        """Record the current track in the play history once it is actually playing"""
+        index = self.media_playlist.currentIndex()
+        if (self.history_pending and self.player.state() == QMediaPlayer.PlayingState
+                and 0 <= index < len(self.play_queue)):
+            self.history_pending = False
+            self.play_history.record(self.play_queue[index])
+
+    def time_track_start(self):
+        """Start the prefetcher's time-to-play clock once the current track actually plays"""
+        index = self.media_playlist.currentIndex()
+        if (self.prefetch_start_pending and self.player.state() == QMediaPlayer.PlayingState
+                and 0 <= index < len(self.play_queue)):
+            self.prefetch_start_pending = False
+            self.prefetcher.track_started(self.play_queue[index]["path"])
+
+    def player_state_changed(self, state):
+        self.log_play()
+        self.time_track_start()
+        if self.remote_server:
+            self.remote_server.publish("state", self.remote_server.command_state({}))
+
+    def start_remote_control(self, port):
+        """Serve the localhost remote-control API and push player events to it"""
+        self.remote_server = RemoteControlServer(self, port=port)
+        return self.remote_server.start()
+
     def add_songs(self):
         """Add all songs from a selected folder"""
         # Use last folder as starting directory if available
@@ -802,66 +4795,207 @@ class SpotifyLikePlayer(QWidget):
             # Save the selected folder as the last folder
             self.last_folder_path = folder
             
-            # Scan the folder for audio files
-            audio_files = self.scan_folder_for_audio(folder)
+            # Scan the folder for audio files and read their tags
+            self.start_scan(folder)
+
+    def export_library_index(self):
+        """Save the library as a portable index another machine can import without rescanning"""
+        if not self.track_paths:
+            QMessageBox.information(self, "Export Library", "The library is empty.")
+            return
+        filepath, _ = QFileDialog.getSaveFileName(
+            self, "Export Library Index", "library.museidx", "Muse library index (*.museidx)"
+        )
+        if not filepath:
+            return
+        root = self.last_folder_path or os.path.commonpath(self.track_paths)
+        track_paths, track_metadatas = list(self.track_paths), list(self.track_metadatas)
+        self.btn_export_library.setEnabled(False)
+
+        def run():
+            try:
+                count = self.library_scanner.export_library_index(filepath, root, track_paths, track_metadatas)
+                result = {"count": count, "skipped": len(track_paths) - count, "root": root}
+            except Exception as e:
+                print(f"Error exporting library index: {e}")
+                result = {"error": str(e)}
+            self.index_transfer_finished.emit("export", result)
+
+        threading.Thread(target=run, name="muse-export", daemon=True).start()
+
+    def import_library_index(self):
+        """Load an exported index, laid over the folder the music lives in on this machine"""
+        filepath, _ = QFileDialog.getOpenFileName(
+            self, "Import Library Index", "", "Muse library index (*.museidx)"
+        )
+        if not filepath:
+            return
+        root = QFileDialog.getExistingDirectory(
+            self, "Select Music Folder", os.path.dirname(filepath), QFileDialog.ShowDirsOnly
+        )
+        if not root:
+            return
+        self.btn_import_library.setEnabled(False)
+
+        def run():
+            try:
+                if self.indexer:
+                    # The daemon imports into its own library and pushes it to every client
+                    summary = self.indexer.request("import_index", {"file": filepath, "root": root}, timeout=None)
+                else:
+                    track_paths, track_metadatas, summary = self.library_scanner.import_library_index(filepath, root)
+                    summary.update(track_paths=track_paths, track_metadatas=track_metadatas, root=root)
+            except Exception as e:
+                print(f"Error importing library index: {e}")
+                summary = {"error": str(e)}
+            self.index_transfer_finished.emit("import", summary)
+
+        threading.Thread(target=run, name="muse-import", daemon=True).start()
+
+    def library_index_transferred(self, kind, result):
+        self.btn_export_library.setEnabled(True)
+        self.btn_import_library.setEnabled(True)
+        if not result or "error" in result:
+            QMessageBox.warning(self, "Error", f"Failed to {kind} the library index!")
+            return
+        if kind == "export":
+            message = f"Exported {result['count']} songs under {result['root']}."
+            if result["skipped"]:
+                message += f"\n{result['skipped']} songs outside that folder or missing were left out."
+            QMessageBox.information(self, "Export Library", message)
+            return
+        if "track_paths" in result and result["track_paths"]:
+            self.apply_library({
+                "track_paths": result["track_paths"],
+                "track_metadatas": result["track_metadatas"],
+                "last_folder": result["root"]
+            })
+            self.save_library()
+            if not len(self.play_queue):
+                self.library_ready(replace_queue=True)
+        QMessageBox.information(
+            self, "Import Library",
+            f"Imported {result['kept']} songs unchanged, re-read {result['extracted']} changed songs, "
+            f"{result['missing']} not found."
+        )
+
+    def start_scan(self, folder, replace_queue=True):
+        """Scan a folder on a background thread; the library fills in batch by batch"""
+        if self.scan_thread and self.scan_thread.is_alive():
+            QMessageBox.information(self, "Scan in Progress", "A folder is already being scanned.")
+            return
+        self.last_folder_path = folder
+        self.scan_replaces_queue = replace_queue
+        self.scan_batches = 0
+        self.scan_rows = {}
+        self.btn_add.setEnabled(False)
+        library_index = self.library_index
+
+        def run():
+            try:
+                if self.indexer:
+                    # The daemon scans once for every client and pushes the new library
+                    result = self.indexer.request("scan", {"folder": folder}, timeout=None)
+                else:
+                    result = self.library_scanner.scan_library(
+                        folder, library_index, lambda paths, metadatas: self.scan_progress.emit(paths, metadatas)
+                    )
+            except Exception as e:
+                print(f"Error scanning folder: {e}")
+                result = None
+            self.scan_finished.emit(folder, result)
+
+        self.scan_thread = threading.Thread(target=run, name="muse-scan", daemon=True)
+        self.scan_thread.start()
+
+    def scan_batch_ready(self, paths, metadatas):
+        """Merge a finished batch into the library so it is playable and searchable mid-scan
+
+        The loaded library stays in place (a resumed scan starts with a checkpointed
+        batch, not the whole folder); scan_done swaps in the complete result.
+        """
+        if self.scan_batches == 0:
+            # Copy once so lists handed out earlier are not grown underneath their users
+            self.track_paths = list(self.track_paths)
+            self.track_metadatas = list(self.track_metadatas)
+            self.scan_rows = {path: row for row, path in enumerate(self.track_paths)}
+        for path, metadata in zip(paths, metadatas):
+            row = self.scan_rows.get(path)
+            if row is None:
+                self.scan_rows[path] = len(self.track_paths)
+                self.track_paths.append(path)
+                self.track_metadatas.append(metadata)
+            else:
+                self.track_metadatas[row] = metadata
+            self.library_index.add(path, metadata)
+        if self.similarity_engine is not None:
+            self.similarity_engine.add_tracks(paths, metadatas)
+        if self.scan_replaces_queue:
+            entries = [make_track_entry(path, metadata) for path, metadata in zip(paths, metadatas)]
+            if self.scan_batches == 0:
+                self.library_ready(True, entries)
+            else:
+                self.play_queue.append(entries)
+        self.scan_batches += 1
+        self.library_updated()
+
+    def library_ready(self, replace_queue, entries=None):
+        """Queue the library that was just scanned (or just entries from it) and start playing it"""
+        if not replace_queue:
+            return
+        # Queue the new library in one go
+        if entries is None:
+            entries = [make_track_entry(path, metadata)
+                       for path, metadata in zip(self.track_paths, self.track_metadatas)]
+        self.play_queue.replace(entries)
+        
+        if self.player.state() != QMediaPlayer.PlayingState:
+            self.media_playlist.setCurrentIndex(0)
+            self.player.play()
+            self.btn_play.setIcon(icon_from_svg(SVG_PAUSE))
+            self.timer.start()
+        
+        # Always change view back to main view (home)
+        self.content_area.setCurrentIndex(0)
+
+    def scan_done(self, folder, result):
+        self.btn_add.setEnabled(True)
+        if result is None:
+            QMessageBox.warning(self, "Error", "Scanning the folder failed; it will resume on the next scan.")
+            return
+        if isinstance(result, dict):
+            # The indexer's "library" event was applied before its reply got here
+            result = (self.track_paths, self.track_metadatas, {}) if result["count"] else ([], [], {})
+            if result[0]:
+                self.library_ready(self.scan_replaces_queue)
+        audio_files, track_metadatas, moved = result
+        if audio_files:
+            self.track_paths = audio_files
+            self.track_metadatas = track_metadatas
+            self.library_index = LibraryIndex(self.track_paths, self.track_metadatas)
+            self.similarity_engine = None
+            # Keep playlists pointing at tracks that moved into this folder
+            self.playlist_manager.relink(moved)
+            self.library_changed()
+            
+            # Save the library, then drop the checkpoint it supersedes
+            self.save_library()
+            if not self.indexer:
+                self.library_scanner.finish_scan()
             
-            if audio_files:
-                # Clear existing library
-                self.track_paths = []
-                self.track_metadatas = []
-                self.playlist_widget.clear()
-                self.media_playlist.clear()
-                
-                for f in audio_files:
-                    url = QUrl.fromLocalFile(f)
-                    self.media_playlist.addMedia(QMediaContent(url))
-                    
-                    # Extract metadata
-                    metadata = self.extract_metadata(f)
-                    self.track_paths.append(f)
-                    self.track_metadatas.append(metadata)
-                    
-                    # Display in playlist
-                    display_name = metadata["title"]
-                    if metadata["artist"]:
-                        display_name += f" - {metadata['artist']}"
-                        
-                    self.playlist_widget.addItem(display_name)
-                
-                # Save the library
-                self.save_library()
-                
-                if self.player.state() != QMediaPlayer.PlayingState:
-                    self.media_playlist.setCurrentIndex(0)
-                    self.player.play()
-                    self.btn_play.setIcon(icon_from_svg(SVG_PAUSE))
-                    self.timer.start()
-                
-                # Always change view back to main view (home)
-                self.content_area.setCurrentIndex(0)
-                
+            if self.scan_replaces_queue or self.indexer:
                 QMessageBox.information(
                     self, "Success", 
                     f"Added {len(audio_files)} songs from folder"
                 )
-            else:
-                QMessageBox.warning(
-                    self, "No Audio Files", 
-                    "No audio files were found in the selected folder"
-                )
+        else:
+            if not self.indexer:
+                self.library_scanner.finish_scan()
+            QMessageBox.warning(
+                self, "No Audio Files", 
+                "No audio files were found in the selected folder"
+            )
     
-    def scan_folder_for_audio(self, folder_path):
-        """Scan a folder recursively for audio files"""
-        audio_extensions = ['.mp3', '.wav', '.flac', '.ogg']
-        audio_files = []
-        
-        for root, dirs, files in os.walk(folder_path):
-            for file in files:
-                if any(file.lower().endswith(ext) for ext in audio_extensions):
-                    audio_files.append(os.path.join(root, file))
-                    
-        return audio_files
-
     def play_selected_song(self):
         index = self.playlist_widget.currentRow()
         if index >= 0:
@@ -891,21 +5025,40 @@ class SpotifyLikePlayer(QWidget):
         self.btn_play.setIcon(icon_from_svg(SVG_PAUSE))
 
     def update_position(self, position):
-        self.position_slider.blockSignals(True)
-        self.position_slider.setValue(position)
-        self.position_slider.blockSignals(False)
-        self.label_current_time.setText(self.ms_to_time(position))
+        self.ui_scheduler.schedule("position", self.render_position)
+        if self.remote_server:
+            self.remote_server.publish("position", {"position": position, "duration": self.player.duration()})
+
+    def render_position(self):
+        position = self.player.position()
+        self.last_position_render = time.monotonic()
+        if self.position_slider.value() != position:
+            self.position_slider.blockSignals(True)
+            self.position_slider.setValue(position)
+            self.position_slider.blockSignals(False)
+        current_time = self.ms_to_time(position)
+        if self.label_current_time.text() != current_time:
+            self.label_current_time.setText(current_time)
 
     def update_duration(self, duration):
         self.position_slider.setRange(0, duration)
         self.label_duration.setText(self.ms_to_time(duration))
+        # Pick up where the previous session left off once the track is loaded
+        if self.resume_position and duration > 0:
+            self.player.setPosition(min(self.resume_position, duration))
+            self.resume_position = 0
 
     def set_position(self, position):
         self.player.setPosition(position)
 
     def refresh_position(self):
-        pos = self.player.position()
-        self.update_position(pos)
+        if self.ui_scheduler.paused:
+            # Playback was started while hidden; showing the window starts it again
+            self.timer.stop()
+            return
+        # positionChanged normally keeps up; only step in when it has gone quiet
+        if time.monotonic() - self.last_position_render >= self.timer.interval() / 1000:
+            self.update_position(self.player.position())
 
     def change_volume(self, value):
         self.player.setVolume(value)
@@ -918,9 +5071,12 @@ class SpotifyLikePlayer(QWidget):
     # Playlist management functions
     def update_playlists_dropdown(self):
         """Update the playlists dropdown with all available playlists"""
+        current_playlist = self.playlists_dropdown.currentText()
         self.playlists_dropdown.clear()
         playlist_names = self.playlist_manager.get_playlist_names()
         self.playlists_dropdown.addItems(playlist_names)
+        if current_playlist in playlist_names:
+            self.playlists_dropdown.setCurrentText(current_playlist)
 
     def create_new_playlist(self):
         """Create a new playlist"""
@@ -931,7 +5087,6 @@ class SpotifyLikePlayer(QWidget):
         
         if ok and name:
             if self.playlist_manager.create_playlist(name):
-                self.update_playlists_dropdown()
                 # Select the newly created playlist
                 self.playlists_dropdown.setCurrentText(name)
                 QMessageBox.information(self, "Success", f"Playlist '{name}' created!")
@@ -954,22 +5109,135 @@ class SpotifyLikePlayer(QWidget):
         
         if result == QMessageBox.Yes:
             if self.playlist_manager.delete_playlist(current_playlist):
-                self.update_playlists_dropdown()
                 QMessageBox.information(self, "Success", f"Playlist '{current_playlist}' deleted!")
             else:
                 QMessageBox.warning(self, "Error", "Failed to delete playlist!")
 
+    def import_playlist_file(self):
+        """Import a playlist file, matching its entries against the library"""
+        filepath, _ = QFileDialog.getOpenFileName(
+            self, "Import Playlist", self.last_folder_path,
+            "Playlists (*.m3u *.m3u8 *.pls *.xspf)"
+        )
+        if not filepath:
+            return
+            
+        name = self.playlist_manager.import_playlist(filepath, self.library_index)
+        if name:
+            self.playlists_dropdown.setCurrentText(name)
+            QMessageBox.information(
+                self, "Success",
+                f"Imported {len(self.playlist_manager.get_playlist(name))} tracks into '{name}'!"
+            )
+        else:
+            QMessageBox.warning(self, "Error", "Failed to import playlist!")
+
+    def export_current_playlist(self):
+        """Export the selected playlist to a playlist file"""
+        current_playlist = self.playlists_dropdown.currentText()
+        filepath, _ = QFileDialog.getSaveFileName(
+            self, "Export Playlist", f"{current_playlist}.m3u8",
+            "M3U8 (*.m3u8);;M3U (*.m3u);;PLS (*.pls);;XSPF (*.xspf)"
+        )
+        if not filepath:
+            return
+        if os.path.splitext(filepath)[1].lower() not in PLAYLIST_FILE_EXTENSIONS:
+            filepath += ".m3u8"
+            
+        if self.playlist_manager.export_playlist(current_playlist, filepath):
+            QMessageBox.information(self, "Success", f"Playlist '{current_playlist}' exported!")
+        else:
+            QMessageBox.warning(self, "Error", "Failed to export playlist!")
+
+    def sync_current_playlist(self):
+        """Mirror the selected playlist into a device folder on a background thread"""
+        current_playlist = self.playlists_dropdown.currentText()
+        target_dir = QFileDialog.getExistingDirectory(
+            self, "Select Device Folder", "", QFileDialog.ShowDirsOnly
+        )
+        if not target_dir:
+            return
+        self.sync_playlist_btn.setEnabled(False)
+        self.sync_playlist_btn.setText("Syncing...")
+
+        def run():
+            try:
+                summary = self.playlist_manager.sync_playlist(current_playlist, target_dir)
+            except Exception as e:
+                print(f"Error syncing playlist: {e}")
+                summary = {"error": str(e)}
+            self.sync_finished.emit(current_playlist, summary)
+
+        threading.Thread(target=run, name="muse-sync", daemon=True).start()
+
+    def playlist_synced(self, name, summary):
+        self.sync_playlist_btn.setEnabled(True)
+        self.sync_playlist_btn.setText("Sync to Device")
+        if not summary or "error" in summary:
+            QMessageBox.warning(self, "Error", f"Failed to sync playlist '{name}'!")
+            return
+        message = (f"Synced '{name}' in {summary['seconds']:.1f}s: {summary['copied']} copied, "
+                   f"{summary['kept']} unchanged, {summary['deleted']} removed.")
+        if summary["failed"] or summary["missing"]:
+            message += f"\n{summary['failed']} failed to copy, {summary['missing']} source files missing."
+        QMessageBox.information(self, "Sync to Device", message)
+
     def load_selected_playlist(self):
         """Load the selected playlist content into the view"""
         current_playlist = self.playlists_dropdown.currentText()
         playlist_content = self.playlist_manager.get_playlist(current_playlist)
         
         self.playlist_content_list.clear()
-        for track in playlist_content:
-            display_name = track["title"]
-            if track["artist"]:
-                display_name += f" - {track['artist']}"
-            self.playlist_content_list.addItem(display_name)
+        self.playlist_content_list.addItems([self.track_display_name(track) for track in playlist_content])
+        self.update_playlist_totals()
+
+    def update_playlist_totals(self):
+        current_playlist = self.playlists_dropdown.currentText()
+        totals = self.playlist_manager.playlist_totals(current_playlist)
+        self.playlist_totals_label.setText(totals.describe() if current_playlist else "")
+
+    def update_library_totals(self):
+        totals = self.library_index.totals
+        self.library_totals_label.setText(f"Library: {totals.describe()}" if totals.count else "")
+
+    def playlist_rows_inserted(self, name, row, entries):
+        if name == self.playlists_dropdown.currentText():
+            self.playlist_content_list.insertItems(row, [self.track_display_name(entry) for entry in entries])
+            self.update_playlist_totals()
+
+    def playlist_rows_removed(self, name, row, count):
+        if name == self.playlists_dropdown.currentText():
+            for _ in range(count):
+                self.playlist_content_list.takeItem(row)
+            self.update_playlist_totals()
+
+    def playlist_rows_moved(self, name, row, count, destination):
+        if name == self.playlists_dropdown.currentText():
+            items = [self.playlist_content_list.takeItem(row) for _ in range(count)]
+            for offset, item in enumerate(items):
+                self.playlist_content_list.insertItem(destination + offset, item)
+
+    def selected_playlist_rows(self):
+        return [index.row() for index in self.playlist_content_list.selectedIndexes()]
+
+    def show_playlist_menu(self, pos):
+        current_playlist = self.playlists_dropdown.currentText()
+        rows = self.selected_playlist_rows()
+        menu = QMenu(self)
+        remove_action = menu.addAction(f"Remove {len(rows)} Selected" if len(rows) > 1 else "Remove")
+        remove_action.setEnabled(bool(rows))
+        top_action = menu.addAction("Move to Top")
+        # Ranges move as a block, so only offer it for a contiguous selection
+        top_action.setEnabled(bool(rows) and max(rows) - min(rows) + 1 == len(rows))
+        dedupe_action = menu.addAction("Remove Duplicates")
+        action = menu.exec_(self.playlist_content_list.viewport().mapToGlobal(pos))
+        if action == remove_action:
+            self.playlist_manager.remove_tracks(current_playlist, rows)
+        elif action == top_action:
+            self.playlist_manager.move_tracks(current_playlist, min(rows), len(rows), 0)
+        elif action == dedupe_action:
+            removed = self.playlist_manager.dedupe_playlist(current_playlist)
+            QMessageBox.information(self, "Remove Duplicates", f"Removed {removed} duplicate tracks.")
 
     def load_playlist_to_player(self):
         """Load the selected playlist into the media player"""
@@ -980,33 +5248,24 @@ class SpotifyLikePlayer(QWidget):
             QMessageBox.information(self, "Empty Playlist", "This playlist is empty!")
             return
             
-        # Clear current playlist
-        self.media_playlist.clear()
-        self.playlist_widget.clear()
-        self.track_paths = []
-        self.track_metadatas = []
-        
-        # Add tracks from playlist
+        # Replace the queue with the tracks that still exist, following moved ones
+        # to their library path by fingerprint
+        existing = set(self.existing_paths(track["path"] for track in playlist_content))
+        tracks = []
         for track in playlist_content:
-            path = track["path"]
-            if os.path.exists(path):
-                url = QUrl.fromLocalFile(path)
-                self.media_playlist.addMedia(QMediaContent(url))
-                
-                metadata = self.extract_metadata(path)
-                self.track_paths.append(path)
-                self.track_metadatas.append(metadata)
-                
-                display_name = track["title"]
-                if track["artist"]:
-                    display_name += f" - {track['artist']}"
-                self.playlist_widget.addItem(display_name)
+            if track["path"] not in existing:
+                path = self.library_index.path_for_fingerprint(track.get("fingerprint"))
+                if path is None:
+                    continue
+                track = dict(track, path=path)
+            tracks.append(dict(track))
+        self.play_queue.replace(tracks)
         
         # Update title
         self.title_label.setText(f"Playlist: {current_playlist}")
         
         # Start playing if tracks were added
-        if self.media_playlist.mediaCount() > 0:
+        if len(self.play_queue) > 0:
             self.media_playlist.setCurrentIndex(0)
             self.player.play()
             self.btn_play.setIcon(icon_from_svg(SVG_PAUSE))
@@ -1020,7 +5279,7 @@ class SpotifyLikePlayer(QWidget):
     def add_current_to_playlist(self):
         """Add currently playing song to a playlist"""
         current_index = self.media_playlist.currentIndex()
-        if current_index < 0 or current_index >= len(self.track_paths):
+        if current_index < 0 or current_index >= len(self.play_queue):
             QMessageBox.information(self, "No Song Playing", "No song is currently playing!")
             return
             
@@ -1034,35 +5293,126 @@ class SpotifyLikePlayer(QWidget):
         )
         
         if ok and playlist_name:
-            track_path = self.track_paths[current_index]
-            metadata = self.track_metadatas[current_index]
+            metadata = self.play_queue[current_index]
+            track_path = metadata["path"]
             
             if self.playlist_manager.add_to_playlist(playlist_name, track_path, metadata):
                 QMessageBox.information(
                     self, "Success", 
                     f"'{metadata['title']}' added to playlist '{playlist_name}'!"
                 )
-                
-                # If currently viewing the playlist that was modified, refresh the view
-                if self.playlists_dropdown.currentText() == playlist_name:
-                    self.load_selected_playlist()
             else:
                 QMessageBox.warning(self, "Error", "Failed to add to playlist!")
 
     def remove_from_current_playlist(self):
-        """Remove selected song from current playlist"""
+        """Remove the selected songs from the current playlist in one step"""
         current_playlist = self.playlists_dropdown.currentText()
-        selected_row = self.playlist_content_list.currentRow()
+        rows = self.selected_playlist_rows()
         
-        if selected_row >= 0:
-            if self.playlist_manager.remove_from_playlist(current_playlist, selected_row):
-                self.playlist_content_list.takeItem(selected_row)
-                QMessageBox.information(self, "Success", "Track removed from playlist!")
-            else:
-                QMessageBox.warning(self, "Error", "Failed to remove track!")
+        if rows:
+            # The view follows the manager's removal signals
+            if not self.playlist_manager.remove_tracks(current_playlist, rows):
+                QMessageBox.warning(self, "Error", "Failed to remove tracks!")
         else:
             QMessageBox.information(self, "No Selection", "Please select a track to remove.")
 
+    # Albums
+    def open_albums(self):
+        self.content_area.setCurrentWidget(self.albums_view)
+        if self.albums_stale:
+            self.refresh_albums()
+
+    def refresh_albums(self):
+        self.album_refresh_timer.stop()
+        self.albums_stale = False
+        self.album_model.set_albums(group_albums(self.track_paths, self.track_metadatas))
+        self.album_range_timer.start()
+
+    def update_album_range(self):
+        """Tell the model which rows are on screen; the grid is uniform, so this is arithmetic"""
+        grid = self.album_grid.gridSize()
+        viewport = self.album_grid.viewport()
+        per_row = max(1, viewport.width() // grid.width())
+        top = self.album_grid.verticalScrollBar().value()
+        first = top // grid.height() * per_row
+        last = ((top + viewport.height()) // grid.height() + 1) * per_row - 1
+        self.album_model.set_visible_range(first, last)
+
+    def load_album_thumbnail(self, path):
+        """Cover bytes for the album grid, through the thumbnail cache (worker thread)"""
+        metadata = self.library_index.get_metadata(path) or {}
+        return self.thumbnail_cache.load(
+            metadata.get("fingerprint") or path, functools.partial(self.load_album_art, path, metadata)
+        )
+
+    def play_album(self, index):
+        album = self.album_model.albums[index.row()]
+        self.play_queue.replace(
+            make_track_entry(path, self.library_index.get_metadata(path)) for path in album["paths"]
+        )
+        self.title_label.setText(f"Album: {album['title']}")
+        self.media_playlist.setCurrentIndex(0)
+        self.player.play()
+        self.btn_play.setIcon(icon_from_svg(SVG_PAUSE))
+        self.timer.start()
+        self.content_area.setCurrentIndex(0)
+
+    # Discover
+    def ensure_similarity_engine(self):
+        """Build the similarity matrix on first use; later library changes add rows"""
+        if self.similarity_engine is None:
+            self.similarity_engine = SimilarityEngine()
+            self.similarity_engine.rebuild(
+                self.track_paths, self.track_metadatas, self.play_history.co_listened()
+            )
+        return self.similarity_engine
+
+    def open_discover(self):
+        self.content_area.setCurrentWidget(self.discover_view)
+        if self.discover_list.count() == 0:
+            self.show_top_tracks()
+
+    def show_top_tracks(self):
+        """Fill the Discover list with this month's most played tracks"""
+        top_tracks = self.play_history.top_tracks(50, self.play_history.this_month())
+        self.discover_list.clear()
+        if top_tracks:
+            self.discover_label.setText("Your most played tracks this month")
+        for track, plays in top_tracks:
+            self.discover_list.addItem(f"{self.track_display_name(track)}  ({plays} plays)")
+            self.discover_list.item(self.discover_list.count() - 1).setData(Qt.UserRole, track)
+
+    def show_more_like_this(self):
+        """List the library tracks most similar to the one playing"""
+        current_index = self.media_playlist.currentIndex()
+        if current_index < 0 or current_index >= len(self.play_queue):
+            QMessageBox.information(self, "No Song Playing", "No song is currently playing!")
+            return
+            
+        current = self.play_queue[current_index]
+        engine = self.ensure_similarity_engine()
+        if current["path"] not in engine.rows:
+            engine.add_tracks([current["path"]], [self.extract_metadata(current["path"])])
+            
+        self.discover_list.clear()
+        self.discover_label.setText(f"More like {self.track_display_name(current)}")
+        for path, score in engine.similar(current["path"], 50):
+            metadata = self.library_index.get_metadata(path) or self.extract_metadata(path)
+            track = make_track_entry(path, metadata)
+            self.discover_list.addItem(self.track_display_name(track))
+            self.discover_list.item(self.discover_list.count() - 1).setData(Qt.UserRole, track)
+
+    def play_discovered_track(self, item):
+        track = item.data(Qt.UserRole)
+        row = self.play_queue.index_of(track["path"])
+        if row < 0:
+            row = self.media_playlist.currentIndex() + 1
+            self.play_queue.insert(row, [dict(track)])
+        self.media_playlist.setCurrentIndex(row)
+        self.player.play()
+        self.btn_play.setIcon(icon_from_svg(SVG_PAUSE))
+        self.timer.start()
+
     def open_search(self):
         """Open search dialog"""
         if not self.track_paths:
@@ -1075,7 +5425,13 @@ class SpotifyLikePlayer(QWidget):
         if result == QDialog.Accepted:
             index = search_dialog.get_selected_index()
             if index >= 0:
-                self.media_playlist.setCurrentIndex(index)
+                # Search covers the whole library; queue the hit next if it is not queued
+                path = self.track_paths[index]
+                row = self.play_queue.index_of(path)
+                if row < 0:
+                    row = self.media_playlist.currentIndex() + 1
+                    self.play_queue.insert(row, [make_track_entry(path, self.track_metadatas[index])])
+                self.media_playlist.setCurrentIndex(row)
                 self.player.play()
                 self.btn_play.setIcon(icon_from_svg(SVG_PAUSE))
                 self.timer.start()
@@ -1083,65 +5439,303 @@ class SpotifyLikePlayer(QWidget):
                 self.content_area.setCurrentIndex(0)
 
     def save_library(self):
-        """Save the current library to a file"""
-        library_data = {
-            "track_paths": self.track_paths,
-            "track_metadatas": self.track_metadatas,
-            "last_folder": self.last_folder_path
-        }
-        
-        try:
-            with open(self.library_file, 'wb') as f:
-                pickle.dump(library_data, f)
-                print(f"Library saved: {len(self.track_paths)} tracks")
-        except Exception as e:
-            print(f"Error saving library: {e}")
-            
-    def load_library(self):
-        """Load the library from the saved file"""
-        if not os.path.exists(self.library_file):
-            print("No saved library found.")
+        """Save the current library to a file, unless the indexer daemon owns it"""
+        if self.indexer:
             return
+        write_library_file(self.library_file, self.track_paths, self.track_metadatas, self.last_folder_path)
             
-        try:
-            with open(self.library_file, 'rb') as f:
-                library_data = pickle.load(f)
-                
-                self.track_paths = library_data.get("track_paths", [])
-                self.track_metadatas = library_data.get("track_metadatas", [])
-                self.last_folder_path = library_data.get("last_folder", "")
-                
-                # Populate the playlist widget and media playlist
-                self.playlist_widget.clear()
-                self.media_playlist.clear()
-                
-                for i, (path, metadata) in enumerate(zip(self.track_paths, self.track_metadatas)):
-                    if os.path.exists(path):
-                        url = QUrl.fromLocalFile(path)
-                        self.media_playlist.addMedia(QMediaContent(url))
-                        
-                        display_name = metadata["title"]
-                        if metadata["artist"]:
-                            display_name += f" - {metadata['artist']}"
-                            
-                        self.playlist_widget.addItem(display_name)
-                
-                print(f"Library loaded: {len(self.track_paths)} tracks")
-        except Exception as e:
-            print(f"Error loading library: {e}")
+    def load_library(self):
+        """Load the library from the indexer daemon when one runs, else from the saved file"""
+        if self.indexer:
+            try:
+                self.apply_library(self.indexer.request("library"))
+                print(f"Library loaded from indexer: {len(self.track_paths)} tracks")
+                return
+            except Exception as e:
+                print(f"Error loading library from indexer: {e}")
+        library_data = read_library_file(self.library_file)
+        if library_data:
+            self.apply_library(library_data)
+
+    def apply_library(self, library_data):
+        self.track_paths = library_data.get("track_paths", [])
+        self.track_metadatas = library_data.get("track_metadatas", [])
+        self.last_folder_path = library_data.get("last_folder", "") or self.last_folder_path
+        self.library_index = LibraryIndex(self.track_paths, self.track_metadatas)
+        self.similarity_engine = None
+        self.library_changed()
+
+    def library_changed(self):
+        """Refresh totals after the library was replaced, filling older playlist entries"""
+        if self.playlist_manager.fill_track_stats(self.library_index):
+            self.update_playlist_totals()
+        self.library_updated()
+
+    def library_updated(self):
+        """Library tracks were added or changed: refresh totals and the album grid"""
+        self.update_library_totals()
+        self.albums_stale = True
+        if self.content_area.currentWidget() is self.albums_view and not self.album_refresh_timer.isActive():
+            self.album_refresh_timer.start()
+
+    def indexer_event(self, event, data):
+        if event == "library":
+            # Another client (or this one) rescanned; the queue is left as it is
+            self.apply_library(data)
+        elif event == "metadata":
+            self.apply_metadata_updates(data)
+        elif event == "disconnected":
+            print("Indexer disconnected; library and playlist changes can no longer be saved")
+
+    def restore_queue(self):
+        """Restore the saved play queue, falling back to the whole library"""
+        self.play_queue.load_queue()
+        if len(self.play_queue) > 0:
+            self.resume_position = self.play_queue.position
+        else:
+            existing = set(self.existing_paths(self.track_paths))
+            self.play_queue.replace(
+                make_track_entry(path, metadata)
+                for path, metadata in zip(self.track_paths, self.track_metadatas)
+                if path in existing
+            )
             
+    def update_scheduler_visibility(self):
+        """Skip UI refresh work, including the position fallback timer, while the window cannot be seen"""
+        if self.isVisible() and not self.isMinimized():
+            if self.ui_scheduler.paused:
+                self.ui_scheduler.schedule("position", self.render_position)
+                self.ui_scheduler.resume()
+                if self.player.state() == QMediaPlayer.PlayingState:
+                    self.timer.start()
+        else:
+            self.ui_scheduler.pause()
+            self.timer.stop()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_scheduler_visibility()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.update_scheduler_visibility()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.WindowStateChange:
+            self.update_scheduler_visibility()
+
     def closeEvent(self, event):
-        """Save library when closing the application"""
+        """Save library and play queue when closing the application"""
         self.save_library()
+        self.queue_save_timer.stop()
+        self.play_queue.current_index = self.media_playlist.currentIndex()
+        self.play_queue.position = self.player.position()
+        self.play_queue.save_queue()
+        if self.remote_server:
+            self.remote_server.stop()
+        self.prefetcher.stop()
+        if self.prefetch_stats:
+            print(self.prefetcher.report())
+        self.album_model.loader.cancel_pending()
         event.accept()
 
 
+class UiLatencyHarness(QObject):
+    """Drives a player through scripted UI scenarios and measures what the user waits for
+
+    A heartbeat timer ticks every HEARTBEAT_MS; the longest gap between ticks while an
+    action is handled is the event-loop stall. Paint events are watched through an
+    application event filter, so the time from sending the input to the first repaint
+    of the target widget is the action-to-repaint latency. Libraries are generated as
+    tiny tagged MP3 files, and the player is expected to run with a throwaway HOME.
+    """
+
+    HEARTBEAT_MS = 5
+    REPAINT_TIMEOUT_MS = 5000
+    SEARCH_QUERY = "track 12"
+
+    def __init__(self, player, max_stall_ms=100, max_latency_ms=200):
+        super().__init__(player)
+        # QtTest is only needed for --ui-benchmark, so it is not a module-level import
+        from PyQt5.QtTest import QTest
+        self.qtest = QTest
+        self.player = player
+        self.max_stall_ms = max_stall_ms
+        self.max_latency_ms = max_latency_ms
+        self.results = []
+        self.target = None
+        self.painted_at = None
+        self.last_beat = 0.0
+        self.max_gap = 0.0
+        self.heartbeat = QTimer(self)
+        self.heartbeat.setInterval(self.HEARTBEAT_MS)
+        self.heartbeat.timeout.connect(self.beat)
+        QApplication.instance().installEventFilter(self)
+
+    def beat(self):
+        now = time.perf_counter()
+        self.max_gap = max(self.max_gap, now - self.last_beat)
+        self.last_beat = now
+
+    def eventFilter(self, obj, event):
+        if (event.type() == QEvent.Paint and self.target is not None and self.painted_at is None
+                and isinstance(obj, QWidget) and (obj is self.target or self.target.isAncestorOf(obj))):
+            self.painted_at = time.perf_counter()
+        return False
+
+    def measure(self, scenario, action, target):
+        """Run one action and record its stall and repaint latency in milliseconds"""
+        self.qtest.qWait(50)
+        self.target, self.painted_at = target, None
+        self.last_beat, self.max_gap = time.perf_counter(), 0.0
+        self.heartbeat.start()
+        started = time.perf_counter()
+        action()
+        deadline = started + self.REPAINT_TIMEOUT_MS / 1000
+        # Keep spinning until the target repainted and the loop has ticked again
+        while (self.painted_at is None or self.last_beat <= self.painted_at) and time.perf_counter() < deadline:
+            self.qtest.qWait(1)
+        self.heartbeat.stop()
+        self.target = None
+        stall = max(0.0, self.max_gap * 1000 - self.HEARTBEAT_MS)
+        latency = (self.painted_at - started) * 1000 if self.painted_at is not None else None
+        self.results.append({
+            "scenario": scenario, "stall_ms": stall, "latency_ms": latency,
+            "failed": stall > self.max_stall_ms or latency is None or latency > self.max_latency_ms
+        })
+
+    def generate_library(self, directory, count):
+        """Write count minimal ID3v2.4-tagged MP3 files and return their paths"""
+        paths = []
+        for i in range(count):
+            frames = b""
+            for frame_id, text in (("TIT2", f"Track {i}"), ("TPE1", f"Artist {i % 97}"),
+                                   ("TALB", f"Album {i % 401}")):
+                data = b"\x03" + text.encode("utf-8")
+                frames += frame_id.encode("latin-1") + bytes(
+                    [(len(data) >> shift) & 0x7F for shift in (21, 14, 7, 0)]
+                ) + b"\x00\x00" + data
+            size = bytes([(len(frames) >> shift) & 0x7F for shift in (21, 14, 7, 0)])
+            path = os.path.join(directory, f"{i:06}.mp3")
+            with open(path, "wb") as f:
+                f.write(b"ID3\x04\x00\x00" + size + frames + b"\x00" * 64)
+            paths.append(path)
+        return paths
+
+    def run(self, directory, track_count=5000):
+        """Generate a library, run every scenario and return the per-action results"""
+        player = self.player
+        paths = self.generate_library(directory, track_count)
+        player.track_paths = paths
+        player.track_metadatas = player.library_scanner.extract_metadata_many(paths)
+        player.library_index = LibraryIndex(player.track_paths, player.track_metadatas)
+        player.playlist_manager.create_playlist("Benchmark")
+        player.playlist_manager.add_tracks("Benchmark", [
+            make_track_entry(path, metadata) for path, metadata in zip(paths, player.track_metadatas)
+        ])
+        player.show()
+        self.qtest.qWaitForWindowExposed(player)
+
+        # Load Playlist: replace the queue from the playlist view
+        player.content_area.setCurrentIndex(1)
+        player.playlists_dropdown.setCurrentText("Benchmark")
+        self.measure("load playlist", lambda: self.qtest.mouseClick(player.load_playlist_btn, Qt.LeftButton),
+                     player.playlist_widget)
+
+        # Next: skip through the freshly loaded queue
+        for _ in range(5):
+            self.measure("next", lambda: self.qtest.mouseClick(player.btn_next, Qt.LeftButton),
+                         player.song_title_label)
+
+        # Search: each keystroke filters the whole library
+        dialog = SearchDialog(player, player.track_paths, player.track_metadatas)
+        dialog.show()
+        self.qtest.qWaitForWindowExposed(dialog)
+        for character in self.SEARCH_QUERY:
+            self.measure("search keystroke", lambda: self.qtest.keyClick(dialog.search_input, character),
+                         dialog.results_list)
+        dialog.close()
+
+        # View switches
+        self.measure("open playlists", lambda: self.qtest.mouseClick(player.btn_playlists, Qt.LeftButton),
+                     player.content_area)
+        self.measure("open home", lambda: self.qtest.mouseClick(player.btn_home, Qt.LeftButton),
+                     player.content_area)
+        return self.results
+
+    def report(self):
+        """Print per-scenario worst cases; returns True when every action met the thresholds"""
+        print(f"{'scenario':<18}{'runs':>6}{'max stall ms':>14}{'max latency ms':>16}")
+        scenarios = OrderedDict()
+        for result in self.results:
+            scenarios.setdefault(result["scenario"], []).append(result)
+        for scenario, results in scenarios.items():
+            latencies = [result["latency_ms"] for result in results]
+            latency = "no repaint" if None in latencies else f"{max(latencies):.1f}"
+            flag = "  FAIL" if any(result["failed"] for result in results) else ""
+            print(f"{scenario:<18}{len(results):>6}{max(r['stall_ms'] for r in results):>14.1f}"
+                  f"{latency:>16}{flag}")
+        return not any(result["failed"] for result in self.results)
+
+
 def main():
-    app = QApplication(sys.argv)
-    player = SpotifyLikePlayer()
+    parser = argparse.ArgumentParser(description="Muse music player")
+    parser.add_argument("--remote-port", type=int, default=None,
+                        help="serve the localhost HTTP/WebSocket remote control on this port "
+                             "(0 picks a free one); clients authenticate with ~/.muse_remote_token")
+    parser.add_argument("--network-mode", action="store_true",
+                        help="use parallel, stat-cached I/O even where no network mount is detected")
+    parser.add_argument("--prefetch-budget-mb", type=int, default=QueuePrefetcher.BYTE_BUDGET // 1048576,
+                        help="how much of the upcoming queue to read ahead into the page cache")
+    parser.add_argument("--prefetch-stats", action="store_true",
+                        help="print prefetch hit rate and time to play on exit")
+    parser.add_argument("--indexer", action="store_true",
+                        help="run the shared library/playlist indexer daemon instead of the player")
+    parser.add_argument("--ui-benchmark", action="store_true",
+                        help="run scripted UI scenarios headless on a generated library and exit")
+    parser.add_argument("--benchmark-tracks", type=int, default=5000,
+                        help="size of the generated library for --ui-benchmark")
+    parser.add_argument("--max-stall-ms", type=float, default=100,
+                        help="fail --ui-benchmark when an action stalls the event loop longer")
+    parser.add_argument("--max-latency-ms", type=float, default=200,
+                        help="fail --ui-benchmark when an action takes longer to repaint")
+    args, qt_args = parser.parse_known_args()
+
+    if args.indexer:
+        IndexerDaemon(high_latency_mode=args.network_mode).serve_forever()
+        return
+    if args.ui_benchmark:
+        sys.exit(run_ui_benchmark(args, qt_args))
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    player = SpotifyLikePlayer(high_latency_mode=args.network_mode,
+                               prefetch_budget=args.prefetch_budget_mb * 1048576,
+                               prefetch_stats=args.prefetch_stats)
+    if args.remote_port is not None:
+        player.start_remote_control(args.remote_port)
     player.show()
     sys.exit(app.exec_())
 
 
+def run_ui_benchmark(args, qt_args):
+    """Run UiLatencyHarness offscreen with a throwaway HOME; returns the exit status"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    home = tempfile.mkdtemp(prefix="muse-benchmark-")
+    os.environ["HOME"] = home
+    try:
+        app = QApplication(sys.argv[:1] + qt_args)
+        player = SpotifyLikePlayer()
+        harness = UiLatencyHarness(player, args.max_stall_ms, args.max_latency_ms)
+        library = os.path.join(home, "library")
+        os.makedirs(library)
+        harness.run(library, args.benchmark_tracks)
+        passed = harness.report()
+        player.hide()
+        return 0 if passed else 1
+    finally:
+        shutil.rmtree(home, ignore_errors=True)
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,84 @@
+import json
+import os
+
+import muse
+
+
+def make_sources(folder, names):
+    folder.mkdir(exist_ok=True)
+    tracks = []
+    for name in names:
+        path = folder / name
+        path.write_bytes(name.encode("utf-8") * 100)
+        tracks.append({"path": str(path), "title": name, "artist": "Artist"})
+    return tracks
+
+
+def device_files(device):
+    return sorted(name for name in os.listdir(device) if not name.startswith(".") and not name.endswith(".m3u8"))
+
+
+def test_first_sync_copies_and_resync_keeps(tmp_path):
+    tracks = make_sources(tmp_path / "src", ["a.mp3", "b.mp3"])
+    sync = muse.DeviceSync(str(tmp_path / "device"))
+    summary = sync.sync("Mix", tracks + tracks[:1])
+    assert (summary["copied"], summary["kept"], summary["deleted"]) == (2, 0, 0)
+    assert device_files(tmp_path / "device") == ["a.mp3", "b.mp3"]
+    with open(tmp_path / "device" / "Mix.m3u8", encoding="utf-8") as f:
+        assert [line.strip() for line in f if not line.startswith("#")] == ["a.mp3", "b.mp3", "a.mp3"]
+
+    summary = sync.sync("Mix", tracks)
+    assert (summary["copied"], summary["kept"], summary["deleted"]) == (0, 2, 0)
+
+
+def test_changed_source_is_copied_again(tmp_path):
+    tracks = make_sources(tmp_path / "src", ["a.mp3"])
+    sync = muse.DeviceSync(str(tmp_path / "device"))
+    sync.sync("Mix", tracks)
+    with open(tracks[0]["path"], "ab") as f:
+        f.write(b"new tag")
+    assert sync.sync("Mix", tracks)["copied"] == 1
+    assert (tmp_path / "device" / "a.mp3").read_bytes().endswith(b"new tag")
+
+
+def test_tracks_removed_from_playlist_are_deleted(tmp_path):
+    tracks = make_sources(tmp_path / "src", ["a.mp3", "b.mp3"])
+    device = tmp_path / "device"
+    (device).mkdir()
+    (device / "mine.mp3").write_bytes(b"not from Muse")
+    sync = muse.DeviceSync(str(device))
+    sync.sync("Mix", tracks)
+    summary = sync.sync("Mix", tracks[1:])
+    assert summary["deleted"] == 1
+    # Files Muse did not write are left alone
+    assert device_files(device) == ["b.mp3", "mine.mp3"]
+    with open(device / muse.DeviceSync.MANIFEST_NAME, encoding="utf-8") as f:
+        assert list(json.load(f)) == ["b.mp3"]
+
+
+def test_unreachable_sources_keep_their_device_copy(tmp_path):
+    tracks = make_sources(tmp_path / "src", ["a.mp3", "b.mp3"])
+    device = tmp_path / "device"
+    sync = muse.DeviceSync(str(device))
+    sync.sync("Mix", tracks)
+    # The library is offline: every source is gone for this sync
+    for track in tracks:
+        os.remove(track["path"])
+    summary = sync.sync("Mix", tracks)
+    assert (summary["missing"], summary["deleted"], summary["kept"]) == (2, 0, 2)
+    assert device_files(device) == ["a.mp3", "b.mp3"]
+    with open(device / "Mix.m3u8", encoding="utf-8") as f:
+        assert [line.strip() for line in f if not line.startswith("#")] == ["a.mp3", "b.mp3"]
+
+    # Dropping one from the playlist still deletes it
+    assert sync.sync("Mix", tracks[1:])["deleted"] == 1
+    assert device_files(device) == ["b.mp3"]
+
+
+def test_clashing_names_get_stable_suffixes(tmp_path):
+    first = make_sources(tmp_path / "one", ["song.mp3"])
+    second = make_sources(tmp_path / "two", ["song.mp3"])
+    sync = muse.DeviceSync(str(tmp_path / "device"))
+    sync.sync("Mix", first + second)
+    assert device_files(tmp_path / "device") == ["song (2).mp3", "song.mp3"]
+    assert sync.sync("Mix", second + first)["copied"] == 0
@@ -0,0 +1,33 @@
+import os
+
+import muse
+
+
+def test_export_keeps_scan_fields_and_drops_album_art(tmp_path):
+    root = tmp_path / "music"
+    (root / "Album").mkdir(parents=True)
+    path = str(root / "Album" / "song.mp3")
+    with open(path, "wb") as f:
+        f.write(b"\xff\xfb\x90\x00" + b"\x00" * 413)
+    outside = str(tmp_path / "elsewhere.mp3")
+    metadata = {
+        "title": "Song", "artist": "Artist", "album": "Album", "duration": 26, "bitrate": 128,
+        "sample_rate": 44100, "codec": "mp3", "album_art_ref": None, "fingerprint": "417:abc",
+        "size": 417, "album_art": b"\xff\xd8 picture bytes from an old library",
+    }
+    index_file = str(tmp_path / "library.museidx")
+
+    scanner = muse.LibraryScanner()
+    assert scanner.export_library_index(index_file, str(root), [path, outside], [metadata, dict(metadata)]) == 1
+
+    exported_root, records = muse.read_library_index(index_file)
+    assert exported_root == str(root)
+    [(relative_path, size, _, exported)] = records
+    assert (relative_path, size) == ("Album/song.mp3", 417)
+    assert "album_art" not in exported
+    assert exported == {key: value for key, value in metadata.items() if key != "album_art"}
+
+    track_paths, track_metadatas, summary = scanner.import_library_index(index_file, str(root))
+    assert track_paths == [os.path.join(str(root), "Album", "song.mp3")]
+    assert track_metadatas == [exported]
+    assert (summary["kept"], summary["extracted"], summary["missing"]) == (1, 0, 0)
@@ -0,0 +1,111 @@
+import json
+import os
+import time
+
+import pytest
+
+import muse
+
+JAN = int(time.mktime((2024, 1, 15, 12, 0, 0, 0, 0, -1)))
+FEB = int(time.mktime((2024, 2, 15, 12, 0, 0, 0, 0, -1)))
+
+
+def track(name, artist="Artist"):
+    return {"path": f"/music/{name}.mp3", "title": name, "artist": artist}
+
+
+def summary(history, months=None):
+    return ([(entry["title"], plays) for entry, plays in history.top_tracks(10, months)],
+            history.top_artists(10, months))
+
+
+@pytest.fixture
+def history():
+    history = muse.PlayHistory()
+    for i, name in enumerate(["a", "a", "b", "a", "c"]):
+        history.record(track(name, "Other" if name == "c" else "Artist"), JAN + i * 60)
+    history.record(track("b"), FEB)
+    history.record(track("b"), FEB + 60)
+    return history
+
+
+def test_top_tracks_by_month_and_all_time(history):
+    assert summary(history, ["2024-01"]) == ([("a", 3), ("b", 1), ("c", 1)], [("Artist", 4), ("Other", 1)])
+    assert summary(history, ["2024-02"]) == ([("b", 2)], [("Artist", 2)])
+    assert summary(history) == ([("a", 3), ("b", 3), ("c", 1)], [("Artist", 6), ("Other", 1)])
+    assert summary(history, ["2023-12"]) == ([], [])
+
+
+def test_log_is_replayed_on_restart(history):
+    expected = summary(history), summary(history, ["2024-01"])
+    reloaded = muse.PlayHistory()
+    assert (summary(reloaded), summary(reloaded, ["2024-01"])) == expected
+    assert sorted(reloaded.co_listened()) == sorted(history.co_listened())
+
+
+def test_compaction_folds_the_log_into_rollups(history):
+    expected = summary(history), summary(history, ["2024-02"])
+    history.compact()
+    assert os.path.getsize(history.log_file) == 0
+    assert (summary(history), summary(history, ["2024-02"])) == expected
+
+    # Rolled-up and uncompacted plays add up, before and after a restart
+    history.record(track("c", "Other"), FEB + 120)
+    reloaded = muse.PlayHistory()
+    assert summary(reloaded, ["2024-02"]) == ([("b", 2), ("c", 1)], [("Artist", 2), ("Other", 1)])
+    assert summary(reloaded)[0] == [("a", 3), ("b", 3), ("c", 2)]
+
+
+def test_compaction_runs_automatically(monkeypatch):
+    monkeypatch.setattr(muse.PlayHistory, "COMPACT_EVERY", 3)
+    history = muse.PlayHistory()
+    for i in range(4):
+        history.record(track("a"), JAN + i)
+    assert os.path.getsize(history.log_file) == history.RECORD.size
+    assert history.top_tracks(1)[0][1] == 4
+
+
+def test_crash_before_truncating_does_not_count_plays_twice(history):
+    with open(history.log_file, "rb") as f:
+        log = f.read()
+    history.compact()
+    # As if the process died after the rollup recorded the log end but before truncation
+    with open(history.log_file, "wb") as f:
+        f.write(log)
+    with open(history.rollup_file) as f:
+        rollup = json.load(f)
+    rollup["log_offset"] = len(log)
+    with open(history.rollup_file, "w") as f:
+        json.dump(rollup, f)
+
+    assert summary(muse.PlayHistory()) == summary(history)
+
+
+def test_crash_after_truncating_replays_the_new_log(history):
+    history.compact()
+    with open(history.rollup_file) as f:
+        rollup = json.load(f)
+    # Truncated, but the rollup still points past the (now shorter) log
+    rollup["log_offset"] = 10 * history.RECORD.size
+    with open(history.rollup_file, "w") as f:
+        json.dump(rollup, f)
+    history.record(track("c", "Other"), FEB + 120)
+
+    reloaded = muse.PlayHistory()
+    assert summary(reloaded)[0] == [("a", 3), ("b", 3), ("c", 2)]
+
+
+def test_torn_last_record_is_ignored(history):
+    with open(history.log_file, "ab") as f:
+        f.write(b"\x01\x02\x03")
+    assert summary(muse.PlayHistory()) == summary(history)
+
+
+def test_back_to_back_plays_are_co_listened():
+    history = muse.PlayHistory()
+    history.record(track("a"), JAN)
+    history.record(track("b"), JAN + 200)
+    history.record(track("b"), JAN + 400)
+    # A long gap starts a new session
+    history.record(track("c"), JAN + 400 + history.SESSION_GAP + 1)
+    assert list(history.co_listened()) == [("/music/a.mp3", "/music/b.mp3", 1)]
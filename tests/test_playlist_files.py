@@ -0,0 +1,100 @@
+import io
+import os
+
+import muse
+
+
+def test_read_m3u_extinf():
+    f = io.StringIO("#EXTM3U\n#EXTINF:123,Artist - Title\nmusic/a.mp3\n\nb.mp3\n")
+    assert list(muse.read_m3u(f)) == [("music/a.mp3", "Title", "Artist"), ("b.mp3", "", "")]
+
+
+def test_read_pls_orders_entries_and_skips_titles_without_files():
+    f = io.StringIO("[playlist]\nFile1=a.mp3\nTitle1=A - One\nTitle2=orphan\nFile3=c.mp3\nNumberOfEntries=3\n")
+    assert list(muse.read_pls(f)) == [("a.mp3", "One", "A"), ("c.mp3", "", "")]
+
+
+def test_read_pls_yields_before_the_file_ends():
+    def lines():
+        for number in range(1, 100001):
+            yield f"File{number}=track{number}.mp3\n"
+            yield f"Title{number}=Track {number}\n"
+            if number == 2:
+                raise AssertionError("read past the first entry before yielding it")
+
+    reader = muse.read_pls(lines())
+    assert next(reader) == ("track1.mp3", "Track 1", "")
+
+
+def test_read_xspf_detaches_finished_tracks():
+    tracks = "".join(
+        f"<track><location>file:///m/{i}.mp3</location><title>T{i}</title><creator>C</creator></track>"
+        for i in range(3)
+    )
+    data = (f'<?xml version="1.0"?><playlist version="1" xmlns="http://xspf.org/ns/0/">'
+            f"<trackList>{tracks}</trackList></playlist>").encode("utf-8")
+    assert list(muse.read_xspf(io.BytesIO(data))) == [
+        ("file:///m/0.mp3", "T0", "C"), ("file:///m/1.mp3", "T1", "C"), ("file:///m/2.mp3", "T2", "C")
+    ]
+
+
+def test_playlist_round_trip(tmp_path):
+    tracks = [
+        {"path": str(tmp_path / "music" / "a b.mp3"), "title": "Song & Co", "artist": "Band"},
+        {"path": str(tmp_path / "music" / "c.flac"), "title": "Other", "artist": ""},
+    ]
+    for extension in (".m3u8", ".pls", ".xspf"):
+        filepath = str(tmp_path / f"list{extension}")
+        muse.write_playlist_file(filepath, tracks)
+        index = muse.LibraryIndex([track["path"] for track in tracks], [dict(track) for track in tracks])
+        read = [(index.resolve(location, str(tmp_path)), title, artist)
+                for location, title, artist in muse.read_playlist_file(filepath)]
+        assert read == [(track["path"], track["title"], track["artist"]) for track in tracks], extension
+
+
+def test_playlist_round_trip_with_relative_locations(tmp_path):
+    tracks = [
+        {"path": str(tmp_path / "music" / "a b.mp3"), "title": "Song & Co", "artist": "Band"},
+        {"path": str(tmp_path / "other" / "c%d.flac"), "title": "Other", "artist": ""},
+    ]
+    folder = str(tmp_path / "lists")
+    os.makedirs(folder)
+    for extension in (".m3u8", ".pls", ".xspf"):
+        filepath = os.path.join(folder, f"list{extension}")
+        muse.write_playlist_file(filepath, tracks, relative_to=folder)
+        locations = [location for location, _, _ in muse.read_playlist_file(filepath)]
+        assert locations == [os.path.join("..", "music", "a b.mp3"), os.path.join("..", "other", "c%d.flac")], extension
+        index = muse.LibraryIndex([track["path"] for track in tracks], [dict(track) for track in tracks])
+        assert [index.resolve(location, folder) for location in locations] == [track["path"] for track in tracks]
+
+    with open(os.path.join(folder, "list.xspf"), encoding="utf-8") as f:
+        assert "<location>../music/a%20b.mp3</location>" in f.read()
+
+
+def make_index(*paths):
+    return muse.LibraryIndex(paths, [{"title": "", "artist": ""} for _ in paths])
+
+
+def test_resolve_exact_and_relative_paths():
+    index = make_index("/music/Album/01 - Intro.mp3")
+    assert index.resolve("/music/Album/01 - Intro.mp3") == "/music/Album/01 - Intro.mp3"
+    assert index.resolve("Album/01 - Intro.mp3", "/music") == "/music/Album/01 - Intro.mp3"
+    assert index.resolve("file:///music/Album/01%20-%20Intro.mp3") == "/music/Album/01 - Intro.mp3"
+
+
+def test_resolve_prefers_the_longest_matching_folder_run():
+    index = make_index("/music/A/Album/01 - Intro.mp3", "/music/B/Other/01 - Intro.mp3")
+    assert index.resolve("/old/disk/B/Other/01 - Intro.mp3") == "/music/B/Other/01 - Intro.mp3"
+
+
+def test_resolve_unique_file_name_is_relinked():
+    index = make_index("/music/Album/Unique Song.mp3")
+    assert index.resolve("/old/place/Unique Song.mp3") == "/music/Album/Unique Song.mp3"
+
+
+def test_resolve_keeps_ambiguous_file_name_matches_unresolved():
+    index = make_index("/music/A/01 - Intro.mp3", "/music/B/01 - Intro.mp3")
+    expected = os.path.normpath("/old/C/01 - Intro.mp3")
+    assert index.resolve("/old/C/01 - Intro.mp3") == expected
+    tied = make_index("/music/A/Disc/01 - Intro.mp3", "/music/B/Disc/01 - Intro.mp3")
+    assert tied.resolve("/old/Disc/01 - Intro.mp3") == os.path.normpath("/old/Disc/01 - Intro.mp3")
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+import muse
+
+
+def entry(name, duration=1000, size=100):
+    return {"path": f"/music/{name}.mp3", "title": name, "artist": "", "duration": duration, "size": size}
+
+
+def make_manager(names):
+    manager = muse.PlaylistManager()
+    manager.create_playlist("Mix")
+    manager.add_tracks("Mix", [entry(name) for name in names])
+    return manager
+
+
+def record_signals(manager):
+    events = []
+    manager.tracks_inserted.connect(
+        lambda name, row, entries: events.append(("inserted", row, [e["title"] for e in entries])))
+    manager.tracks_removed.connect(lambda name, row, count: events.append(("removed", row, count)))
+    manager.tracks_moved.connect(
+        lambda name, row, count, destination: events.append(("moved", row, count, destination)))
+    manager.playlists_changed.connect(lambda: events.append(("changed",)))
+    return events
+
+
+def titles(manager):
+    return [track["title"] for track in manager.get_playlist("Mix")]
+
+
+def test_add_tracks_announces_the_inserted_rows():
+    manager = make_manager("abc")
+    events = record_signals(manager)
+    assert manager.add_tracks("Mix", [entry("x")], row=1)
+    assert manager.add_tracks("Mix", [entry("y")])
+    assert events == [("inserted", 1, ["x"]), ("inserted", 4, ["y"])]
+    assert titles(manager) == list("axbcy")
+
+
+def test_remove_tracks_announces_contiguous_ranges_bottom_up():
+    manager = make_manager("abcdefg")
+    events = record_signals(manager)
+    assert manager.remove_tracks("Mix", [1, 2, 4, 5, 6, 99]) == 5
+    assert events == [("removed", 4, 3), ("removed", 1, 2)]
+    assert titles(manager) == ["a", "d"]
+
+
+def test_move_tracks_announces_the_block():
+    manager = make_manager("abcde")
+    events = record_signals(manager)
+    assert manager.move_tracks("Mix", 3, 2, 0)
+    assert events == [("moved", 3, 2, 0)]
+    assert titles(manager) == list("deabc")
+    assert not manager.move_tracks("Mix", 4, 2, 0)
+
+
+def test_replace_tracks_keeps_the_common_prefix_and_suffix():
+    manager = make_manager("abcdef")
+    events = record_signals(manager)
+    assert manager.replace_tracks("Mix", [entry(name) for name in "abxyef"])
+    assert events == [("removed", 2, 2), ("inserted", 2, ["x", "y"])]
+    assert titles(manager) == list("abxyef")
+
+    events.clear()
+    assert manager.replace_tracks("Mix", [entry(name) for name in "abxyef"])
+    assert events == []
+
+
+def test_a_failed_transaction_is_rolled_back(home):
+    manager = make_manager("abc")
+    manager.create_playlist("Other")
+    saved = json.loads((home / ".muse_playlists.json").read_text())
+    events = record_signals(manager)
+
+    with pytest.raises(RuntimeError):
+        with manager.transaction():
+            manager.remove_tracks("Mix", [0])
+            manager.add_tracks("Other", [entry("z")])
+            raise RuntimeError("interrupted")
+
+    assert titles(manager) == list("abc")
+    assert manager.get_playlist("Other") == []
+    assert manager.playlist_totals("Mix").count == 3
+    assert events[-1] == ("changed",)
+    assert json.loads((home / ".muse_playlists.json").read_text()) == saved
+
+    with manager.transaction():
+        manager.remove_tracks("Mix", [0])
+    assert json.loads((home / ".muse_playlists.json").read_text())["Mix"][0]["title"] == "b"
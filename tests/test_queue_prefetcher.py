@@ -0,0 +1,77 @@
+import os
+import threading
+import time
+
+import muse
+
+
+def write_file(path, size):
+    path.write_bytes(b"\x00" * size)
+    return str(path)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_files_are_warm_once_read(tmp_path):
+    paths = [write_file(tmp_path / f"{i}.mp3", 3000) for i in range(3)]
+    prefetcher = muse.QueuePrefetcher(byte_budget=5000, chunked=True)
+    prefetcher.CHUNK_SIZE = 1024
+    try:
+        prefetcher.schedule(paths)
+        wait_for(lambda: len(prefetcher.warm) == 2)
+        assert prefetcher.warm == {paths[0]: 3000, paths[1]: 2000}
+        assert prefetcher.bytes_prefetched == 5000
+    finally:
+        prefetcher.stop()
+
+
+def test_a_file_is_not_warm_until_its_hint_has_been_read_through(tmp_path, monkeypatch):
+    path = write_file(tmp_path / "a.mp3", 4096)
+    prefetcher = muse.QueuePrefetcher()
+    prefetcher.stop()
+    hints = []
+
+    def queue_changed(fd, offset, length, advice):
+        # The queue moves on while the kernel is still reading
+        hints.append(length)
+        prefetcher.generation += 1
+
+    monkeypatch.setattr(muse.os, "posix_fadvise", queue_changed, raising=False)
+    assert prefetcher.warm_file(path, 10000, prefetcher.generation) is None
+    assert hints == [4096]
+
+    monkeypatch.setattr(muse.os, "posix_fadvise", lambda *args: None, raising=False)
+    assert prefetcher.warm_file(path, 10000, prefetcher.generation) == 4096
+
+
+def test_rescheduling_cancels_the_previous_queue(tmp_path, monkeypatch):
+    old = [write_file(tmp_path / f"old{i}.mp3", 2048) for i in range(2)]
+    new = write_file(tmp_path / "new.mp3", 1024)
+    entered, release = threading.Event(), threading.Event()
+
+    def slow_hint(fd, offset, length, advice):
+        if os.fstat(fd).st_size == 2048:
+            entered.set()
+            release.wait(5)
+
+    monkeypatch.setattr(muse.os, "posix_fadvise", slow_hint, raising=False)
+    monkeypatch.setattr(muse, "is_network_path", lambda path: False)
+    prefetcher = muse.QueuePrefetcher()
+    try:
+        prefetcher.schedule(old)
+        assert entered.wait(5)
+        assert prefetcher.warm == {}
+
+        prefetcher.schedule([new])
+        release.set()
+        wait_for(lambda: new in prefetcher.warm)
+        assert prefetcher.warm == {new: 1024}
+        assert prefetcher.bytes_prefetched == 1024
+    finally:
+        release.set()
+        prefetcher.stop()
@@ -0,0 +1,138 @@
+import base64
+import json
+import os
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import muse
+
+
+@pytest.fixture
+def remote(qapp, home):
+    player = muse.SpotifyLikePlayer()
+    player.play_queue.append([{"path": "/music/a.mp3", "title": "A", "artist": "X"}])
+    port = player.start_remote_control(0)
+    assert port
+    with open(os.path.join(home, ".muse_remote_token")) as f:
+        token = f.read()
+    yield player, port, token
+    player.remote_server.stop()
+
+
+def call(qapp, function):
+    """Run a blocking client call on a thread while the GUI thread answers commands"""
+    result = {}
+
+    def run():
+        try:
+            result["value"] = function()
+        except Exception as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while thread.is_alive() and time.monotonic() < deadline:
+        qapp.processEvents()
+        time.sleep(0.005)
+    thread.join(1)
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+def http(port, method, path, token=None, body=None, headers=()):
+    request = urllib.request.Request(f"http://127.0.0.1:{port}{path}", method=method, data=body)
+    if token:
+        request.add_header("Authorization", f"Bearer {token}")
+    for name, value in headers:
+        request.add_header(name, value)
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_http_commands_reach_the_player(qapp, remote):
+    player, port, token = remote
+    status, state = call(qapp, lambda: http(port, "GET", "/state", token))
+    assert status == 200 and state["track"] is None
+    status, queue = call(qapp, lambda: http(port, "GET", "/queue?limit=5", token))
+    assert status == 200 and queue["total"] == 1 and queue["tracks"][0]["title"] == "A"
+    body = json.dumps({"value": 30}).encode("utf-8")
+    status, state = call(qapp, lambda: http(port, "POST", "/volume", token, body,
+                                            [("Content-Type", "application/json")]))
+    assert status == 200 and player.volume_slider.value() == 30
+
+
+def test_requests_without_token_host_or_origin_are_refused(qapp, remote):
+    player, port, token = remote
+    assert call(qapp, lambda: http(port, "POST", "/next"))[0] == 401
+    assert call(qapp, lambda: http(port, "POST", "/next", "wrong"))[0] == 401
+    assert call(qapp, lambda: http(port, "GET", "/library", token, headers=[("Host", "evil.example:80")]))[0] == 403
+    assert call(qapp, lambda: http(port, "POST", "/next", token,
+                                   headers=[("Origin", "https://evil.example")]))[0] == 403
+    assert call(qapp, lambda: http(port, "POST", "/volume", token, b'{"value": 1}',
+                                   [("Content-Type", "text/plain")]))[0] == 415
+
+
+def websocket_first_message(port, path):
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as client:
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        client.sendall((f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nUpgrade: websocket\r\n"
+                        f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\n"
+                        "Sec-WebSocket-Version: 13\r\n\r\n").encode("latin-1"))
+        response = b""
+        while b"\r\n\r\n" not in response:
+            response += client.recv(4096)
+        head, _, rest = response.partition(b"\r\n\r\n")
+        if b" 101 " not in head.split(b"\r\n")[0]:
+            return head.split(b"\r\n")[0].decode("latin-1")
+        while len(rest) < 2:
+            rest += client.recv(4096)
+        length, offset = rest[1] & 0x7F, 2
+        if length == 126:
+            while len(rest) < 4:
+                rest += client.recv(4096)
+            length, offset = int.from_bytes(rest[2:4], "big"), 4
+        while len(rest) < offset + length:
+            rest += client.recv(4096)
+        return json.loads(rest[offset:offset + length])
+
+
+def test_websocket_events_need_the_token(qapp, remote):
+    player, port, token = remote
+    player.remote_server.publish("track", {"index": 0, "track": player.play_queue[0]})
+    message = call(qapp, lambda: websocket_first_message(port, f"/events?token={token}"))
+    assert message == {"event": "track", "data": {"index": 0, "track": player.play_queue[0]}}
+    assert "401" in call(qapp, lambda: websocket_first_message(port, "/events"))
+
+
+def raw_status(port, head):
+    """Send only a request head and return the status code of the reply"""
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as client:
+        client.sendall(head.encode("latin-1"))
+        response = b""
+        while b"\r\n" not in response:
+            chunk = client.recv(4096)
+            if not chunk:
+                break
+            response += chunk
+        return int(response.split()[1])
+
+
+def test_bodies_are_checked_before_they_are_read(qapp, remote):
+    player, port, token = remote
+    head = (f"POST /volume HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nContent-Type: application/json\r\n"
+            "Content-Length: {length}\r\n{auth}\r\n")
+    # No body is ever sent; a server reading it first would hang until the timeout
+    assert call(qapp, lambda: raw_status(port, head.format(length=10 ** 9, auth=""))) == 401
+    auth = f"Authorization: Bearer {token}\r\n"
+    assert call(qapp, lambda: raw_status(port, head.format(length=10 ** 9, auth=auth))) == 413
+    assert call(qapp, lambda: raw_status(port, head.format(length=-5, auth=auth))) == 400
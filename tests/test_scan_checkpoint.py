@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+import muse
+
+MP3_FRAME = b"\xff\xfb\x90\x00" + b"\x00" * 413
+
+
+@pytest.fixture
+def folder(tmp_path):
+    folder = tmp_path / "music"
+    folder.mkdir()
+    for i in range(12):
+        (folder / f"{i:02}.mp3").write_bytes(MP3_FRAME * (i + 1))
+    return str(folder)
+
+
+@pytest.fixture
+def scanner(monkeypatch):
+    monkeypatch.setattr(muse.LibraryScanner, "CHECKPOINT_EVERY", 5)
+    return muse.LibraryScanner()
+
+
+def interrupt_after(scanner, monkeypatch, batches):
+    index_files = scanner.index_files
+    calls = []
+
+    def failing(*args):
+        calls.append(args[0])
+        if len(calls) > batches:
+            raise RuntimeError("killed")
+        return index_files(*args)
+
+    monkeypatch.setattr(scanner, "index_files", failing)
+    return calls
+
+
+def test_checkpoint_records_finished_batches(folder, scanner, monkeypatch):
+    interrupt_after(scanner, monkeypatch, 2)
+    with pytest.raises(RuntimeError):
+        scanner.scan_library(folder)
+    assert scanner.checkpoint.pending_folder() == folder
+    records, _ = scanner.checkpoint.load(folder)
+    assert len(records) == 10
+    assert scanner.checkpoint.load("/some/other/folder") == ({}, {})
+
+
+def test_resume_only_indexes_the_rest_and_keeps_folder_order(folder, scanner, monkeypatch):
+    interrupt_after(scanner, monkeypatch, 2)
+    with pytest.raises(RuntimeError):
+        scanner.scan_library(folder)
+
+    resumed = muse.LibraryScanner()
+    calls = interrupt_after(resumed, monkeypatch, 10)
+    progress = []
+    paths, metadatas, _ = resumed.scan_library(folder, progress=lambda p, m: progress.append(len(p)))
+    assert [len(batch) for batch in calls] == [2]
+    assert progress == [10, 2]
+    expected = resumed.scan_folder_for_audio(folder)
+    assert paths == expected
+    # Each file has one more frame than the last, so the metadata must follow its path
+    assert [metadata["duration"] for metadata in metadatas] == [
+        417 * (int(os.path.basename(path)[:2]) + 1) * 8 // 128 for path in paths
+    ]
+
+
+def test_torn_last_batch_is_ignored(folder, scanner, monkeypatch):
+    interrupt_after(scanner, monkeypatch, 1)
+    with pytest.raises(RuntimeError):
+        scanner.scan_library(folder)
+    with open(scanner.checkpoint.checkpoint_file, "ab") as f:
+        f.write(b"\x80\x04\x95 half a pickle")
+    records, _ = scanner.checkpoint.load(folder)
+    assert len(records) == 5
+
+
+def test_finished_scan_clears_the_checkpoint(folder, scanner):
+    paths, _, _ = scanner.scan_library(folder)
+    assert len(paths) == 12
+    assert scanner.checkpoint.pending_folder() == folder
+    scanner.finish_scan()
+    assert scanner.checkpoint.pending_folder() is None
+    assert not os.path.exists(scanner.checkpoint.checkpoint_file)
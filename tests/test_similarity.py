@@ -0,0 +1,33 @@
+import muse
+
+
+def library():
+    paths, metadatas = [], []
+    for artist in ("Alpha", "Beta"):
+        for i in range(4):
+            paths.append(f"/music/{artist}/Album/{i}.mp3")
+            metadatas.append({"title": f"Song {i}", "artist": artist, "album": f"{artist} Album",
+                              "duration": 180000, "bitrate": 320, "sample_rate": 44100, "codec": "mp3"})
+    engine = muse.SimilarityEngine()
+    engine.rebuild(paths, metadatas, [])
+    return engine, paths
+
+
+def test_batch_returns_one_list_per_path_in_order():
+    engine, paths = library()
+    results = engine.similar_batch(["/unknown/a.mp3", paths[0], "/unknown/b.mp3", paths[4]], k=3)
+    assert len(results) == 4
+    assert results[0] == [] and results[2] == []
+    assert [path for path, _ in results[1]] and all("/Alpha/" in path for path, _ in results[1])
+    assert all("/Beta/" in path for path, _ in results[3])
+    assert paths[0] not in [path for path, _ in results[1]]
+    assert {path for path, _ in results[1]} == {path for path, _ in engine.similar(paths[0], k=3)}
+
+
+def test_batch_edge_cases():
+    engine, paths = library()
+    assert engine.similar_batch(["/unknown/a.mp3", "/unknown/b.mp3"]) == [[], []]
+    assert engine.similar_batch([paths[0], paths[1]], k=0) == [[], []]
+    assert len(engine.similar(paths[0], k=100)) == len(paths) - 1
+    assert engine.similar("/unknown/a.mp3") == []
+    assert muse.SimilarityEngine().similar_batch([paths[0]]) == [[]]
@@ -0,0 +1,70 @@
+import muse
+
+# MPEG-1 layer III, 128 kbps, 44.1 kHz: 417 bytes per frame
+MP3_FRAME = b"\xff\xfb\x90\x00" + b"\x00" * 413
+
+
+def write_mp3(path, frames=50):
+    with open(path, "wb") as f:
+        f.write(MP3_FRAME * frames)
+    return str(path)
+
+
+def test_write_tags_sets_and_removes_fields(tmp_path):
+    path = write_mp3(tmp_path / "song.mp3")
+    scanner = muse.LibraryScanner()
+    metadata = scanner.write_tags(path, {"title": "New", "artist": "Someone", "album": "Record"})
+    assert (metadata["title"], metadata["artist"], metadata["album"]) == ("New", "Someone", "Record")
+    assert metadata["fingerprint"] and metadata["duration"]
+
+    metadata = scanner.write_tags(path, {"album": ""})
+    assert (metadata["title"], metadata["album"]) == ("New", "")
+    assert muse.FastTagReader().read(path)["artist"] == "Someone"
+
+
+def test_edit_tags_reports_each_file(tmp_path):
+    good = write_mp3(tmp_path / "good.mp3")
+    bad = tmp_path / "notes.txt"
+    bad.write_text("not audio")
+    updates, errors = muse.LibraryScanner().edit_tags([good, str(bad)], {"artist": "Band"})
+    assert updates[good]["artist"] == "Band"
+    assert list(errors) == [str(bad)]
+
+
+def test_refresh_tracks_rewrites_only_changed_entries():
+    manager = muse.PlaylistManager()
+    manager.create_playlist("Mix")
+    manager.add_tracks("Mix", [
+        {"path": "/a.mp3", "title": "a", "artist": "x", "duration": 1000},
+        {"path": "/b.mp3", "title": "b", "artist": "y", "duration": 2000},
+    ])
+    removed, inserted = [], []
+    manager.tracks_removed.connect(lambda name, row, count: removed.append((row, count)))
+    manager.tracks_inserted.connect(lambda name, row, entries: inserted.append((row, entries)))
+
+    updates = {"/b.mp3": {"title": "B", "artist": "Y", "album": "", "duration": 2000},
+               "/elsewhere.mp3": {"title": "c", "artist": "", "album": ""}}
+    assert manager.refresh_tracks(updates) == 1
+    assert removed == [(1, 1)]
+    assert inserted == [(1, [{"path": "/b.mp3", "title": "B", "artist": "Y", "duration": 2000}])]
+    assert manager.get_playlist("Mix")[0]["title"] == "a"
+    assert manager.refresh_tracks(updates) == 0
+
+
+def test_edits_to_tracks_outside_the_library_leave_totals_alone(qapp):
+    player = muse.SpotifyLikePlayer()
+    library = {"/music/a.mp3": {"title": "a", "artist": "x", "album": "", "duration": 1000, "size": 10},
+               "/music/b.mp3": {"title": "b", "artist": "x", "album": "", "duration": 2000, "size": 20}}
+    player.apply_library({"track_paths": list(library), "track_metadatas": list(library.values())})
+    player.play_queue.append([{"path": "/elsewhere/c.mp3", "title": "c", "artist": ""}])
+
+    player.tags_edited({"updates": {
+        "/music/b.mp3": dict(library["/music/b.mp3"], title="B", duration=2500),
+        "/elsewhere/c.mp3": {"title": "C", "artist": "z", "album": "", "duration": 9000, "size": 90},
+    }, "errors": {}, "stored": False, "count": 2})
+
+    totals = player.library_index.totals
+    expected = muse.TrackTotals(player.track_metadatas)
+    assert (totals.count, totals.duration, totals.size) == (expected.count, expected.duration, expected.size) == (2, 3500, 30)
+    assert "/elsewhere/c.mp3" not in player.library_index
+    assert player.play_queue[0]["title"] == "C"
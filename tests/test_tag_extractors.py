@@ -0,0 +1,174 @@
+import base64
+import io
+import struct
+import wave
+
+import pytest
+from mutagen.flac import FLAC, Picture
+from mutagen.id3 import APIC, ID3, TALB, TIT2, TPE1
+from mutagen.ogg import OggPage
+from mutagen.wave import WAVE
+
+import muse
+
+ART = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4
+
+# MPEG-1 layer III, 128 kbps, 44.1 kHz, stereo, no padding: 417 bytes per frame
+MP3_FRAME = b"\xff\xfb\x90\x00" + b"\x00" * 413
+
+
+def add_id3(path, version, art=True):
+    tags = ID3()
+    tags.add(TIT2(encoding=3, text="Título"))
+    tags.add(TPE1(encoding=3, text="Artist"))
+    tags.add(TALB(encoding=3, text="Album"))
+    if art:
+        tags.add(APIC(encoding=3, mime="image/png", type=3, desc="cover", data=ART))
+    tags.save(path, v2_version=version)
+
+
+def write_flac(path, seconds=3, art=True):
+    total_samples = 44100 * seconds
+    info = struct.pack(">HH", 4096, 4096) + b"\x00" * 6
+    info += ((44100 << 44) | (1 << 41) | (15 << 36) | total_samples).to_bytes(8, "big") + b"\x00" * 16
+    with open(path, "wb") as f:
+        f.write(b"fLaC" + bytes([0x80]) + len(info).to_bytes(3, "big") + info + b"\x00" * 64)
+    audio = FLAC(path)
+    audio["title"], audio["artist"], audio["album"] = "Title", "Artist", "Album"
+    if art:
+        picture = Picture()
+        picture.type, picture.mime, picture.data = 3, "image/png", ART
+        audio.add_picture(picture)
+    audio.save()
+
+
+def write_ogg(path, opus, seconds=3):
+    if opus:
+        identification = b"OpusHead" + bytes([1, 2]) + struct.pack("<HI", 312, 44100) + b"\x00\x00\x00"
+        comment_magic, rate, pre_skip = b"OpusTags", 48000, 312
+    else:
+        identification = (b"\x01vorbis" + struct.pack("<IBIiii", 0, 2, 44100, 0, 128000, 0)
+                          + bytes([0xB8, 1]))
+        comment_magic, rate, pre_skip = b"\x03vorbis", 44100, 0
+    picture = Picture()
+    picture.type, picture.mime, picture.data = 3, "image/png", ART
+    comments = ["METADATA_BLOCK_PICTURE=" + base64.b64encode(picture.write()).decode("ascii"),
+                "TITLE=Title", "ARTIST=Artist", "ALBUM=Album"]
+    packet = comment_magic + struct.pack("<I", 4) + b"test" + struct.pack("<I", len(comments))
+    for comment in comments:
+        packet += struct.pack("<I", len(comment)) + comment.encode("utf-8")
+    packet += b"" if opus else b"\x01"
+
+    first = OggPage()
+    first.packets, first.first = [identification], True
+    pages = [first] + OggPage.from_packets([packet], sequence=1, default_size=1024)
+    audio = OggPage()
+    audio.packets, audio.sequence, audio.last = [b"\x00" * 2000], len(pages), True
+    audio.position = rate * seconds + pre_skip
+    pages.append(audio)
+    with open(path, "wb") as f:
+        for page in pages:
+            page.serial = 7
+            f.write(page.write())
+
+
+def write_wav(path, seconds=2):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(44100)
+        w.writeframes(b"\x00" * 44100 * 4 * seconds)
+    data = bytearray(buffer.getvalue())
+    info = b"INFO"
+    for chunk_id, value in ((b"INAM", "Info title"), (b"IART", "Info artist"), (b"IPRD", "Info album")):
+        value = value.encode("utf-8") + b"\x00"
+        info += chunk_id + struct.pack("<I", len(value)) + value + b"\x00" * (len(value) & 1)
+    data += b"LIST" + struct.pack("<I", len(info)) + info
+    struct.pack_into("<I", data, 4, len(data) - 8)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+@pytest.fixture
+def reader():
+    return muse.FastTagReader()
+
+
+@pytest.mark.parametrize("version", [3, 4])
+def test_mp3_id3_tags_stream_info_and_art(tmp_path, reader, version):
+    path = str(tmp_path / "song.mp3")
+    with open(path, "wb") as f:
+        f.write(MP3_FRAME * 100)
+    add_id3(path, version)
+    metadata = reader.read(path)
+    assert (metadata["title"], metadata["artist"], metadata["album"]) == ("Título", "Artist", "Album")
+    assert (metadata["codec"], metadata["bitrate"], metadata["sample_rate"]) == ("mp3", 128, 44100)
+    assert metadata["duration"] == 417 * 100 * 8 // 128
+    assert metadata["size"] == len(open(path, "rb").read())
+    assert reader.read_picture(path, metadata["album_art_ref"]) == ART
+
+
+def test_flac_tags_stream_info_and_art(tmp_path, reader):
+    path = str(tmp_path / "song.flac")
+    write_flac(path)
+    metadata = reader.read(path)
+    assert (metadata["title"], metadata["artist"], metadata["album"]) == ("Title", "Artist", "Album")
+    assert (metadata["codec"], metadata["sample_rate"], metadata["duration"]) == ("flac", 44100, 3000)
+    assert metadata["bitrate"] == metadata["size"] * 8 // 3000
+    assert reader.read_picture(path, metadata["album_art_ref"]) == ART
+
+
+def test_flac_behind_an_id3_header_is_read_as_flac(tmp_path, reader):
+    path = str(tmp_path / "song.flac")
+    write_flac(path, art=False)
+    with open(path, "rb") as f:
+        flac = f.read()
+    with open(path, "wb") as f:
+        f.write(b"ID3\x04\x00\x00\x00\x00\x01\x00" + b"\x00" * 128 + flac)
+    assert isinstance(reader.extractor_for(path, b"ID3\x04\x00\x00"), muse.FlacExtractor)
+    metadata = reader.read(path)
+    assert (metadata["codec"], metadata["title"], metadata["duration"]) == ("flac", "Title", 3000)
+
+
+def test_id3_head_without_flac_extension_goes_to_mp3(reader):
+    assert isinstance(reader.extractor_for("song.bin", b"ID3\x04\x00\x00"), muse.Mp3Extractor)
+    assert isinstance(reader.extractor_for("song.flac", b"\xff\xfb\x90\x00"), muse.Mp3Extractor)
+
+
+@pytest.mark.parametrize("opus,codec,rate,bitrate", [(False, "vorbis", 44100, 128), (True, "opus", 48000, None)])
+def test_ogg_comments_across_pages(tmp_path, reader, opus, codec, rate, bitrate):
+    path = str(tmp_path / ("song.opus" if opus else "song.ogg"))
+    write_ogg(path, opus)
+    metadata = reader.read(path)
+    assert (metadata["title"], metadata["artist"], metadata["album"]) == ("Title", "Artist", "Album")
+    assert (metadata["codec"], metadata["sample_rate"], metadata["duration"]) == (codec, rate, 3000)
+    assert metadata["bitrate"] == (bitrate if bitrate else metadata["size"] * 8 // 3000)
+    assert metadata["album_art_ref"] == {"format": "ogg"}
+    assert reader.read_picture(path, metadata["album_art_ref"]) == ART
+
+
+def test_wav_info_tags_and_stream_info(tmp_path, reader):
+    path = str(tmp_path / "song.wav")
+    write_wav(path)
+    metadata = reader.read(path)
+    assert (metadata["title"], metadata["artist"], metadata["album"]) == ("Info title", "Info artist", "Info album")
+    assert (metadata["codec"], metadata["sample_rate"], metadata["duration"], metadata["bitrate"]) == (
+        "pcm", 44100, 2000, 1411)
+
+
+def test_wav_id3_chunk_wins_over_info(tmp_path, reader):
+    path = str(tmp_path / "song.wav")
+    write_wav(path)
+    audio = WAVE(path)
+    audio.add_tags()
+    audio.tags.add(TIT2(encoding=3, text="Id3 title"))
+    audio.save()
+    metadata = reader.read(path)
+    assert (metadata["title"], metadata["artist"]) == ("Id3 title", "Info artist")
+
+
+def test_unknown_files_fall_back_to_none(tmp_path, reader):
+    path = tmp_path / "notes.txt"
+    path.write_text("not audio")
+    assert reader.read(str(path)) is None
@@ -0,0 +1,68 @@
+import muse
+
+
+def totals_of(totals):
+    return totals.count, totals.duration, totals.size
+
+
+def track(name, duration, size):
+    return {"path": f"/music/{name}.mp3", "title": name, "artist": "", "duration": duration, "size": size}
+
+
+def test_add_remove_and_describe():
+    totals = muse.TrackTotals([{"duration": 61000, "size": 3 * 1024 * 1024}, {"title": "no stats"}])
+    assert totals_of(totals) == (2, 61000, 3 * 1024 * 1024)
+    assert totals.describe() == "2 songs, 1 min 1 sec, 3.0 MB"
+
+    totals.remove([{"title": "no stats"}])
+    assert totals.describe() == "1 song, 1 min 1 sec, 3.0 MB"
+    totals.add([{"duration": 2 * 3600 * 1000, "size": 2048 * 1024 * 1024}])
+    assert totals.describe() == "2 songs, 2 hr 1 min, 2.0 GB"
+
+
+def test_library_index_replaces_the_totals_of_a_path_it_has():
+    index = muse.LibraryIndex(["/a.mp3", "/b.mp3"], [{"duration": 1000, "size": 10}, {"duration": 2000, "size": 20}])
+    assert totals_of(index.totals) == (2, 3000, 30)
+    index.add("/a.mp3", {"duration": 5000, "size": 50})
+    assert totals_of(index.totals) == (2, 7000, 70)
+    index.add("/c.mp3", {"duration": 1})
+    assert totals_of(index.totals) == (3, 7001, 70)
+
+
+def test_playlist_totals_follow_edits():
+    manager = muse.PlaylistManager()
+    manager.create_playlist("Mix")
+    assert totals_of(manager.playlist_totals("Mix")) == (0, 0, 0)
+
+    def check():
+        fresh = muse.TrackTotals(manager.get_playlist("Mix"))
+        assert totals_of(manager.playlist_totals("Mix")) == totals_of(fresh)
+
+    manager.add_tracks("Mix", [track(name, 1000 * (i + 1), 10 * (i + 1)) for i, name in enumerate("abcdef")])
+    check()
+    manager.add_tracks("Mix", [track("a", 1000, 10)], row=2)
+    check()
+    manager.remove_tracks("Mix", [0, 3, 4])
+    check()
+    manager.move_tracks("Mix", 0, 2, 2)
+    check()
+    manager.replace_tracks("Mix", [track("b", 2000, 20), track("x", 9000, 90), track("f", 6000, 60)])
+    check()
+    assert manager.dedupe_playlist("Mix") == 0
+    manager.add_tracks("Mix", [track("x", 9000, 90)])
+    assert manager.dedupe_playlist("Mix") == 1
+    check()
+    manager.relink({"/music/x.mp3": "/music/y.mp3"})
+    check()
+    assert totals_of(manager.playlist_totals("Mix")) == (3, 17000, 170)
+
+
+def test_filling_in_stats_recounts_playlist_totals():
+    manager = muse.PlaylistManager()
+    manager.create_playlist("Mix")
+    manager.add_tracks("Mix", [{"path": "/a.mp3", "title": "a", "artist": ""}])
+    assert totals_of(manager.playlist_totals("Mix")) == (1, 0, 0)
+
+    index = muse.LibraryIndex(["/a.mp3"], [{"title": "a", "artist": "", "album": "", "duration": 4000, "size": 40}])
+    assert manager.fill_track_stats(index) == 1
+    assert totals_of(manager.playlist_totals("Mix")) == (1, 4000, 40)
@@ -0,0 +1,43 @@
+from PyQt5.QtMultimedia import QMediaPlayer
+
+import muse
+
+
+def test_paused_requests_are_collapsed_and_flushed_on_resume(qapp):
+    scheduler = muse.UiUpdateScheduler()
+    calls = []
+    scheduler.pause()
+    scheduler.schedule("position", lambda: calls.append(1))
+    scheduler.schedule("position", lambda: calls.append(2))
+    assert not scheduler.timer.isActive()
+    scheduler.resume()
+    assert scheduler.timer.isActive()
+    scheduler.flush()
+    assert calls == [2]
+    assert (scheduler.requested_count, scheduler.flushed_count) == (2, 1)
+
+
+def test_position_timer_stops_while_the_window_is_hidden(qapp):
+    player = muse.SpotifyLikePlayer()
+    player.show()
+    player.player.play()
+    player.timer.start()
+
+    player.hide()
+    assert player.ui_scheduler.paused
+    assert not player.timer.isActive()
+
+    # Playback started while hidden does not keep the timer running either
+    player.timer.start()
+    player.refresh_position()
+    assert not player.timer.isActive()
+
+    player.show()
+    assert not player.ui_scheduler.paused
+    assert player.timer.isActive()
+
+    player.hide()
+    player.player.pause()
+    player.show()
+    assert not player.timer.isActive()
+    player.close()